@@ -1,20 +1,21 @@
+import argparse
 import csv
-import sys
+import os
 from decimal import Decimal
 from collections import defaultdict
+from datetime import datetime
 
 # 你的目标 event 里的 4 个 market 的 YES asset id (从你的日志/DB里能查到，或者脚本自动识别)
 # 这里我们让脚本自动识别：只要 outcome='YES' 就算进总和。
+#
+# 输入可以是 export_pg_to_csv.py 导出的 ticks CSV，也可以是 tick store 目录
+# （export_pg_to_csv.py --format parquet）：后者只读 asset_id/as_of/best_ask 三列，
+# 并按 outcome / 时间范围 / market 做分区裁剪与谓词下推，不需要整文件解析。
 
-def analyze(csv_path):
-    print(f"Analyzing {csv_path} ...")
-    
+
+def load_ticks_from_csv(csv_path):
     # as_of -> {asset_id -> best_ask}
     ticks_by_time = defaultdict(dict)
-    
-    # 统计有多少个不同的 YES asset_id，以便确认数据是否完整
-    yes_assets = set()
-
     with open(csv_path, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         for row in reader:
@@ -23,21 +24,56 @@ def analyze(csv_path):
             outcome = row.get('outcome')
             if outcome != 'YES':
                 continue
-            
+
             ask_str = row.get('best_ask')
             if not ask_str:
                 continue
-                
+
             try:
                 ask = Decimal(ask_str)
             except:
                 continue
-                
-            as_of = row['as_of']
-            asset_id = row['asset_id']
-            
-            ticks_by_time[as_of][asset_id] = ask
-            yes_assets.add(asset_id)
+
+            ticks_by_time[row['as_of']][row['asset_id']] = ask
+    return ticks_by_time
+
+
+def load_ticks_from_store(store_dir, *, start=None, end=None, market_ids=None):
+    from polymarket_pgsql.tick_store import read_ticks, ticks_to_price
+
+    table = read_ticks(
+        store_dir,
+        columns=['asset_id', 'as_of', 'best_ask'],
+        start=start,
+        end=end,
+        market_ids=market_ids,
+        outcome='YES',
+    )
+    ticks_by_time = defaultdict(dict)
+    for aid, as_of, ask in zip(
+        table.column('asset_id').to_pylist(),
+        table.column('as_of').to_pylist(),
+        table.column('best_ask').to_pylist(),
+        strict=True,
+    ):
+        if ask is None:
+            continue
+        ticks_by_time[as_of][aid] = ticks_to_price(ask)
+    return ticks_by_time
+
+
+def analyze(csv_path, *, start=None, end=None, market_ids=None):
+    print(f"Analyzing {csv_path} ...")
+
+    if os.path.isdir(csv_path):
+        ticks_by_time = load_ticks_from_store(csv_path, start=start, end=end, market_ids=market_ids)
+    else:
+        ticks_by_time = load_ticks_from_csv(csv_path)
+
+    # 统计有多少个不同的 YES asset_id，以便确认数据是否完整
+    yes_assets = set()
+    for prices in ticks_by_time.values():
+        yes_assets.update(prices)
 
     print(f"Found {len(yes_assets)} unique YES assets.")
     if len(yes_assets) < 4:
@@ -45,18 +81,18 @@ def analyze(csv_path):
 
     # 开始寻找套利机会
     arb_count = 0
-    
+
     # 按时间排序遍历
     for as_of in sorted(ticks_by_time.keys()):
         prices = ticks_by_time[as_of]
-        
+
         # 严格一点：只有当收集齐了所有已知的 YES 资产价格时才计算
         # (假设你关注的那 4 个 market 都有数据)
         if len(prices) < len(yes_assets):
             continue
-            
+
         total_ask = sum(prices.values())
-        
+
         if total_ask < 1.0:
             arb_count += 1
             print(f"[{as_of}] SUM_YES = {total_ask:.6f}")
@@ -68,7 +104,21 @@ def analyze(csv_path):
     print(f"\nTotal opportunities found: {arb_count}")
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python scripts/analyze_csv_arb.py <path_to_csv>")
-        sys.exit(1)
-    analyze(sys.argv[1])
+    ap = argparse.ArgumentParser(
+        usage="python scripts/analyze_csv_arb.py <path_to_csv|tick_store_dir>"
+    )
+    ap.add_argument('path', help='ticks CSV 或 tick store 目录')
+    ap.add_argument(
+        '--start',
+        type=datetime.fromisoformat,
+        default=None,
+        help='仅 tick store：起始时间（ISO8601，含时区）',
+    )
+    ap.add_argument(
+        '--end', type=datetime.fromisoformat, default=None, help='仅 tick store：结束时间（不含）'
+    )
+    ap.add_argument(
+        '--market-ids', type=int, nargs='+', default=None, help='仅 tick store：只读这些 market'
+    )
+    args = ap.parse_args()
+    analyze(args.path, start=args.start, end=args.end, market_ids=args.market_ids)
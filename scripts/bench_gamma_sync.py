@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the Gamma metadata sync (polymarket_pgsql.gamma_sync) against the local
+stand-in (polymarket_pgsql.gamma_sim), started in-process unless --gamma-url points at one.
+
+Phases (each one sync_events() run with a fresh GammaClient):
+- cold        : empty checkpoint, pages through the whole catalogue
+- incremental : after --churn random event updates; stops at checkpoint - overlap
+- noop        : right after, nothing changed (cost of the overlap window alone)
+- burst_plain / burst_cached (--burst-callers > 0, in-process stand-in only): --burst-rounds
+  rounds of "churn --churn events, list the newest page, then --burst-callers threads each fetch
+  every churned event and its markets by id", through one shared GammaClient vs one
+  CachedGammaClient (polymarket_pgsql.gamma_cache). Reports logical vs HTTP detail requests,
+  hit / merge rates and cache invalidations.
+
+Reported per phase: pages/s, rows upserted/s (rows actually inserted or changed),
+time-to-checkpoint, and the stand-in's request / 429 / 5xx counts (GammaClient retries them).
+Rows use ids from --id-base (events) and --id-base*10 (markets) and source 'bench:gamma_events';
+they are deleted afterwards unless --keep.
+
+Examples:
+  PYTHONPATH=src python3 scripts/bench_gamma_sync.py --events 5000 --out bench_gamma.json
+  # 带延迟与限流：
+  PYTHONPATH=src python3 scripts/bench_gamma_sync.py --events 2000 --latency-ms 30 \
+      --rate-429 0.02 --error-rate 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import psycopg
+from dotenv import load_dotenv
+
+from polymarket_pgsql.config import load_settings
+from polymarket_pgsql.gamma_cache import CachedGammaClient
+from polymarket_pgsql.gamma_client import GammaClient
+from polymarket_pgsql.gamma_sim import GammaCatalogue, GammaStandIn
+from polymarket_pgsql.gamma_sync import SyncStats, sync_events
+
+SOURCE = "bench:gamma_events"
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def phase_result(
+    st: SyncStats, sim: Optional[GammaStandIn], before: Dict[str, int]
+) -> Dict[str, Any]:
+    sec = st.elapsed_s
+    out: Dict[str, Any] = {
+        "pages": st.pages,
+        "events_read": st.events,
+        "markets_read": st.markets,
+        "events_upserted": st.events_upserted,
+        "markets_upserted": st.markets_upserted,
+        "details": st.details,
+        "seconds": round(sec, 6),
+        "pages_per_s": round(st.pages / sec, 1) if sec > 0 else None,
+        "rows_upserted_per_s": round(st.rows_upserted / sec, 1) if sec > 0 else None,
+        "time_to_checkpoint_s": None if st.checkpoint_s is None else round(st.checkpoint_s, 6),
+        "checkpoint": None if st.last_updated_at is None else st.last_updated_at.isoformat(),
+    }
+    if sim is not None:
+        s = sim.stats
+        out["requests"] = s.requests - before["requests"]
+        out["throttled_429"] = s.throttled - before["throttled"]
+        out["errors_5xx"] = s.errors - before["errors"]
+    return out
+
+
+def detail_requests(sim: GammaStandIn) -> int:
+    by = sim.stats.by_path
+    return by.get("/events/{id}", 0) + by.get("/markets/{id}", 0)
+
+
+def _burst_caller(client: GammaClient, plan: List[Any], start: threading.Barrier) -> None:
+    start.wait()
+    for kind, obj_id in plan:
+        (client.get_event if kind == "events" else client.get_market)(obj_id)
+
+
+def burst(
+    client: GammaClient, sim: GammaStandIn, cat: GammaCatalogue, args: argparse.Namespace, seed: int
+) -> Dict[str, Any]:
+    """
+    Rounds of churn -> newest list page -> N threads fetching every churned event and its markets.
+    """
+    rng = random.Random(seed)
+    http0 = detail_requests(sim)
+    logical = 0
+    t0 = time.perf_counter()
+    for _ in range(args.burst_rounds):
+        ids = cat.churn(args.churn)
+        client.list_events(order="updatedAt", ascending="false", limit=min(len(ids), 500), offset=0)
+        work: List[Any] = []
+        for eid in ids:
+            work.append(("events", eid))
+            work.extend(("markets", int(m["id"])) for m in cat.events[eid]["markets"])
+        plans = [rng.sample(work, len(work)) for _ in range(args.burst_callers)]
+        start = threading.Barrier(args.burst_callers)
+
+        threads = [
+            threading.Thread(target=_burst_caller, args=(client, plan, start)) for plan in plans
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        logical += len(work) * args.burst_callers
+    sec = time.perf_counter() - t0
+    http = detail_requests(sim) - http0
+    out: Dict[str, Any] = {
+        "logical_requests": logical,
+        "http_requests": http,
+        "duplicate_http": max(0, http - logical // max(args.burst_callers, 1)),
+        "seconds": round(sec, 6),
+    }
+    if isinstance(client, CachedGammaClient):
+        st = client.stats
+        out.update(
+            {
+                "hit_rate": round(st.hit_rate, 4),
+                "merge_rate": round(st.merge_rate, 4),
+                "invalidated": st.invalidated,
+                "fetches": st.fetches,
+            }
+        )
+    return out
+
+
+def cleanup(conn: psycopg.Connection[Any], args: argparse.Namespace) -> None:
+    e_lo, e_hi = args.id_base, args.id_base + args.events
+    m_lo, m_hi = args.id_base * 10, args.id_base * 10 + args.events * args.markets_per_event
+    conn.execute(
+        "delete from staging_markets where market_id >= %s and market_id < %s", (m_lo, m_hi)
+    )
+    conn.execute("delete from staging_events where event_id >= %s and event_id < %s", (e_lo, e_hi))
+    conn.execute("delete from sync_state where source = %s", (SOURCE,))
+    conn.commit()
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser()
+    p.add_argument("--database-url", type=str, default=None, help="默认取 DATABASE_URL")
+    p.add_argument(
+        "--gamma-url",
+        type=str,
+        default=None,
+        help="已在跑的替身（scripts/sim_gamma.py）；默认进程内起一个",
+    )
+    p.add_argument("--events", type=int, default=2000, help="目录里的 event 数")
+    p.add_argument("--markets-per-event", type=int, default=4)
+    p.add_argument(
+        "--id-base",
+        type=int,
+        default=9_000_000,
+        help="须与替身的 --id-base 一致（清理按此范围删）",
+    )
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--page-size", type=int, default=100)
+    p.add_argument("--overlap-s", type=float, default=600.0)
+    p.add_argument("--fetch-details", action="store_true", help="对变更的 event 再调 /events/{id}")
+    p.add_argument(
+        "--churn",
+        type=int,
+        default=200,
+        help="incremental 之前随机更新的 event 数（仅进程内替身）",
+    )
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--jitter-ms", type=float, default=0.0)
+    p.add_argument("--rate-429", type=float, default=0.0)
+    p.add_argument("--error-rate", type=float, default=0.0)
+    p.add_argument(
+        "--burst-callers",
+        type=int,
+        default=0,
+        help=">0：加测并发详情请求（合并 + 缓存 vs 直连）的调用方数",
+    )
+    p.add_argument(
+        "--burst-rounds",
+        type=int,
+        default=3,
+        help="burst 的轮数（每轮先 churn，缓存须按 updatedAt 失效）",
+    )
+    p.add_argument("--cache-ttl-s", type=float, default=300.0, help="burst_cached 的缓存 TTL")
+    p.add_argument("--keep", action="store_true", help="不删除 bench 行（便于检查）")
+    p.add_argument("--out", type=str, default=None, help="结果 JSON 输出路径")
+    return p.parse_args()
+
+
+def main() -> int:
+    load_dotenv(dotenv_path=os.getenv("DOTENV_PATH", ".env"), override=False)
+    args = parse_args()
+    database_url = args.database_url or load_settings().database_url
+
+    sim: Optional[GammaStandIn] = None
+    cat: Optional[GammaCatalogue] = None
+    base_url = args.gamma_url
+    if base_url is None:
+        cat = GammaCatalogue(
+            n_events=args.events,
+            markets_per_event=args.markets_per_event,
+            seed=args.seed,
+            id_base=args.id_base,
+        )
+        sim = GammaStandIn(
+            cat,
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            rate_429=args.rate_429,
+            error_rate=args.error_rate,
+            seed=args.seed,
+        ).start()
+        base_url = sim.url
+
+    results: Dict[str, Dict[str, Any]] = {}
+    conn = psycopg.connect(database_url)
+    try:
+        cleanup(conn, args)
+        phases = ["cold", "incremental", "noop"] if cat is not None else ["cold", "noop"]
+        for name in phases:
+            if name == "incremental" and cat is not None:
+                cat.churn(args.churn)
+            before = (
+                {
+                    "requests": sim.stats.requests,
+                    "throttled": sim.stats.throttled,
+                    "errors": sim.stats.errors,
+                }
+                if sim is not None
+                else {}
+            )
+            client = GammaClient(base_url)
+            try:
+                st = sync_events(
+                    client,
+                    conn,
+                    source=SOURCE,
+                    page_size=args.page_size,
+                    overlap_s=args.overlap_s,
+                    fetch_details=args.fetch_details,
+                )
+            finally:
+                client.close()
+            results[name] = phase_result(st, sim, before)
+        if args.burst_callers > 0 and sim is not None and cat is not None:
+            for name, client in (
+                ("burst_plain", GammaClient(base_url)),
+                ("burst_cached", CachedGammaClient(base_url, ttl_s=args.cache_ttl_s)),
+            ):
+                try:
+                    results[name] = burst(client, sim, cat, args, seed=args.seed)
+                finally:
+                    client.close()
+    finally:
+        if not args.keep:
+            cleanup(conn, args)
+        conn.close()
+        if sim is not None:
+            sim.close()
+
+    for name, r in results.items():
+        if name.startswith("burst_"):
+            rates = (
+                f"  hit={r['hit_rate']:.1%} merge={r['merge_rate']:.1%} "
+                f"invalidated={r['invalidated']}"
+                if "hit_rate" in r
+                else ""
+            )
+            print(
+                f"{name:<12} logical={r['logical_requests']} http={r['http_requests']} "
+                f"duplicate_http={r['duplicate_http']} in {r['seconds']:.2f}s{rates}"
+            )
+            continue
+        extra = (
+            f"  req={r['requests']} 429={r['throttled_429']} 5xx={r['errors_5xx']}"
+            if "requests" in r
+            else ""
+        )
+        print(
+            f"{name:<12} pages={r['pages']:>5} {r['pages_per_s']!s:>8} pages/s  "
+            f"upserted={r['events_upserted']}+{r['markets_upserted']} "
+            f"{r['rows_upserted_per_s']!s:>10} rows/s  "
+            f"checkpoint@{r['time_to_checkpoint_s']}s{extra}"
+        )
+
+    if args.out:
+        params = {k: v for k, v in vars(args).items() if k not in {"database_url", "out", "keep"}}
+        report = {
+            "meta": {
+                "timestamp": utc_now().isoformat(),
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "params": params,
+            },
+            "results": results,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"\nwrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Micro / end-to-end benchmarks for the ingest-to-signal pipeline on synthetic market channel traffic.
+
+Cases (ops/s, best of --repeat runs):
+- decode      : raw text frame -> normalized events (clob_ws.decode_market_frame)
+- book_apply  : normalized event -> OrderBookState (clob_ws.apply_market_event); also reports the
+                resulting books' bytes_per_book (clob_ws.book_memory) under the default raw
+                retention and with raw_retention="full"
+- book_apply_fixed : the same into clob_ws.FixedBook (prices/sizes parsed once into integer units)
+- book_apply_checked : book_apply through book_sync.BookSync (timestamp/seq, echoed top and
+                       crossed-book checks on every event; no REST client)
+- arb_eval    : per-event GMP evaluation after an update (gmp.compute_prices)
+- basket_eval : incremental BasketState update + all four basket conditions (gmp.BasketState)
+- basket_eval_fixed : the same on gmp.FixedBasketState (integer sums and limits); reports mismatches
+                      against BasketState's signals (checked outside the timed loop, must be 0)
+- bar_rollup  : per-update 1s/1m bar maintenance for the asset and its event basket
+                (rollups.BarRoller)
+- depth_encode: book apply + top-10 L2 snapshot capture/encode on every change
+                (depth_codec.DepthRecorder);
+                reports encoded bytes per frame vs the same levels as jsonb-style text
+- end_to_end  : frame -> decode -> apply -> arb eval for every touched event
+- db_latest / db_ticks : PgWriter row throughput, one statement per round trip
+                         (only with --database-url; rows use source='bench' and 'bench:'
+                         asset ids, deleted afterwards)
+- db_latest_batch      : the same upserts inside PgWriter.batch() (pipeline mode, one transaction)
+- db_latest_many       : PgWriter.upsert_asset_latest_many, the whole batch as one statement
+- db_load_ticks        : rows/s reading those ticks back with tick_query.load_ticks
+                         (server-side cursor, binary records -> NumPy arrays; needs numpy)
+- db_fetch_ticks       : the same rows via a plain cursor fetchall() into Python tuples (baseline)
+
+Results are written as JSON; --compare an earlier file to flag regressions:
+  PYTHONPATH=src python3 scripts/bench_pipeline.py --out bench_base.json
+  PYTHONPATH=src python3 scripts/bench_pipeline.py --out bench_new.json --compare bench_base.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from polymarket_pgsql.book_sync import BookSync
+from polymarket_pgsql.clob_ws import (
+    FixedBook,
+    OrderBookState,
+    apply_market_event,
+    book_memory,
+    decode_market_frame,
+)
+from polymarket_pgsql.depth_codec import SIZE_SCALE, DepthRecorder, top_levels
+from polymarket_pgsql.fixedpoint import PRICE_SCALE
+from polymarket_pgsql.gmp import (
+    BasketState,
+    FixedBasketState,
+    MarketTokens,
+    compute_prices,
+    safe_mid,
+)
+from polymarket_pgsql.rollups import BarRoller
+from polymarket_pgsql.synthetic import SyntheticMarketFeed
+from polymarket_pgsql.tick_query import TICK_COLUMNS, load_ticks
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def best_of(repeat: int, fn: Callable[[], int]) -> Tuple[int, float]:
+    """
+    Run fn `repeat` times; returns (ops of one run, best wall seconds).
+    """
+    best = float("inf")
+    ops = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        ops = fn()
+        best = min(best, time.perf_counter() - t0)
+    return ops, best
+
+
+def result(ops: int, seconds: float, **extra: Any) -> Dict[str, Any]:
+    return {
+        "ops": ops,
+        "seconds": round(seconds, 6),
+        "ops_per_s": round(ops / seconds, 1) if seconds > 0 else None,
+        "us_per_op": round(seconds * 1e6 / ops, 3) if ops else None,
+        **extra,
+    }
+
+
+def git_rev() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return None
+
+
+def run_cpu_benchmarks(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    feed = SyntheticMarketFeed(
+        n_events=args.events,
+        markets_per_event=args.markets_per_event,
+        depth=args.depth,
+        batch_size=args.batch_size,
+        seed=args.seed,
+    )
+    frames = feed.frames(args.messages)
+    as_of = utc_now()
+    event_of: Dict[str, List[MarketTokens]] = {}
+    for legs in feed.events:
+        for t in legs:
+            event_of[t.yes_asset_id] = legs
+            event_of[t.no_asset_id] = legs
+
+    out: Dict[str, Dict[str, Any]] = {}
+
+    def decode() -> int:
+        for f in frames:
+            decode_market_frame(f, as_of=as_of)
+        return len(frames)
+
+    ops, sec = best_of(args.repeat, decode)
+    decoded = [decode_market_frame(f, as_of=as_of) for f in frames]
+    n_events = sum(len(x) for x in decoded)
+    out["decode"] = result(ops, sec, events=n_events, events_per_s=round(n_events / sec, 1))
+
+    flat = [tup for batch in decoded for tup in batch]
+
+    def apply(books: Optional[Dict[str, OrderBookState]] = None, **kw: Any) -> int:
+        books = {} if books is None else books
+        for ts, aid, ev in flat:
+            st = books.get(aid)
+            if st is None:
+                st = books[aid] = OrderBookState(**kw)
+            apply_market_event(st, ev, as_of=ts)
+        return len(flat)
+
+    def book_bytes(run: Callable[..., int], **kw: Any) -> int:
+        books: Dict[str, Any] = {}
+        run(books, **kw)
+        return round(book_memory(books).bytes_per_book)
+
+    ops, sec = best_of(args.repeat, apply)
+    out["book_apply"] = result(
+        ops,
+        sec,
+        bytes_per_book=book_bytes(apply),
+        bytes_per_book_full_raw=book_bytes(apply, raw_retention="full"),
+    )
+
+    def apply_fixed(books: Optional[Dict[str, FixedBook]] = None, **kw: Any) -> int:
+        books = {} if books is None else books
+        for ts, aid, ev in flat:
+            st = books.get(aid)
+            if st is None:
+                st = books[aid] = FixedBook(**kw)
+            apply_market_event(st, ev, as_of=ts)
+        return len(flat)
+
+    ops, sec = best_of(args.repeat, apply_fixed)
+    out["book_apply_fixed"] = result(
+        ops,
+        sec,
+        bytes_per_book=book_bytes(apply_fixed),
+        bytes_per_book_full_raw=book_bytes(apply_fixed, raw_retention="full"),
+    )
+
+    def apply_checked() -> int:
+        sync = BookSync()
+        for ts, aid, ev in flat:
+            sync.on_event(ts, aid, ev)
+        return len(flat)
+
+    ops, sec = best_of(args.repeat, apply_checked)
+    out["book_apply_checked"] = result(ops, sec)
+
+    books: Dict[str, OrderBookState] = {}
+    for ts, aid, ev in flat:
+        apply_market_event(books.setdefault(aid, OrderBookState()), ev, as_of=ts)
+    touched = [event_of[aid] for _, aid, _ in flat if aid in event_of]
+
+    def arb_eval() -> int:
+        for legs in touched:
+            compute_prices(tokens=legs, books=books)
+        return len(touched)
+
+    ops, sec = best_of(args.repeat, arb_eval)
+    out["arb_eval"] = result(ops, sec, legs_per_event=args.markets_per_event)
+
+    touched_tops = [(aid, books[aid].top) for _, aid, _ in flat if aid in event_of]
+
+    def basket_eval() -> int:
+        baskets = {id(legs): BasketState(legs) for legs in feed.events}
+        by_asset = {aid: baskets[id(legs)] for aid, legs in event_of.items()}
+        for aid, top in touched_tops:
+            b = by_asset[aid]
+            b.update(aid, top)
+            b.evaluate()
+        return len(touched_tops)
+
+    ops, sec = best_of(args.repeat, basket_eval)
+    out["basket_eval"] = result(ops, sec, legs_per_event=args.markets_per_event)
+
+    fixed_books: Dict[str, FixedBook] = {}
+    for ts, aid, ev in flat:
+        apply_market_event(fixed_books.setdefault(aid, FixedBook()), ev, as_of=ts)
+    touched_units = [
+        (aid, fixed_books[aid].best_bid_units, fixed_books[aid].best_ask_units)
+        for aid, _ in touched_tops
+    ]
+
+    def basket_eval_fixed() -> int:
+        baskets = {id(legs): FixedBasketState(legs) for legs in feed.events}
+        by_asset = {aid: baskets[id(legs)] for aid, legs in event_of.items()}
+        for aid, bid, ask in touched_units:
+            b = by_asset[aid]
+            b.update_units(aid, bid, ask)
+            b.evaluate()
+        return len(touched_units)
+
+    ops, sec = best_of(args.repeat, basket_eval_fixed)
+    # 逐条消息对照：两套 book + 两套篮子同步推进，信号（含 Decimal 的 total/edge）必须逐条相同
+    ref = {id(legs): BasketState(legs) for legs in feed.events}
+    fx = {id(legs): FixedBasketState(legs, fee_rate=Decimal("0.002")) for legs in feed.events}
+    ref_books: Dict[str, OrderBookState] = {}
+    fx_books: Dict[str, FixedBook] = {}
+    mismatches = 0
+    for ts, aid, ev in flat:
+        st = ref_books.setdefault(aid, OrderBookState())
+        fst = fx_books.setdefault(aid, FixedBook())
+        apply_market_event(st, ev, as_of=ts)
+        apply_market_event(fst, ev, as_of=ts)
+        legs = event_of.get(aid)
+        if legs is None:
+            continue
+        ref[id(legs)].update(aid, st.top)
+        fx[id(legs)].update(aid, fst)
+        mismatches += ref[id(legs)].evaluate(fee_rate=Decimal("0.002")) != fx[id(legs)].evaluate()
+    out["basket_eval_fixed"] = result(
+        ops, sec, legs_per_event=args.markets_per_event, mismatches=mismatches
+    )
+
+    # 每条更新间隔 1ms，让 1s bar 真正滚动
+    stamped = [
+        (as_of + timedelta(milliseconds=i), aid, top) for i, (aid, top) in enumerate(touched_tops)
+    ]
+    event_idx = {id(legs): i for i, legs in enumerate(feed.events)}
+    event_of_idx = {aid: event_idx[id(legs)] for aid, legs in event_of.items()}
+
+    def bar_rollup() -> int:
+        roller = BarRoller()
+        for ts, aid, top in stamped:
+            roller.on_top(aid, as_of=ts, best_bid=top.best_bid, best_ask=top.best_ask)
+            roller.on_basket(
+                event_of_idx[aid], as_of=ts, sum_yes_ask=top.best_ask, sum_no_ask=top.best_bid
+            )
+        return len(stamped)
+
+    ops, sec = best_of(args.repeat, bar_rollup)
+    out["bar_rollup"] = result(ops, sec)
+
+    def depth_encode(rec: DepthRecorder, json_sizes: Optional[List[int]] = None) -> int:
+        bk: Dict[str, OrderBookState] = {}
+        for i, (ts, aid, ev) in enumerate(flat):
+            st = bk.setdefault(aid, OrderBookState())
+            apply_market_event(st, ev, as_of=ts)
+            if rec.on_book(aid, st, as_of + timedelta(milliseconds=i)) and json_sizes is not None:
+                b, a = top_levels(st, rec.levels)
+                doc = {
+                    side: [
+                        {"price": str(p / PRICE_SCALE), "size": str(z / SIZE_SCALE)}
+                        for p, z in lv
+                    ]
+                    for side, lv in (("bids", b), ("asks", a))
+                }
+                json_sizes.append(len(json.dumps(doc)))
+        return len(flat)
+
+    ops, sec = best_of(
+        args.repeat, lambda: depth_encode(DepthRecorder(levels=10, min_interval_s=0))
+    )
+    rec = DepthRecorder(levels=10, min_interval_s=0)
+    json_sizes: List[int] = []
+    depth_encode(rec, json_sizes)
+    out["depth_encode"] = result(
+        ops,
+        sec,
+        frames=rec.frames,
+        bytes_per_frame=round(rec.payload_bytes / max(1, rec.frames), 1),
+        json_bytes_per_frame=round(sum(json_sizes) / max(1, len(json_sizes)), 1),
+    )
+
+    def end_to_end() -> int:
+        bk: Dict[str, OrderBookState] = {}
+        for f in frames:
+            for ts, aid, ev in decode_market_frame(f, as_of=as_of):
+                apply_market_event(bk.setdefault(aid, OrderBookState()), ev, as_of=ts)
+                legs = event_of.get(aid)
+                if legs is not None:
+                    compute_prices(tokens=legs, books=bk)
+        return len(frames)
+
+    ops, sec = best_of(args.repeat, end_to_end)
+    out["end_to_end"] = result(ops, sec, events=n_events, events_per_s=round(n_events / sec, 1))
+    return out
+
+
+def run_db_benchmarks(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    from polymarket_pgsql.pg_writer import PgWriter
+
+    feed = SyntheticMarketFeed(
+        n_events=args.events, markets_per_event=args.markets_per_event, seed=args.seed
+    )
+    books: Dict[str, OrderBookState] = {}
+    as_of = utc_now()
+    for ts, aid, ev in (t for f in feed.frames(0) for t in decode_market_frame(f, as_of=as_of)):
+        apply_market_event(books.setdefault(aid, OrderBookState()), ev, as_of=ts)
+    items = [(f"bench:{aid}", st) for aid, st in books.items()]
+    rows = [items[i % len(items)] for i in range(args.db_rows)]
+
+    db = PgWriter(args.database_url)
+    db.connect()
+    out: Dict[str, Dict[str, Any]] = {}
+    try:
+
+        def latest() -> int:
+            for aid, st in rows:
+                top = st.top
+                db.upsert_asset_latest(
+                    asset_id=aid,
+                    market_id=0,
+                    outcome="YES",
+                    as_of=top.as_of,
+                    best_bid=top.best_bid,
+                    best_ask=top.best_ask,
+                    mid=safe_mid(top.best_bid, top.best_ask),
+                    source="bench",
+                    raw={},
+                )
+            return len(rows)
+
+        ops, sec = best_of(args.repeat, latest)
+        out["db_latest"] = result(ops, sec)
+
+        def latest_batch() -> int:
+            with db.batch():
+                return latest()
+
+        ops, sec = best_of(args.repeat, latest_batch)
+        out["db_latest_batch"] = result(ops, sec)
+
+        def latest_many() -> int:
+            # 同一 asset 只留最后一行：按实际写入的行数算
+            with db.batch():
+                return db.upsert_asset_latest_many(
+                    {
+                        "asset_id": aid,
+                        "market_id": 0,
+                        "outcome": "YES",
+                        "as_of": st.top.as_of,
+                        "best_bid": st.top.best_bid,
+                        "best_ask": st.top.best_ask,
+                        "mid": safe_mid(st.top.best_bid, st.top.best_ask),
+                        "source": "bench",
+                        "raw": {},
+                    }
+                    for aid, st in rows
+                )
+
+        ops, sec = best_of(args.repeat, latest_many)
+        out["db_latest_many"] = result(ops, sec)
+
+        def ticks() -> int:
+            base = utc_now()
+            for i, (aid, st) in enumerate(rows):
+                top = st.top
+                db.insert_asset_tick(
+                    asset_id=aid,
+                    market_id=0,
+                    outcome="YES",
+                    as_of=base.replace(microsecond=i % 1_000_000),
+                    best_bid=top.best_bid,
+                    best_ask=top.best_ask,
+                    mid=safe_mid(top.best_bid, top.best_ask),
+                    source="bench",
+                    raw={},
+                )
+            return len(rows)
+
+        ops, sec = best_of(args.repeat, ticks)
+        out["db_ticks"] = result(ops, sec)
+
+        conn = db._ensure()
+        bench_assets = sorted({aid for aid, _ in rows})
+        span = (utc_now() - timedelta(days=1), utc_now() + timedelta(days=1))
+
+        def load() -> int:
+            return len(load_ticks(conn, bench_assets, *span, TICK_COLUMNS))
+
+        def fetch() -> int:
+            return len(
+                conn.execute(
+                    "select asset_id, as_of, market_id, best_bid, best_ask, mid "
+                    "from asset_price_ticks "
+                    "where asset_id = any(%s) and as_of >= %s and as_of < %s order by as_of",
+                    (bench_assets, *span),
+                ).fetchall()
+            )
+
+        try:
+            ops, sec = best_of(args.repeat, load)
+            out["db_load_ticks"] = result(ops, sec)
+        except RuntimeError as e:  # 没装 numpy
+            print(f"skip db_load_ticks: {e}")
+        ops, sec = best_of(args.repeat, fetch)
+        out["db_fetch_ticks"] = result(ops, sec)
+    finally:
+        conn = db._ensure()
+        for table in ("asset_price_latest", "asset_price_ticks"):
+            conn.execute(f"delete from {table} where source = 'bench' and asset_id like 'bench:%'")
+        db.close()
+    return out
+
+
+def compare(new: Dict[str, Any], old: Dict[str, Any], tolerance: float) -> int:
+    """
+    Print a ratio table; returns the number of cases slower than (1 - tolerance) x baseline.
+    """
+    regressions = 0
+    print(f"\n{'case':<18} {'base ops/s':>14} {'new ops/s':>14} {'ratio':>8}")
+    for name, r in new["results"].items():
+        b = old.get("results", {}).get(name)
+        if not b or not b.get("ops_per_s") or not r.get("ops_per_s"):
+            print(f"{name:<18} {'-':>14} {r.get('ops_per_s'):>14} {'-':>8}")
+            continue
+        ratio = r["ops_per_s"] / b["ops_per_s"]
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{name:<18} {b['ops_per_s']:>14} {r['ops_per_s']:>14} {ratio:>8.3f}{flag}")
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser()
+    p.add_argument("--events", type=int, default=50, help="合成 event 数")
+    p.add_argument("--markets-per-event", type=int, default=4, help="每个 event 的 market（腿）数")
+    p.add_argument("--depth", type=int, default=10, help="每边初始档位数")
+    p.add_argument("--batch-size", type=int, default=3, help="每条 price_change 消息里的变化条数")
+    p.add_argument("--messages", type=int, default=20000, help="消息条数（不含首帧快照）")
+    p.add_argument("--repeat", type=int, default=3, help="每个 case 跑几次取最快")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument(
+        "--database-url", type=str, default=None, help="可选：测 PgWriter 写入吞吐（本地 PG）"
+    )
+    p.add_argument("--db-rows", type=int, default=2000, help="DB case 每次写入的行数")
+    p.add_argument("--out", type=str, default=None, help="结果 JSON 输出路径")
+    p.add_argument("--compare", type=str, default=None, help="基线 JSON：对比并标记回退")
+    p.add_argument(
+        "--tolerance", type=float, default=0.10, help="低于基线 (1 - tolerance) 倍视为回退"
+    )
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    skip = {"database_url", "out", "compare", "tolerance"}
+    params = {k: v for k, v in vars(args).items() if k not in skip}
+    report: Dict[str, Any] = {
+        "meta": {
+            "timestamp": utc_now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "git_rev": git_rev(),
+            "params": params,
+        },
+        "results": run_cpu_benchmarks(args),
+    }
+    if args.database_url:
+        report["results"].update(run_db_benchmarks(args))
+
+    for name, r in report["results"].items():
+        print(
+            f"{name:<18} {r['ops']:>8} ops  {r['ops_per_s']:>12} ops/s  "
+            f"{r['us_per_op']:>10} us/op"
+        )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"\nwrote {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("params") != params:
+            print(
+                "warning: baseline was run with different parameters; ratios may not be comparable"
+            )
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
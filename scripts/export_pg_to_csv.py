@@ -6,25 +6,57 @@ Defaults are chosen for long-running collectors:
 - export last N hours of tick-like tables (asset_price_ticks, arb_signals)
 - export full small tables (asset_price_latest, paper_pnl)
 
+Large tick-like tables can be split into time ranges and exported in parallel on
+multiple connections (--jobs/--chunk-hours). COPY output is streamed as bytes straight
+into the (optionally gzip/zstd compressed) file; each range is written as its own
+compressed member/frame and the parts are concatenated in time order, which both
+gzip and zstd decoders read as one stream.
+
+With --format parquet the tick table is written into the local columnar tick store
+(see polymarket_pgsql.tick_store) instead of a CSV: one Parquet file per UTC day and
+market, integer-tick prices, sorted by as_of. Each day is exported by one worker.
+
+Incremental mode (--incremental) keeps a per-table watermark in `sync_state`
+(source = 'export:<table>') and only exports rows with as_of newer than the last run.
+
 Examples:
   # export last 3 hours (ticks + signals) and full latest/pnl
   PYTHONPATH=src python scripts/export_pg_to_csv.py --since-hours 3
 
   # export last 24 hours and include raw json columns
   PYTHONPATH=src python scripts/export_pg_to_csv.py --since-hours 24 --include-raw
+
+  # daily export: 8 connections, 1h ranges, zstd, only rows newer than the previous run
+  PYTHONPATH=src python scripts/export_pg_to_csv.py --since-hours 24 --jobs 8 \
+      --compress zstd --incremental
+
+  # ticks into the Parquet tick store (./tick_store/day=.../market_id=.../ticks.parquet)
+  PYTHONPATH=src python scripts/export_pg_to_csv.py --since-hours 24 --jobs 4 \
+      --format parquet --incremental
 """
 
 from __future__ import annotations
 
 import argparse
+import gzip
 import os
-from datetime import datetime, timezone
-from typing import Optional
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, List, Optional, Tuple
 
 import psycopg
 from dotenv import load_dotenv
+from psycopg import sql
+from psycopg.types.json import Jsonb
 
+from polymarket_pgsql import tick_store
 from polymarket_pgsql.config import load_settings
+from polymarket_pgsql.fixedpoint import PRICE_SCALE
+
+COMPRESS_EXT = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+_US = timedelta(microseconds=1)
 
 
 def utc_now() -> datetime:
@@ -55,18 +87,224 @@ def parse_args() -> argparse.Namespace:
         default=45883,
         help="用于过滤 paper_pnl/arb_signals 的 event_id（默认 45883）",
     )
+    p.add_argument(
+        "--jobs", type=int, default=1, help="并行连接数：ticks/signals 按时间段切分后并行 COPY"
+    )
+    p.add_argument(
+        "--chunk-hours", type=float, default=1.0, help="并行导出时每个时间段的长度（小时）"
+    )
+    p.add_argument(
+        "--compress",
+        choices=sorted(COMPRESS_EXT),
+        default="none",
+        help="输出压缩格式（zstd 需要 pip install zstandard）",
+    )
+    p.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="ticks 的导出格式：parquet 写入本地列式 tick store（需要 pyarrow），其余表仍为 CSV",
+    )
+    p.add_argument(
+        "--store-dir", type=str, default=None, help="tick store 根目录（默认 <out-dir>/tick_store）"
+    )
+    p.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "增量导出：按 sync_state 里记录的 per-table watermark 只导出上次之后的新行"
+            "（首次运行按 --since-hours）"
+        ),
+    )
+    p.add_argument(
+        "--watermark-lag-s",
+        type=float,
+        default=30.0,
+        help="增量上界 = now() - lag；给批量写库留出落地时间，避免漏掉迟到的行",
+    )
     return p.parse_args()
 
 
-def export_query_to_csv(conn: psycopg.Connection, *, sql: str, out_path: str) -> None:
+def open_compressed(path: str, compress: str) -> BinaryIO:
+    """
+    Open a binary writer for one output part. Callers write raw COPY bytes.
+    """
+    if compress == "gzip":
+        # compresslevel 6: ~zlib default, much faster than 9 with nearly the same ratio
+        return gzip.open(path, "wb", compresslevel=6)  # type: ignore[return-value]
+    if compress == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise RuntimeError("--compress zstd 需要安装 zstandard：pip install zstandard") from e
+        f = open(path, "wb")
+        return zstandard.ZstdCompressor(level=3).stream_writer(f, closefd=True)  # type: ignore[return-value]
+    return open(path, "wb")
+
+
+def export_query_to_csv(
+    conn: psycopg.Connection, *, sql: Any, out_path: str, compress: str = "none"
+) -> int:
+    """
+    COPY ... TO STDOUT into out_path without decoding; returns bytes written (uncompressed).
+    """
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
-    # Use standard CSV copy
-    with conn.cursor() as cur, open(out_path, "w", encoding="utf-8", newline="") as f:
+    n = 0
+    with conn.cursor() as cur, open_compressed(out_path, compress) as f:
         with cur.copy(sql) as copy:
             for data in copy:
-                if isinstance(data, memoryview):
-                    data = bytes(data)
-                f.write(data.decode("utf-8") if isinstance(data, (bytes, bytearray)) else str(data))
+                f.write(data)
+                n += len(data)
+    return n
+
+
+@dataclass(frozen=True)
+class ExportJob:
+    """
+    One exported file. Range-split tables carry a select template with {lo}/{hi}
+    placeholders; the file is assembled from one part per (lo, hi] range.
+    """
+
+    name: str
+    out_path: str
+    select: str  # select statement (no trailing semicolon); may contain {lo} / {hi}
+    ranges: List[Tuple[datetime, datetime]]
+    watermark_source: Optional[str] = None
+    # True: out_path is a tick store root, parts go through export_range_to_store
+    to_store: bool = False
+
+
+def split_ranges(
+    lo: datetime, hi: datetime, chunk: Optional[timedelta]
+) -> List[Tuple[datetime, datetime]]:
+    if hi <= lo:
+        return []
+    if chunk is None:
+        return [(lo, hi)]
+    out: List[Tuple[datetime, datetime]] = []
+    cur = lo
+    while cur < hi:
+        nxt = min(cur + chunk, hi)
+        out.append((cur, nxt))
+        cur = nxt
+    return out
+
+
+def split_days(lo: datetime, hi: datetime) -> List[Tuple[datetime, datetime]]:
+    """
+    Split (lo, hi] into per-UTC-day parts matching the tick store partitions, so that each
+    day file has exactly one writer.
+
+    Parts end 1us before midnight: (lo, hi] then covers [midnight, next midnight) of the day
+    TickStoreWriter files the rows under (as_of.date()); timestamptz resolution is 1us.
+    """
+    if hi <= lo:
+        return []
+    out: List[Tuple[datetime, datetime]] = []
+    cur = lo
+    while cur < hi:
+        # 本段第一行最早是 cur + 1us，按它所在的 UTC 日切
+        day_start = (cur + _US).astimezone(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        nxt = min(day_start + timedelta(days=1) - _US, hi)
+        out.append((cur, nxt))
+        cur = nxt
+    return out
+
+
+def build_copy(
+    select: str, *, lo: Optional[datetime], hi: Optional[datetime], header: bool
+) -> sql.Composed:
+    stmt = sql.SQL(select).format(
+        lo=sql.Literal(lo) if lo is not None else sql.SQL("null"),
+        hi=sql.Literal(hi) if hi is not None else sql.SQL("null"),
+    )
+    return sql.SQL("copy ({}) to stdout with csv{}").format(
+        stmt, sql.SQL(" header" if header else "")
+    )
+
+
+def read_watermark(conn: psycopg.Connection, source: str) -> Optional[datetime]:
+    row = conn.execute("select checkpoint from sync_state where source = %s", (source,)).fetchone()
+    if row is None or not isinstance(row[0], dict):
+        return None
+    v = row[0].get("last_as_of")
+    if not v:
+        return None
+    return datetime.fromisoformat(str(v))
+
+
+def write_watermark(
+    conn: psycopg.Connection, source: str, as_of: datetime, *, exported: int
+) -> None:
+    conn.execute(
+        """
+        insert into sync_state (source, checkpoint) values (%s, %s)
+        on conflict (source) do update set checkpoint = excluded.checkpoint, updated_at = now()
+        """,
+        (source, Jsonb({"last_as_of": as_of.isoformat(), "last_exported": exported})),
+    )
+    conn.commit()
+
+
+def run_part(database_url: str, stmt: sql.Composed, out_path: str, compress: str) -> int:
+    # one connection per worker thread; psycopg releases the GIL while waiting on the socket
+    with psycopg.connect(database_url) as conn:
+        return export_query_to_csv(conn, sql=stmt, out_path=out_path, compress=compress)
+
+
+def export_range_to_store(
+    database_url: str, select: str, lo: datetime, hi: datetime, store_dir: str
+) -> int:
+    """
+    Stream one (lo, hi] range of asset_price_ticks into the tick store; returns row count.
+    """
+    stmt = sql.SQL(select).format(lo=sql.Literal(lo), hi=sql.Literal(hi))
+    writer = tick_store.TickStoreWriter(store_dir)
+    n = 0
+    with psycopg.connect(database_url) as conn:
+        # 命名游标 = 服务端游标：按批拉取，内存只占一批
+        with conn.cursor(name="tick_store_export") as cur:
+            cur.itersize = 50_000
+            cur.execute(stmt)
+            for row in cur:
+                writer.add(row)
+                n += 1
+    writer.close()
+    return n
+
+
+def concat_parts(parts: List[str], out_path: str) -> None:
+    # gzip members / zstd frames concatenate into a valid single stream
+    with open(out_path, "wb") as out:
+        for p in parts:
+            with open(p, "rb") as f:
+                shutil.copyfileobj(f, out, length=1 << 20)
+            os.remove(p)
+
+
+def run_job(
+    pool: ThreadPoolExecutor, database_url: str, job: ExportJob, compress: str
+) -> Tuple[int, List[Any]]:
+    """
+    Submit every part of a job; returns (n_parts, futures) so all jobs share one pool.
+    """
+    if job.to_store:
+        futs = [
+            pool.submit(export_range_to_store, database_url, job.select, lo, hi, job.out_path)
+            for lo, hi in job.ranges
+        ]
+        return len(futs), futs
+    if not job.ranges:
+        stmt = build_copy(job.select, lo=None, hi=None, header=True)
+        return 1, [pool.submit(run_part, database_url, stmt, job.out_path, compress)]
+    futs = []
+    for i, (lo, hi) in enumerate(job.ranges):
+        stmt = build_copy(job.select, lo=lo, hi=hi, header=(i == 0))
+        part_path = f"{job.out_path}.part{i:05d}"
+        futs.append(pool.submit(run_part, database_url, stmt, part_path, compress))
+    return len(futs), futs
 
 
 def main() -> int:
@@ -75,78 +313,139 @@ def main() -> int:
     args = parse_args()
 
     now = utc_now()
-    since_expr = f"now() - interval '{args.since_hours} hours'"
-
     ts = fmt_ts_for_filename(now)
     out_dir = args.out_dir
+    ext = ".csv" + COMPRESS_EXT[args.compress]
+    # 单连接时不切分：一个时间段一次 COPY
+    chunk = timedelta(hours=args.chunk_hours) if args.jobs > 1 else None
 
     # Select columns (raw is large; default off)
     raw_cols = ", raw" if args.include_raw else ""
-
-    queries = [
-        (
-            f"{out_dir}/asset_price_latest_{ts}.csv",
-            f"""
-            copy (
-              select asset_id, market_id, outcome, as_of, best_bid, best_ask, mid, source{raw_cols}, updated_at
-              from asset_price_latest
-              order by market_id, outcome
-            ) to stdout with csv header
-            """,
-        ),
-        (
-            f"{out_dir}/paper_pnl_{ts}.csv",
-            f"""
-            copy (
-              select event_id, realized_pnl, unrealized_pnl, updated_at
-              from paper_pnl
-              where event_id = {int(args.event_id)}
-              order by event_id
-            ) to stdout with csv header
-            """,
-        ),
-        (
-            f"{out_dir}/arb_signals_last_{args.since_hours}h_{ts}.csv",
-            f"""
-            copy (
-              select signal_id, event_id, as_of, kind, edge, detail, created_at
-              from arb_signals
-              where event_id = {int(args.event_id)}
-                and as_of >= {since_expr}
-              order by as_of asc
-            ) to stdout with csv header
-            """,
-        ),
-        (
-            f"{out_dir}/asset_price_ticks_last_{args.since_hours}h_{ts}.csv",
-            f"""
-            copy (
-              select asset_id, as_of, market_id, outcome, best_bid, best_ask, mid, source{raw_cols}
-              from asset_price_ticks
-              where as_of >= {since_expr}
-              order by as_of asc
-            ) to stdout with csv header
-            """,
-        ),
-    ]
+    event_id = int(args.event_id)
 
     print(f"Connecting to DB to export csvs (since {args.since_hours}h)...")
     try:
-        with psycopg.connect(s.database_url) as conn:
-            for out_path, sql in queries:
-                print(f"Exporting to {out_path} ...", end="", flush=True)
-                try:
-                    export_query_to_csv(conn, sql=sql, out_path=out_path)
-                    print("DONE")
-                except Exception as e:
-                    print(f"FAILED: {e}")
+        ctl = psycopg.connect(s.database_url)
     except Exception as e:
         print(f"DB Connection failed: {e}")
         return 1
 
-    return 0
+    with ctl:
+        # 用库端时钟定上界：所有并行分段共享同一个快照时间点
+        db_now = ctl.execute("select now()").fetchone()[0]  # type: ignore[index]
+        hi = db_now - timedelta(seconds=args.watermark_lag_s) if args.incremental else db_now
+        default_lo = db_now - timedelta(hours=args.since_hours)
+
+        def window(source: str) -> Tuple[datetime, str]:
+            if not args.incremental:
+                return default_lo, f"last_{args.since_hours}h"
+            wm = read_watermark(ctl, source)
+            return (wm if wm is not None else default_lo), "incr"
+
+        ticks_src = "export:asset_price_ticks"
+        signals_src = f"export:arb_signals:{event_id}"
+        ticks_lo, ticks_tag = window(ticks_src)
+        signals_lo, signals_tag = window(signals_src)
+        ctl.commit()
+
+        jobs = [
+            ExportJob(
+                name="asset_price_latest",
+                out_path=f"{out_dir}/asset_price_latest_{ts}{ext}",
+                select=f"""
+                select asset_id, market_id, outcome, as_of, best_bid, best_ask, mid,
+                       source{raw_cols}, updated_at
+                from asset_price_latest
+                order by market_id, outcome
+                """,
+                ranges=[],
+            ),
+            ExportJob(
+                name="paper_pnl",
+                out_path=f"{out_dir}/paper_pnl_{ts}{ext}",
+                select=f"""
+                select event_id, realized_pnl, unrealized_pnl, updated_at
+                from paper_pnl
+                where event_id = {event_id}
+                order by event_id
+                """,
+                ranges=[],
+            ),
+            ExportJob(
+                name="arb_signals",
+                out_path=f"{out_dir}/arb_signals_{signals_tag}_{ts}{ext}",
+                select=f"""
+                select signal_id, event_id, as_of, kind, edge, detail, created_at
+                from arb_signals
+                where event_id = {event_id}
+                  and as_of > {{lo}} and as_of <= {{hi}}
+                order by as_of asc
+                """,
+                ranges=split_ranges(signals_lo, hi, chunk),
+                watermark_source=signals_src,
+            ),
+        ]
+        if args.format == "parquet":
+            scale = PRICE_SCALE
+            jobs.append(
+                ExportJob(
+                    name="asset_price_ticks",
+                    out_path=args.store_dir or os.path.join(out_dir, "tick_store"),
+                    select=f"""
+                    select asset_id, as_of, market_id, outcome,
+                      round(best_bid * {scale})::int4, round(best_ask * {scale})::int4,
+                      round(mid * {scale})::int4, source
+                    from asset_price_ticks
+                    where as_of > {{lo}} and as_of <= {{hi}}
+                    """,
+                    ranges=split_days(ticks_lo, hi),
+                    watermark_source=ticks_src,
+                    to_store=True,
+                )
+            )
+        else:
+            jobs.append(
+                ExportJob(
+                    name="asset_price_ticks",
+                    out_path=f"{out_dir}/asset_price_ticks_{ticks_tag}_{ts}{ext}",
+                    select=f"""
+                    select asset_id, as_of, market_id, outcome, best_bid, best_ask, mid,
+                           source{raw_cols}
+                    from asset_price_ticks
+                    where as_of > {{lo}} and as_of <= {{hi}}
+                    order by as_of asc
+                    """,
+                    ranges=split_ranges(ticks_lo, hi, chunk),
+                    watermark_source=ticks_src,
+                )
+            )
+
+        status = 0
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            submitted = [(job, *run_job(pool, s.database_url, job, args.compress)) for job in jobs]
+            for job, n_parts, futs in submitted:
+                print(f"Exporting to {job.out_path} ({n_parts} part(s)) ...", end="", flush=True)
+                split = job.ranges and not job.to_store
+                parts = [f"{job.out_path}.part{i:05d}" for i in range(n_parts)] if split else []
+                try:
+                    n = sum(f.result() for f in futs)
+                    if parts:
+                        concat_parts(parts, job.out_path)
+                    # 只有整张表所有分段都成功才推进 watermark（失败则下次从旧 watermark 重导）
+                    if args.incremental and job.watermark_source is not None and job.ranges:
+                        write_watermark(ctl, job.watermark_source, hi, exported=n)
+                    print(f"DONE ({n} {'rows' if job.to_store else 'bytes'})")
+                except Exception as e:
+                    status = 1
+                    for f in futs:
+                        f.cancel()
+                    for p in parts:
+                        if os.path.exists(p):
+                            os.remove(p)
+                    print(f"FAILED: {e}")
+
+    return status
 
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
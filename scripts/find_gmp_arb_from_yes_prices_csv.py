@@ -8,6 +8,13 @@ Expected CSV format (like the user's file):
   "Date (UTC)","Timestamp (UTC)","Outcome A","Outcome B",...
   "12-12-2025 16:00","1765555207","0.0115","0.215",...
 
+It can also read YES best asks straight from the local tick store
+(export_pg_to_csv.py --format parquet) for a set of markets: only the YES rows of the
+requested markets/time range are decoded, forward-filled per market and sampled into
+--bucket-s rows, so the same interval logic applies:
+  PYTHONPATH=src python3 scripts/find_gmp_arb_from_yes_prices_csv.py \
+    --store ./tick_store --market-ids 601697 601698 601699 601700 --start 2025-12-15T00:00:00+00:00
+
 Important:
   - This script assumes the outcome columns are Buy YES (best ask). If your CSV
     is mid/last/implied probability, treat results as theoretical only.
@@ -74,6 +81,62 @@ def read_rows(path: str) -> Tuple[List[str], List[Row], int]:
     return outcome_cols, rows, nan_rows
 
 
+def read_rows_from_store(
+    store_dir: str,
+    *,
+    market_ids: List[int],
+    start: Optional[datetime],
+    end: Optional[datetime],
+    bucket_s: int,
+) -> Tuple[List[str], List[Row], int]:
+    """
+    Build Row objects from tick store YES asks: last known ask per market at the end of
+    each bucket; buckets before every market has quoted are counted as invalid.
+    """
+    from polymarket_pgsql.fixedpoint import PRICE_SCALE
+    from polymarket_pgsql.tick_store import read_ticks
+
+    table = read_ticks(
+        store_dir,
+        columns=["as_of", "market_id", "best_ask"],
+        start=start,
+        end=end,
+        market_ids=market_ids,
+        outcome="YES",
+    )
+    leg = {m: i for i, m in enumerate(market_ids)}
+    last: List[Optional[int]] = [None] * len(market_ids)
+    rows: List[Row] = []
+    invalid = 0
+    cur_bucket: Optional[int] = None
+
+    def emit(bucket: int) -> None:
+        nonlocal invalid
+        if any(v is None for v in last):
+            invalid += 1
+            return
+        yes = [v / PRICE_SCALE for v in last]  # type: ignore[operator]
+        ts = bucket * bucket_s
+        date_s = datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%d-%m-%Y %H:%M")
+        rows.append(Row(ts=ts, date_str=date_s, yes_prices=yes, sum_yes=sum(yes)))
+
+    for as_of, mid, ask in zip(
+        table.column("as_of").to_pylist(),
+        table.column("market_id").to_pylist(),
+        table.column("best_ask").to_pylist(),
+        strict=True,
+    ):
+        bucket = int(as_of.timestamp()) // bucket_s
+        if cur_bucket is not None and bucket != cur_bucket:
+            emit(cur_bucket)
+        cur_bucket = bucket
+        if ask is not None:
+            last[leg[mid]] = ask
+    if cur_bucket is not None:
+        emit(cur_bucket)
+    return [str(m) for m in market_ids], rows, invalid
+
+
 def find_intervals(
     rows: List[Row],
     *,
@@ -129,7 +192,26 @@ def find_intervals(
 
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("csv_path", help="Path to CSV")
+    ap.add_argument(
+        "csv_path", nargs="?", default=None, help="Path to CSV (omit when using --store)"
+    )
+    ap.add_argument(
+        "--store", type=str, default=None, help="Read YES asks from a tick store directory instead"
+    )
+    ap.add_argument(
+        "--market-ids",
+        type=int,
+        nargs="+",
+        default=None,
+        help="Markets (legs) to read from --store",
+    )
+    ap.add_argument(
+        "--start", type=datetime.fromisoformat, default=None, help="--store: start time (ISO8601)"
+    )
+    ap.add_argument(
+        "--end", type=datetime.fromisoformat, default=None, help="--store: end time (exclusive)"
+    )
+    ap.add_argument("--bucket-s", type=int, default=60, help="--store: sample interval in seconds")
     ap.add_argument("--eps", type=float, default=1e-12, help="Strictness for sum_yes < 1-eps")
     ap.add_argument("--top", type=int, default=15, help="How many intervals to print")
     ap.add_argument(
@@ -146,7 +228,20 @@ def main() -> int:
     )
     args = ap.parse_args()
 
-    outcome_cols, rows, nan_rows = read_rows(args.csv_path)
+    if args.store:
+        if not args.market_ids:
+            ap.error("--store requires --market-ids")
+        outcome_cols, rows, nan_rows = read_rows_from_store(
+            args.store,
+            market_ids=args.market_ids,
+            start=args.start,
+            end=args.end,
+            bucket_s=args.bucket_s,
+        )
+    elif args.csv_path:
+        outcome_cols, rows, nan_rows = read_rows(args.csv_path)
+    else:
+        ap.error("either csv_path or --store is required")
     if not rows:
         print("No valid rows parsed.")
         return 2
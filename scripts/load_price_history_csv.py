@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Bulk-load downloaded Polymarket price-history CSVs into asset_price_ticks.
+
+Input is the wide format also read by find_gmp_arb_from_yes_prices_csv.py:
+  "Date (UTC)","Timestamp (UTC)","Outcome A","Outcome B",...
+  "12-12-2025 16:00","1765555207","0.0115","0.215",...
+
+Each outcome column is mapped to a market's YES asset through staging_markets
+(groupItemTitle, then question; override with --map "Outcome A=601697"). Rows are
+reshaped wide -> long in chunks and streamed with COPY into a temp table, then merged
+into asset_price_ticks with `on conflict do nothing` (source = 'history_csv' by default),
+so re-loading the same file is a no-op. Files are loaded in parallel worker processes.
+
+Like find_gmp_arb_from_yes_prices_csv.py, the prices are treated as Buy-YES (best_ask)
+by default; use --price-field mid if your file holds mid/last prices.
+
+Examples:
+  PYTHONPATH=src python3 scripts/load_price_history_csv.py docs/polymarket-price-data-*.csv \
+      --event-id 45883
+  PYTHONPATH=src python3 scripts/load_price_history_csv.py a.csv b.csv --jobs 4 \
+      --map "No change=601699"
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg
+from dotenv import load_dotenv
+
+from polymarket_pgsql.config import load_settings
+
+
+@dataclass(frozen=True)
+class OutcomeAsset:
+    column: str
+    market_id: int
+    asset_id: str  # YES token id
+
+
+def _json_list(v: Any) -> Optional[List[Any]]:
+    # Gamma 有时会把数组字段作为 JSON 字符串返回（例如 '["...","..."]'）
+    if isinstance(v, str):
+        try:
+            v = json.loads(v)
+        except Exception:
+            return None
+    return v if isinstance(v, list) else None
+
+
+def yes_asset_id(clob_token_ids: Any, data: Dict[str, Any]) -> Optional[str]:
+    ids = _json_list(clob_token_ids) or _json_list(data.get("clobTokenIds"))
+    outcomes = _json_list(data.get("outcomes"))
+    if not ids or not outcomes or len(ids) != len(outcomes):
+        return None
+    yes_idx = next((i for i, o in enumerate(outcomes) if str(o).lower() == "yes"), None)
+    return None if yes_idx is None else str(ids[yes_idx])
+
+
+def load_market_candidates(
+    conn: psycopg.Connection, event_id: Optional[int]
+) -> List[Tuple[int, str, str, str]]:
+    """
+    Returns (market_id, group_item_title, question, yes_asset_id) from staging_markets.
+    """
+    sql = "select market_id, question, clob_token_ids, data from staging_markets"
+    params: Tuple[Any, ...] = ()
+    if event_id is not None:
+        sql += " where event_id = %s"
+        params = (event_id,)
+    out: List[Tuple[int, str, str, str]] = []
+    for market_id, question, clob_ids, data in conn.execute(sql, params):
+        data = data if isinstance(data, dict) else {}
+        aid = yes_asset_id(clob_ids, data)
+        if aid is None:
+            continue
+        title = str(data.get("groupItemTitle") or "")
+        out.append((int(market_id), title, str(question or ""), aid))
+    return out
+
+
+def resolve_columns(
+    columns: List[str],
+    candidates: List[Tuple[int, str, str, str]],
+    overrides: Dict[str, int],
+) -> List[OutcomeAsset]:
+    by_market = {m: aid for m, _, _, aid in candidates}
+
+    def norm(x: str) -> str:
+        return " ".join(x.split()).lower()
+
+    by_title: Dict[str, List[Tuple[int, str]]] = {}
+    by_question: Dict[str, List[Tuple[int, str]]] = {}
+    for m, title, question, aid in candidates:
+        if title:
+            by_title.setdefault(norm(title), []).append((m, aid))
+        if question:
+            by_question.setdefault(norm(question), []).append((m, aid))
+
+    out: List[OutcomeAsset] = []
+    for col in columns:
+        if col in overrides:
+            m = overrides[col]
+            if m not in by_market:
+                raise RuntimeError(
+                    f"--map {col!r}={m}: market 不在 staging_markets（或没有 YES token）"
+                )
+            out.append(OutcomeAsset(column=col, market_id=m, asset_id=by_market[m]))
+            continue
+        hits = by_title.get(norm(col)) or by_question.get(norm(col)) or []
+        if len(hits) != 1:
+            what = "未找到" if not hits else f"匹配到多个 market {[h[0] for h in hits]}"
+            raise RuntimeError(
+                f"列 {col!r} {what}；请加 --event-id 缩小范围或用 --map '{col}=<market_id>'"
+            )
+        m, aid = hits[0]
+        out.append(OutcomeAsset(column=col, market_id=m, asset_id=aid))
+    return out
+
+
+def read_header(path: str) -> List[str]:
+    with open(path, newline="") as f:
+        return next(csv.reader(f))
+
+
+def _price(x: str) -> Optional[Decimal]:
+    if not x:
+        return None
+    try:
+        v = Decimal(x)
+    except InvalidOperation:
+        return None
+    if not v.is_finite():
+        return None
+    return v
+
+
+def load_file(
+    database_url: str,
+    path: str,
+    assets: List[OutcomeAsset],
+    *,
+    price_field: str,
+    source: str,
+    chunk_rows: int,
+) -> Tuple[str, int, int]:
+    """
+    Load one CSV; returns (path, long rows copied, rows inserted after de-dup).
+    Runs in a worker process with its own connection; the whole file is one transaction.
+    """
+    copied = 0
+    inserted = 0
+    with psycopg.connect(database_url) as conn:
+        conn.execute(
+            """
+            create temp table tmp_history_ticks (
+              asset_id text, as_of timestamptz, market_id bigint, outcome text, price numeric
+            ) on commit drop
+            """
+        )
+        merge_sql = f"""
+            insert into asset_price_ticks (
+              asset_id, as_of, market_id, outcome, {price_field}, source
+            )
+            select asset_id, as_of, market_id, outcome, price, %s from tmp_history_ticks
+            on conflict (asset_id, as_of) do nothing
+        """
+
+        def flush(batch: List[Tuple[Any, ...]]) -> None:
+            nonlocal copied, inserted
+            if not batch:
+                return
+            with conn.cursor() as cur:
+                with cur.copy(
+                    "copy tmp_history_ticks (asset_id, as_of, market_id, outcome, price) from stdin"
+                ) as cp:
+                    for row in batch:
+                        cp.write_row(row)
+                cur.execute(merge_sql, (source,))
+                inserted += max(cur.rowcount, 0)
+                cur.execute("truncate tmp_history_ticks")
+            copied += len(batch)
+
+        batch: List[Tuple[Any, ...]] = []
+        n_wide = 0
+        with open(path, newline="") as f:
+            r = csv.reader(f)
+            next(r)
+            for line in r:
+                if len(line) < 2 + len(assets):
+                    continue
+                try:
+                    as_of = datetime.fromtimestamp(int(float(line[1])), tz=timezone.utc)
+                except ValueError:
+                    continue
+                for a, x in zip(assets, line[2:], strict=False):
+                    p = _price(x)
+                    if p is None:
+                        continue
+                    batch.append((a.asset_id, as_of, a.market_id, "YES", p))
+                n_wide += 1
+                if n_wide % chunk_rows == 0:
+                    flush(batch)
+                    batch = []
+        flush(batch)
+    return path, copied, inserted
+
+
+def parse_map(items: List[str]) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for it in items:
+        col, sep, mid = it.rpartition("=")
+        if not sep or not col:
+            raise SystemExit(f"--map 需要形如 'Outcome=market_id'：{it!r}")
+        out[col] = int(mid)
+    return out
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser()
+    p.add_argument("paths", nargs="+", help="price-history CSV 文件（支持 glob）")
+    p.add_argument(
+        "--event-id",
+        type=int,
+        default=None,
+        help="只在该 event 的 staging_markets 里匹配 outcome 列",
+    )
+    p.add_argument(
+        "--map",
+        action="append",
+        default=[],
+        help="手动指定列到 market 的映射：'Outcome 名=market_id'（可重复）",
+    )
+    p.add_argument(
+        "--price-field",
+        choices=["best_ask", "mid", "best_bid"],
+        default="best_ask",
+        help="CSV 价格写入 asset_price_ticks 的哪一列（默认按 Buy-YES = best_ask）",
+    )
+    p.add_argument(
+        "--source", type=str, default="history_csv", help="写入 asset_price_ticks.source 的值"
+    )
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=max(1, min(4, os.cpu_count() or 1)),
+        help="并行加载的文件数（进程）",
+    )
+    p.add_argument("--chunk-rows", type=int, default=5000, help="每批 COPY 的宽表行数")
+    p.add_argument(
+        "--database-url", type=str, default=os.getenv("DATABASE_URL"), help="可选：PG 连接串"
+    )
+    return p.parse_args()
+
+
+def main() -> int:
+    load_dotenv(dotenv_path=os.getenv("DOTENV_PATH", ".env"), override=False)
+    args = parse_args()
+    database_url = args.database_url or load_settings().database_url
+
+    paths: List[str] = []
+    for p in args.paths:
+        paths.extend(sorted(glob.glob(p)) or [p])
+    overrides = parse_map(args.map)
+
+    # 列映射在主进程里一次性解析，worker 只负责 reshape + COPY
+    plans: List[Tuple[str, List[OutcomeAsset]]] = []
+    with psycopg.connect(database_url) as conn:
+        candidates = load_market_candidates(conn, args.event_id)
+    for path in paths:
+        try:
+            assets = resolve_columns(read_header(path)[2:], candidates, overrides)
+        except Exception as e:
+            print(f"[SKIP] {path}: {e}", flush=True)
+            continue
+        plans.append((path, assets))
+        mapping = ", ".join(f"{a.column}->m{a.market_id}" for a in assets)
+        print(f"[MAP] {path}: {mapping}", flush=True)
+
+    status = 0 if len(plans) == len(paths) else 1
+    with ProcessPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futs = [
+            pool.submit(
+                load_file,
+                database_url,
+                path,
+                assets,
+                price_field=args.price_field,
+                source=args.source,
+                chunk_rows=args.chunk_rows,
+            )
+            for path, assets in plans
+        ]
+        for fut in as_completed(futs):
+            try:
+                path, copied, inserted = fut.result()
+                print(
+                    f"[DONE] {path}: copied={copied} inserted={inserted} "
+                    f"(dup={copied - inserted})",
+                    flush=True,
+                )
+            except Exception as e:
+                status = 1
+                print(f"[FAILED] {type(e).__name__}: {e}", flush=True)
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
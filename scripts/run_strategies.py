@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Run several strategies on one market channel connection and one shared set of order books.
+
+Built-in strategies (polymarket_pgsql.strategies):
+  gmp_yes : BUY_YES_ALL / SELL_YES_ALL for the event's YES legs
+  gmp_no  : BUY_NO_ALL / SELL_NO_ALL for the event's NO legs
+  spread  : WIDE_SPREAD when an asset's bid/ask spread exceeds --max-spread
+
+Each book update is dispatched only to the strategies subscribed to that asset; per-strategy
+call counts and time are printed every --report-interval-s (profiling).
+
+Examples:
+  PYTHONPATH=src python3 scripts/run_strategies.py --strategies gmp_yes gmp_no spread \
+      --fee-rate 0.002
+  PYTHONPATH=src python3 scripts/run_strategies.py --strategies gmp_yes spread --write-db \
+      --max-spread 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+from datetime import datetime
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from polymarket_pgsql.config import load_clob_auth_from_env, load_settings
+from polymarket_pgsql.gamma_client import fetch_market_tokens
+from polymarket_pgsql.gmp import d
+from polymarket_pgsql.pg_writer import PgWriter
+from polymarket_pgsql.strategies import GmpBasketStrategy, SpreadMonitor
+from polymarket_pgsql.strategy_host import HostSignal, Strategy, StrategyHost
+
+
+class HostReporter(Strategy):
+    """
+    Prints the host's per-strategy profile on a timer (itself shows up in the report too).
+    """
+
+    name = "host_report"
+
+    def __init__(self, interval_s: float) -> None:
+        self.timer_interval_s = interval_s
+
+    def on_timer(self, now: datetime) -> None:
+        print(self.host.report(), flush=True)
+
+
+async def run(args: argparse.Namespace) -> int:
+    load_dotenv(dotenv_path=os.getenv("DOTENV_PATH", ".env"), override=False)
+    s = load_settings()
+
+    db: Optional[PgWriter] = None
+    if args.write_db:
+        db = PgWriter(args.database_url or s.database_url)
+        db.connect()
+
+    tokens = fetch_market_tokens(s.gamma_base_url, args.market_ids)
+    fee_rate = d(args.fee_rate)
+    host = StrategyHost()
+
+    for name in args.strategies:
+        if name == "gmp_yes":
+            host.register(
+                GmpBasketStrategy(
+                    event_id=args.event_id,
+                    tokens=tokens,
+                    outcome="YES",
+                    fee_rate=fee_rate,
+                    threshold=d(args.threshold),
+                    print_interval_s=args.print_interval_s,
+                )
+            )
+        elif name == "gmp_no":
+            host.register(
+                GmpBasketStrategy(
+                    event_id=args.event_id,
+                    tokens=tokens,
+                    outcome="NO",
+                    fee_rate=fee_rate,
+                    threshold=d(args.no_threshold) if args.no_threshold is not None else None,
+                    print_interval_s=args.print_interval_s,
+                )
+            )
+        elif name == "spread":
+            labels = {}
+            for t in tokens:
+                labels[t.yes_asset_id] = f"m{t.market_id}:YES"
+                labels[t.no_asset_id] = f"m{t.market_id}:NO"
+            host.register(
+                SpreadMonitor(
+                    labels,
+                    max_spread=d(args.max_spread),
+                    labels=labels,
+                    print_interval_s=args.print_interval_s,
+                )
+            )
+    if args.report_interval_s > 0:
+        host.register(HostReporter(args.report_interval_s))
+
+    def print_sink(sig: HostSignal) -> None:
+        ts = sig.as_of.strftime("%Y-%m-%d %H:%M:%S UTC")
+        edge = "" if sig.edge is None else f" edge={sig.edge:.6f}"
+        print(f"[{ts}] SIGNAL {sig.strategy} {sig.kind}{edge} {sig.detail}", flush=True)
+
+    host.add_sink(print_sink)
+
+    if db is not None:
+
+        def db_sink(sig: HostSignal) -> None:
+            assert db is not None
+            try:
+                db.insert_arb_signal(
+                    event_id=sig.event_id if sig.event_id is not None else args.event_id,
+                    as_of=sig.as_of,
+                    kind=sig.kind,
+                    edge=sig.edge if sig.edge is not None else d("0"),
+                    detail={**sig.detail, "strategy": sig.strategy},
+                )
+            except Exception:
+                try:
+                    db.close()
+                except Exception:
+                    pass
+                db.connect()
+                raise
+
+        host.add_sink(db_sink)
+
+    print(
+        f"[host] strategies={','.join(st.name for st in host.strategies)} "
+        f"assets={len(host.asset_ids)}",
+        flush=True,
+    )
+    try:
+        await host.run(
+            ws_url=args.ws_url,
+            auth=load_clob_auth_from_env(),
+            ping_interval_s=args.ping_interval_s,
+            reconnect_delay_s=args.reconnect_delay_s,
+        )
+    finally:
+        print(host.report(), flush=True)
+        if db is not None:
+            db.close()
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser()
+    p.add_argument("--event-id", type=int, default=45883, help="信号记录用的 event id")
+    p.add_argument(
+        "--market-ids",
+        type=int,
+        nargs="+",
+        default=[601697, 601698, 601699, 601700],
+        help="该 event 下的一组 market id",
+    )
+    p.add_argument(
+        "--strategies",
+        nargs="+",
+        choices=["gmp_yes", "gmp_no", "spread"],
+        default=["gmp_yes", "gmp_no", "spread"],
+        help="要挂到同一条行情上的策略",
+    )
+    p.add_argument(
+        "--threshold",
+        type=float,
+        default=1,
+        help="gmp_yes 阈值：sum(YES ask) * (1 + fee) < threshold",
+    )
+    p.add_argument("--no-threshold", type=float, default=None, help="gmp_no 阈值（默认 N-1）")
+    p.add_argument("--fee-rate", type=float, default=0.0, help="按成交额比例的手续费（极简模型）")
+    p.add_argument(
+        "--max-spread",
+        type=float,
+        default=0.05,
+        help="spread 策略：bid/ask 价差超过该值时报 WIDE_SPREAD",
+    )
+    p.add_argument(
+        "--ws-url",
+        type=str,
+        default=os.getenv("CLOB_WS_URL", "wss://ws-subscriptions-clob.polymarket.com/ws/market"),
+        help="CLOB WSS 端点（market channel）",
+    )
+    p.add_argument("--ping-interval-s", type=float, default=5.0, help="发送文本 PING 的间隔秒数")
+    p.add_argument("--reconnect-delay-s", type=float, default=3.0, help="WS 断线后的重连等待秒数")
+    p.add_argument("--print-interval-s", type=float, default=5.0, help="各策略状态打印间隔秒数")
+    p.add_argument(
+        "--report-interval-s",
+        type=float,
+        default=30.0,
+        help="各策略耗时统计打印间隔（0=只在退出时打印）",
+    )
+    p.add_argument("--write-db", action="store_true", help="开启：信号写入 arb_signals")
+    p.add_argument(
+        "--database-url", type=str, default=os.getenv("DATABASE_URL"), help="可选：PG 连接串"
+    )
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Read the shared-memory top-of-book table published by a collector (--shm-name) and print it.
+
+No websocket, no DB: reads go straight to the shared segment through the seqlock reader.
+
+Examples:
+  PYTHONPATH=src python3 scripts/shm_tob_watch.py --name pm_tob
+  PYTHONPATH=src python3 scripts/shm_tob_watch.py --name pm_tob --assets <id1> <id2> \
+      --interval-s 0.2
+  PYTHONPATH=src python3 scripts/shm_tob_watch.py --name pm_tob --bench-s 5     # 读延迟
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+from polymarket_pgsql.shm_tob import TopOfBookReader, TopQuote
+
+
+def fmt_ticks(q: TopQuote) -> str:
+    bid = "NA" if q.best_bid is None else f"{q.best_bid:.4f}"
+    ask = "NA" if q.best_ask is None else f"{q.best_ask:.4f}"
+    return f"{bid}/{ask}"
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--name", type=str, required=True, help="共享内存表名（与采集端 --shm-name 一致）"
+    )
+    p.add_argument("--assets", type=str, nargs="*", default=None, help="只看这些 asset（默认全部）")
+    p.add_argument("--interval-s", type=float, default=1.0, help="打印间隔")
+    p.add_argument("--once", action="store_true", help="只打印一次")
+    p.add_argument("--bench-s", type=float, default=0.0, help=">0：只测读延迟这么多秒然后退出")
+    args = p.parse_args()
+
+    r = TopOfBookReader(args.name)
+    try:
+        if args.bench_s > 0:
+            ids = args.assets or list(r.slots)
+            n = 0
+            t0 = time.perf_counter()
+            while time.perf_counter() - t0 < args.bench_s:
+                for aid in ids:
+                    r.get(aid)
+                n += len(ids)
+            sec = time.perf_counter() - t0
+            print(
+                f"assets={len(ids)} reads={n} {n / sec:.0f} reads/s "
+                f"{sec * 1e6 / max(n, 1):.2f} us/read"
+            )
+            return 0
+
+        last_publishes = -1
+        while True:
+            publishes = r.publishes
+            if publishes != last_publishes:
+                last_publishes = publishes
+                now_ns = time.time_ns()
+                if args.assets:
+                    quotes = [q for q in (r.get(a) for a in args.assets) if q is not None]
+                else:
+                    quotes = list(r)
+                ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+                print(
+                    f"[{ts}] writer_pid={r.writer_pid} assets={len(r.slots)} publishes={publishes}"
+                )
+                for q in quotes:
+                    age_ms = (now_ns - q.as_of_ns) / 1e6 if q.as_of_ns else float("nan")
+                    print(
+                        f"  m{q.market_id} …{q.asset_id[-12:]} bid/ask={fmt_ticks(q)} "
+                        f"updates={q.updates} age={age_ms:.0f}ms"
+                    )
+            if args.once:
+                return 0
+            time.sleep(args.interval_s)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        r.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
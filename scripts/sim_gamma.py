@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Local Gamma API stand-in (polymarket_pgsql.gamma_sim) for offline sync / retry testing.
+
+Serves /events, /events/{id}, /markets and /markets/{id} from a generated catalogue of
+--events events x --markets-per-event markets, with updatedAt paging
+(order=updatedAt&ascending=false&limit=&offset=), optional latency, 429s (with Retry-After)
+and 503s. --churn-per-s keeps bumping updatedAt of random events so incremental syncs have
+something to pick up.
+
+Examples:
+  PYTHONPATH=src python3 scripts/sim_gamma.py --port 8780 --events 20000 --latency-ms 40 \
+      --rate-429 0.02
+  # 让同步 / smoke test 连替身：
+  GAMMA_BASE_URL=http://127.0.0.1:8780 PYTHONPATH=src python3 scripts/gamma_smoke_test.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from polymarket_pgsql.gamma_sim import GammaCatalogue, GammaStandIn
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Local Gamma API stand-in")
+    p.add_argument("--host", type=str, default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8780)
+    p.add_argument("--events", type=int, default=5000, help="目录里的 event 数")
+    p.add_argument("--markets-per-event", type=int, default=4)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument(
+        "--id-base", type=int, default=9_000_000, help="event id 起点（market id 从 id_base*10 起）"
+    )
+    p.add_argument("--latency-ms", type=float, default=0.0, help="每个请求的固定延迟")
+    p.add_argument("--jitter-ms", type=float, default=0.0, help="延迟抖动（±）")
+    p.add_argument("--rate-429", type=float, default=0.0, help="返回 429 的请求比例")
+    p.add_argument("--error-rate", type=float, default=0.0, help="返回 503 的请求比例")
+    p.add_argument("--retry-after-s", type=int, default=1, help="429 响应里的 Retry-After")
+    p.add_argument(
+        "--churn-per-s",
+        type=float,
+        default=0.0,
+        help=">0：每秒随机更新这么多个 event 的 updatedAt",
+    )
+    p.add_argument("--stats-every-s", type=float, default=10.0, help="打印请求计数的间隔；0=不打印")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    t0 = time.perf_counter()
+    cat = GammaCatalogue(
+        n_events=args.events,
+        markets_per_event=args.markets_per_event,
+        seed=args.seed,
+        id_base=args.id_base,
+    )
+    sim = GammaStandIn(
+        cat,
+        host=args.host,
+        port=args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_429=args.rate_429,
+        error_rate=args.error_rate,
+        retry_after_s=args.retry_after_s,
+        seed=args.seed,
+    ).start()
+    print(
+        f"[sim] {len(cat.events)} events / {len(cat.markets)} markets "
+        f"built in {time.perf_counter() - t0:.1f}s; serving {sim.url}",
+        flush=True,
+    )
+    last_stats = last_churn = time.monotonic()
+    owed = 0.0
+    try:
+        while True:
+            time.sleep(0.2)
+            now = time.monotonic()
+            if args.churn_per_s > 0:
+                owed += (now - last_churn) * args.churn_per_s
+                last_churn = now
+                if owed >= 1:
+                    cat.churn(int(owed))
+                    owed -= int(owed)
+            if args.stats_every_s > 0 and now - last_stats >= args.stats_every_s:
+                last_stats = now
+                s = sim.stats
+                print(
+                    f"[sim] requests={s.requests} served={s.served} 429={s.throttled} "
+                    f"5xx={s.errors} 404={s.not_found} by_path={s.by_path}",
+                    flush=True,
+                )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
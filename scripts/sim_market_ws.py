@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Local market channel simulator for load / latency testing.
+
+serve  : websocket server speaking the same protocol as the CLOB market channel
+         (client sends {"assets_ids":[...],"type":"market"}; text "PING" -> "PONG").
+         After subscribing, the client gets book snapshots for its assets, then synthetic
+         (polymarket_pgsql.synthetic) or recorded (--replay) traffic at --rate msgs/s, with
+         optional bursts and forced disconnects. Every frame is stamped with `sim_sent_ns`
+         (time.time_ns() at send; also inside each price_changes entry) so clients can
+         measure true end-to-end latency. The same port also answers GET /book?token_id=...
+         with the current book of a subscribed asset (CLOB REST shape), so clients can resync one
+         asset against it; --drop-rate drops price_change entries to make client books drift.
+probe  : load client: runs market_channel_stream + book apply + GMP evaluation (the collector's
+         per-message work) against the server and prints throughput and latency percentiles
+         per second. If p99 latency keeps growing, the collector is falling behind.
+record : connect to a real endpoint and save raw frames as JSONL for `serve --replay`.
+
+Examples:
+  PYTHONPATH=src python3 scripts/sim_market_ws.py serve --port 8765 --rate 2000 \
+      --burst 500 --burst-every-s 5
+  PYTHONPATH=src python3 scripts/sim_market_ws.py probe --url ws://127.0.0.1:8765/ws/market \
+      --assets 2000 --duration-s 30
+  # 让实时脚本连模拟器（asset id 来自 Gamma，模拟器按订阅的 id 生成行情）：
+  PYTHONPATH=src python3 scripts/ws_gmp_arb_paper_trade.py --ws-url ws://127.0.0.1:8765/ws/market
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import http
+import json
+import random
+import statistics
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import websockets
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.http11 import Request, Response
+
+from polymarket_pgsql.clob_ws import OrderBookState, apply_market_event, market_channel_stream
+from polymarket_pgsql.gmp import MarketTokens, compute_prices
+from polymarket_pgsql.synthetic import SyntheticMarketFeed
+
+
+def stamp(msg: Any, sent_ns: int) -> Any:
+    if isinstance(msg, list):
+        for m in msg:
+            stamp(m, sent_ns)
+    elif isinstance(msg, dict):
+        msg["sim_sent_ns"] = sent_ns
+        pcs = msg.get("price_changes")
+        if isinstance(pcs, list):
+            for pc in pcs:
+                if isinstance(pc, dict):
+                    pc["sim_sent_ns"] = sent_ns
+    return msg
+
+
+def replay_source(path: str) -> Iterator[Any]:
+    """
+    Yield recorded frames forever (JSONL: one raw frame per line); non-JSON lines are skipped.
+    """
+    frames: List[Any] = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                frames.append(json.loads(line))
+            except Exception:
+                continue
+    if not frames:
+        raise SystemExit(f"--replay {path}: no frames")
+    while True:
+        for fr in frames:
+            yield json.loads(json.dumps(fr))  # 每次发送都是新对象（要打时间戳）
+
+
+# ---------------- serve ----------------
+
+# asset_id -> 正在为它生成行情的 feed（最近订阅它的连接），供 GET /book 读当前盘口
+FEEDS: Dict[str, SyntheticMarketFeed] = {}
+
+
+def process_request(conn: ServerConnection, request: Request) -> Optional[Response]:
+    """
+    Plain HTTP GET /book?token_id=... (CLOB REST stand-in).
+
+    Anything else continues as a websocket handshake.
+    """
+    url = urlsplit(request.path)
+    if url.path.rstrip("/") != "/book":
+        return None
+    token_id = (parse_qs(url.query).get("token_id") or [""])[0]
+    feed = FEEDS.get(token_id)
+    if feed is None:
+        resp = conn.respond(
+            http.HTTPStatus.NOT_FOUND,
+            json.dumps({"error": "No orderbook exists for the requested token id"}),
+        )
+    else:
+        book = feed.book_snapshot(token_id)
+        book.pop("event_type", None)
+        resp = conn.respond(http.HTTPStatus.OK, json.dumps(book))
+    del resp.headers["Content-Type"]
+    resp.headers["Content-Type"] = "application/json"
+    return resp
+
+
+def drop_changes(msg: Any, rate: float) -> Any:
+    """
+    Randomly drop price_change entries.
+
+    Simulated packet loss: the client's depth drifts from the feed's.
+    """
+    if isinstance(msg, dict) and isinstance(msg.get("price_changes"), list):
+        msg["price_changes"] = [pc for pc in msg["price_changes"] if random.random() >= rate]
+    return msg
+
+
+async def handle_client(ws: ServerConnection, args: argparse.Namespace) -> None:
+    peer = ws.remote_address
+    assets: List[str] = []
+    try:
+        # 等订阅消息；期间的 PING 也要回 PONG
+        while True:
+            raw = await ws.recv()
+            if raw == "PING":
+                await ws.send("PONG")
+                continue
+            try:
+                sub = json.loads(raw)
+            except Exception:
+                continue
+            if isinstance(sub, dict) and isinstance(sub.get("assets_ids"), list):
+                assets = [str(a) for a in sub["assets_ids"]]
+                break
+    except websockets.ConnectionClosed:
+        return
+
+    feed = SyntheticMarketFeed(
+        markets_per_event=args.markets_per_event,
+        depth=args.depth,
+        batch_size=args.batch_size,
+        seed=args.seed,
+        subscribed_ids=assets,
+    )
+    source: Optional[Iterator[Any]] = replay_source(args.replay) if args.replay else None
+    if source is None:
+        for aid in feed.asset_ids():
+            FEEDS[aid] = feed
+    print(f"[sim] {peer} subscribed {len(assets)} assets", flush=True)
+
+    async def reader() -> None:
+        async for m in ws:
+            if m == "PING":
+                await ws.send("PONG")
+
+    reader_task = asyncio.create_task(reader())
+    sent = 0
+    started = time.perf_counter()
+    disconnect_at = None
+    if args.disconnect_every_s > 0:
+        disconnect_at = started + args.disconnect_every_s * random.uniform(0.8, 1.2)
+    next_burst = started + args.burst_every_s if args.burst > 0 else None
+
+    async def send(msg: Any) -> None:
+        nonlocal sent
+        await ws.send(json.dumps(stamp(msg, time.time_ns())))
+        sent += 1
+
+    try:
+        if source is None:
+            await send(feed.snapshots())
+        while True:
+            now = time.perf_counter()
+            if disconnect_at is not None and now >= disconnect_at:
+                print(
+                    f"[sim] {peer} forced disconnect ({args.disconnect_mode}) after {sent} frames",
+                    flush=True,
+                )
+                if args.disconnect_mode == "abort":
+                    ws.transport.abort()
+                else:
+                    await ws.close(code=1012, reason="simulated restart")
+                return
+            due = int((now - started) * args.rate) - sent
+            if next_burst is not None and now >= next_burst:
+                due += args.burst
+                next_burst += args.burst_every_s
+            for _ in range(max(0, due)):
+                msg = next(source) if source is not None else feed.next_message()
+                if args.drop_rate > 0:
+                    msg = drop_changes(msg, args.drop_rate)
+                await send(msg)
+            await asyncio.sleep(args.tick_s)
+    except websockets.ConnectionClosed:
+        pass
+    finally:
+        reader_task.cancel()
+        for aid in feed.asset_ids():
+            if FEEDS.get(aid) is feed:
+                del FEEDS[aid]
+        elapsed = time.perf_counter() - started
+        rate = sent / max(elapsed, 1e-9)
+        print(f"[sim] {peer} closed: {sent} frames in {elapsed:.1f}s ({rate:.0f}/s)", flush=True)
+
+
+async def run_serve(args: argparse.Namespace) -> int:
+    async with serve(
+        lambda ws: handle_client(ws, args),
+        args.host,
+        args.port,
+        max_size=None,
+        ping_interval=None,
+        process_request=process_request,
+    ):
+        print(
+            f"[sim] listening on ws://{args.host}:{args.port}/ws/market "
+            f"(rate={args.rate}/s per client), "
+            f"REST stand-in http://{args.host}:{args.port}/book?token_id=...",
+            flush=True,
+        )
+        await asyncio.Future()
+    return 0
+
+
+# ---------------- probe ----------------
+
+
+def pct(xs: List[float], q: float) -> float:
+    if not xs:
+        return float("nan")
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+async def run_probe(args: argparse.Namespace) -> int:
+    # 与服务端同样的规则把订阅的 asset 分组成 event，用于套利评估
+    asset_ids = [f"{i:078d}" for i in range(args.assets)]
+    legs_by_asset: Dict[str, List[MarketTokens]] = {}
+    for e in range(0, len(asset_ids) // 2, args.markets_per_event):
+        legs = [
+            MarketTokens(
+                market_id=m,
+                question="",
+                yes_asset_id=asset_ids[2 * m],
+                no_asset_id=asset_ids[2 * m + 1],
+            )
+            for m in range(e, min(e + args.markets_per_event, len(asset_ids) // 2))
+        ]
+        for t in legs:
+            legs_by_asset[t.yes_asset_id] = legs
+            legs_by_asset[t.no_asset_id] = legs
+
+    books: Dict[str, OrderBookState] = {}
+    lat_ms: List[float] = []
+    all_lat: List[float] = []
+    n = 0
+    window_start = time.perf_counter()
+    deadline = window_start + args.duration_s
+    reconnects = 0
+
+    print("sec  events/s   p50_ms   p99_ms   max_ms", flush=True)
+    while time.perf_counter() < deadline:
+        try:
+            async for as_of, aid, ev in market_channel_stream(
+                ws_url=args.url, asset_ids=asset_ids, ping_interval_s=5.0, recv_timeout_s=30.0
+            ):
+                apply_market_event(books.setdefault(aid, OrderBookState()), ev, as_of=as_of)
+                legs = legs_by_asset.get(aid)
+                if legs is not None:
+                    compute_prices(tokens=legs, books=books)
+                raw = ev.get("raw") or {}
+                sent_ns = raw.get("sim_sent_ns")
+                if sent_ns is not None:
+                    lat_ms.append((time.time_ns() - int(sent_ns)) / 1e6)
+                n += 1
+
+                now = time.perf_counter()
+                if now - window_start >= 1.0:
+                    elapsed_s = int(now - deadline + args.duration_s)
+                    worst = max(lat_ms, default=float("nan"))
+                    print(
+                        f"{elapsed_s:>3} {n / (now - window_start):>9.0f} "
+                        f"{pct(lat_ms, 0.5):>8.2f} {pct(lat_ms, 0.99):>8.2f} {worst:>8.2f}",
+                        flush=True,
+                    )
+                    all_lat.extend(lat_ms)
+                    lat_ms = []
+                    n = 0
+                    window_start = now
+                if now >= deadline:
+                    break
+        except Exception as e:
+            reconnects += 1
+            print(f"[probe] {type(e).__name__}: {e} (reconnect)", flush=True)
+            await asyncio.sleep(0.5)
+
+    all_lat.extend(lat_ms)
+    if all_lat:
+        print(
+            f"\nassets={args.assets} samples={len(all_lat)} reconnects={reconnects} "
+            f"p50={statistics.median(all_lat):.2f}ms p99={pct(all_lat, 0.99):.2f}ms "
+            f"max={max(all_lat):.2f}ms",
+            flush=True,
+        )
+    return 0
+
+
+# ---------------- record ----------------
+
+
+async def run_record(args: argparse.Namespace) -> int:
+    n = 0
+    deadline = time.perf_counter() + args.duration_s
+    async with websockets.connect(args.url, ping_interval=None, max_size=None) as ws:
+        await ws.send(json.dumps({"assets_ids": args.asset_ids, "type": "market"}))
+        with open(args.out, "a", encoding="utf-8") as f:
+            last_ping = 0.0
+            while time.perf_counter() < deadline:
+                if time.perf_counter() - last_ping >= 5.0:
+                    await ws.send("PING")
+                    last_ping = time.perf_counter()
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                except TimeoutError:
+                    continue
+                if isinstance(raw, bytes):
+                    raw = raw.decode("utf-8", errors="replace")
+                if raw in {"PING", "PONG"}:
+                    continue
+                f.write(raw.replace("\n", " ") + "\n")
+                n += 1
+    print(f"recorded {n} frames -> {args.out}")
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    s = sub.add_parser("serve", help="启动本地 market channel 模拟服务")
+    s.add_argument("--host", type=str, default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8765)
+    s.add_argument("--rate", type=float, default=200.0, help="每个连接每秒发送的消息数")
+    s.add_argument("--burst", type=int, default=0, help="每次突发额外发送的消息数")
+    s.add_argument("--burst-every-s", type=float, default=5.0, help="突发间隔秒数")
+    s.add_argument(
+        "--disconnect-every-s",
+        type=float,
+        default=0.0,
+        help=">0：每隔约 N 秒（±20%%）强制断开连接",
+    )
+    s.add_argument(
+        "--disconnect-mode",
+        choices=["close", "abort"],
+        default="close",
+        help="close=正常关闭帧；abort=直接断 TCP",
+    )
+    s.add_argument("--markets-per-event", type=int, default=4)
+    s.add_argument("--depth", type=int, default=10)
+    s.add_argument("--batch-size", type=int, default=3)
+    s.add_argument("--seed", type=int, default=0)
+    s.add_argument(
+        "--drop-rate",
+        type=float,
+        default=0.0,
+        help="按该概率丢弃 price_change 条目（让客户端盘口漂移，测重同步）",
+    )
+    s.add_argument(
+        "--replay",
+        type=str,
+        default=None,
+        help="回放录制的 JSONL 帧（record 子命令产出），代替合成流量",
+    )
+    s.add_argument("--tick-s", type=float, default=0.001, help="发送循环的调度粒度")
+
+    pr = sub.add_parser("probe", help="压测客户端：测吞吐与端到端延迟")
+    pr.add_argument("--url", type=str, default="ws://127.0.0.1:8765/ws/market")
+    pr.add_argument("--assets", type=int, default=200, help="订阅的 asset 数（YES/NO 成对）")
+    pr.add_argument("--markets-per-event", type=int, default=4, help="需与 serve 一致")
+    pr.add_argument("--duration-s", type=float, default=20.0)
+
+    r = sub.add_parser("record", help="录制真实端点的原始帧到 JSONL")
+    r.add_argument("--url", type=str, default="wss://ws-subscriptions-clob.polymarket.com/ws/market")
+    r.add_argument("--asset-ids", type=str, nargs="+", required=True)
+    r.add_argument("--duration-s", type=float, default=60.0)
+    r.add_argument("--out", type=str, required=True)
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    runner = {"serve": run_serve, "probe": run_probe, "record": run_record}[args.cmd]
+    try:
+        return asyncio.run(runner(args))
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
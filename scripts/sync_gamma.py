@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Incremental Gamma events/markets sync into staging_events / staging_markets
+(polymarket_pgsql.gamma_sync).
+
+Pages /events by updatedAt (newest first) down to the checkpoint in sync_state minus --overlap-s,
+UPSERTs each page, then advances the checkpoint. --loop-s repeats the sync forever.
+
+Examples:
+  PYTHONPATH=src python3 scripts/sync_gamma.py
+  PYTHONPATH=src python3 scripts/sync_gamma.py --loop-s 60 --fetch-details
+  # 对本地替身（scripts/sim_gamma.py）：
+  GAMMA_BASE_URL=http://127.0.0.1:8780 PYTHONPATH=src python3 scripts/sync_gamma.py \
+      --source sim:gamma_events
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+import psycopg
+from dotenv import load_dotenv
+
+from polymarket_pgsql.config import load_settings
+from polymarket_pgsql.gamma_cache import CachedGammaClient
+from polymarket_pgsql.gamma_client import GammaClient
+from polymarket_pgsql.gamma_sync import DEFAULT_SOURCE, sync_events
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Incremental Gamma sync -> staging_*")
+    p.add_argument(
+        "--source", type=str, default=DEFAULT_SOURCE, help="sync_state 里 checkpoint 的 key"
+    )
+    p.add_argument("--page-size", type=int, default=100)
+    p.add_argument(
+        "--overlap-s", type=float, default=600.0, help="从 checkpoint 往前回看的窗口（秒）"
+    )
+    p.add_argument("--max-pages", type=int, default=None, help="单次最多翻几页（首次全量时可限流）")
+    p.add_argument(
+        "--fetch-details",
+        action="store_true",
+        help="对变更的 event 再调 /events/{id} 取完整 markets",
+    )
+    p.add_argument("--active-only", action="store_true", help="只拉 closed=false 的 event")
+    p.add_argument("--loop-s", type=float, default=0.0, help=">0：每隔 N 秒重复同步")
+    p.add_argument(
+        "--detail-cache-ttl-s",
+        type=float,
+        default=0.0,
+        help=(
+            ">0：--fetch-details 的 Event-by-ID 结果缓存这么多秒"
+            "（跨 --loop-s 轮次共用，updatedAt 变了即失效）"
+        ),
+    )
+    return p.parse_args()
+
+
+def main() -> int:
+    load_dotenv(dotenv_path=os.getenv("DOTENV_PATH", ".env"), override=False)
+    args = parse_args()
+    s = load_settings()
+    params = {"closed": "false"} if args.active_only else None
+    cached = (
+        CachedGammaClient(s.gamma_base_url, ttl_s=args.detail_cache_ttl_s)
+        if args.detail_cache_ttl_s > 0
+        else None
+    )
+    with psycopg.connect(s.database_url) as conn:
+        while True:
+            client = cached if cached is not None else GammaClient(s.gamma_base_url)
+            try:
+                st = sync_events(
+                    client,
+                    conn,
+                    source=args.source,
+                    page_size=args.page_size,
+                    overlap_s=args.overlap_s,
+                    max_pages=args.max_pages,
+                    fetch_details=args.fetch_details,
+                    params=params,
+                )
+            finally:
+                if cached is None:
+                    client.close()
+            print(
+                f"[gamma] pages={st.pages} events={st.events} markets={st.markets} "
+                f"upserted={st.events_upserted}+{st.markets_upserted} details={st.details} "
+                f"checkpoint={st.last_updated_at.isoformat() if st.last_updated_at else None} "
+                f"in {st.elapsed_s:.2f}s",
+                flush=True,
+            )
+            if cached is not None:
+                print(f"[gamma] detail cache: {cached.stats.summary()}", flush=True)
+            if args.loop_s <= 0:
+                if cached is not None:
+                    cached.close()
+                return 0
+            time.sleep(args.loop_s)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Follow arbitrage signals as they happen (polymarket_pgsql.signal_bus), without polling arb_signals.
+
+Two sources:
+- --socket PATH : the engine's local Unix-socket pub-sub (--signal-socket on the engine);
+                  no PG at all
+- default       : LISTEN on arb_signal_<kind>, NOTIFYed by the engine's arb_signals insert
+                  (--write-db)
+
+Each line shows the signal and its age on arrival (now - the signal's market data time); on exit
+the age percentiles are printed.
+
+Examples:
+  PYTHONPATH=src python3 scripts/watch_signals.py --socket /tmp/pm_signals.sock
+  PYTHONPATH=src python3 scripts/watch_signals.py --kinds BUY_YES_ALL BUY_NO_ALL
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+from typing import Iterator, List
+
+import psycopg
+from dotenv import load_dotenv
+
+from polymarket_pgsql.config import load_settings
+from polymarket_pgsql.pipeline import SIGNAL_KINDS
+from polymarket_pgsql.signal_bus import SignalMessage, SignalSubscriber, listen_signals
+
+
+def main() -> int:
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "--socket", type=str, default=None, help="引擎 --signal-socket 的路径；不给则 LISTEN PG"
+    )
+    p.add_argument("--database-url", type=str, default=None, help="LISTEN 用；默认取 DATABASE_URL")
+    p.add_argument(
+        "--kinds", type=str, nargs="*", default=list(SIGNAL_KINDS), help="只看这些信号类型"
+    )
+    p.add_argument(
+        "--timeout-s",
+        type=float,
+        default=None,
+        help="这么多秒没有信号就退出（默认一直等）",
+    )
+    p.add_argument("--quiet", action="store_true", help="不逐条打印，只在退出时打印统计")
+    args = p.parse_args()
+    kinds = [k.upper() for k in args.kinds]
+
+    conn = None
+    sub = None
+    stream: Iterator[SignalMessage]
+    if args.socket:
+        sub = SignalSubscriber(args.socket, kinds=kinds)
+        stream = sub.messages(timeout=args.timeout_s)
+        print(f"[watch] subscribed to {args.socket}", flush=True)
+    else:
+        load_dotenv(dotenv_path=os.getenv("DOTENV_PATH", ".env"), override=False)
+        conn = psycopg.connect(args.database_url or load_settings().database_url, autocommit=True)
+        stream = listen_signals(conn, kinds, timeout=args.timeout_s)
+        print(f"[watch] LISTEN {', '.join(kinds)}", flush=True)
+
+    ages: List[float] = []
+    try:
+        for msg in stream:
+            age = msg.age_ms
+            ages.append(age)
+            if not args.quiet:
+                sid = "" if msg.signal_id is None else f" id={msg.signal_id}"
+                print(
+                    f"[{msg.as_of.strftime('%H:%M:%S.%f')[:-3]}] {msg.kind} event={msg.event_id} "
+                    f"edge={msg.edge}{sid} age={age:.2f}ms",
+                    flush=True,
+                )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if sub is not None:
+            sub.close()
+        if conn is not None:
+            conn.close()
+    if ages:
+        qs = statistics.quantiles(ages, n=100, method="inclusive") if len(ages) > 1 else ages * 99
+        print(
+            f"[watch] signals={len(ages)} age_ms p50={qs[49]:.2f} p99={qs[98]:.2f} "
+            f"max={max(ages):.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
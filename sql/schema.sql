@@ -124,6 +124,21 @@ create table if not exists asset_price_ticks (
 
 create index if not exists asset_price_ticks_as_of_idx on asset_price_ticks (as_of desc);
 
+-- asset id 驻留表（polymarket_pgsql.asset_registry）：采集进程内 asset 用稠密整数 key，这里记下 asset_id -> 稳定的
+-- asset_key 与元数据（market / event / outcome / 篮子腿序号），跨进程 / 重启按 asset_key 关联。
+create table if not exists asset_registry (
+  asset_key         integer generated by default as identity unique,
+  asset_id          text primary key,
+  market_id         bigint not null,
+  event_id          bigint,
+  outcome           text not null, -- 'YES' / 'NO'
+  leg               int not null,
+  created_at        timestamptz not null default now(),
+  updated_at        timestamptz not null default now()
+);
+
+create index if not exists asset_registry_market_id_idx on asset_registry (market_id);
+
 -- ---------- Paper trading：信号、模拟订单/成交、持仓、PnL ----------
 create table if not exists arb_signals (
   signal_id      bigserial primary key,
@@ -166,15 +181,36 @@ create table if not exists paper_fills (
 );
 
 create index if not exists paper_fills_market_id_filled_at_idx on paper_fills (market_id, filled_at desc);
+create index if not exists paper_fills_order_id_idx on paper_fills (order_id);
 
+-- 同一 market 可以同时持有 YES 与 NO（例如 BUY_NO_ALL 与 BUY_YES_ALL 篮子并存），按 (market_id, outcome) 一行
 create table if not exists paper_positions (
-  market_id      bigint primary key,
+  market_id      bigint not null,
   outcome        text not null,        -- 'YES' / 'NO'
   qty            numeric not null,
   avg_price      numeric not null,
-  updated_at     timestamptz not null default now()
+  realized_pnl   numeric not null default 0,   -- 含手续费
+  updated_at     timestamptz not null default now(),
+  primary key (market_id, outcome)
 );
 
+-- 旧库迁移：主键只有 market_id 时改为 (market_id, outcome)
+do $$
+declare
+  pk_name text;
+  pk_cols int;
+begin
+  select conname, array_length(conkey, 1) into pk_name, pk_cols
+  from pg_constraint
+  where conrelid = 'paper_positions'::regclass and contype = 'p';
+  if pk_cols = 1 then
+    execute format('alter table paper_positions drop constraint %I', pk_name);
+    alter table paper_positions add primary key (market_id, outcome);
+  end if;
+end $$;
+
+alter table paper_positions add column if not exists realized_pnl numeric not null default 0;
+
 -- 可选：按 event 汇总的 PnL（回放/报表方便）
 create table if not exists paper_pnl (
   event_id       bigint primary key,
@@ -184,3 +220,232 @@ create table if not exists paper_pnl (
 );
 
 
+
+-- ---------- 服务端 GMP 一揽子评估：按 event 增量维护的聚合 ----------
+-- 每个 watch event 一行：腿数 N、YES/NO ask 之和、最旧那条腿。
+-- asset_price_latest 每条写入语句（含 upsert）结束后，由语句级触发器只重算受影响的 event。
+-- 触发器按语句计：写入端须把一批 latest 合成一条多行语句（PgWriter.upsert_asset_latest_many，
+-- 每次 flush 每个 event 重算一次）；逐 asset 一条 upsert 会让每个 asset 都重算一遍所在 event。
+-- 也可以禁用触发器改为定时批量刷新：
+--   alter table asset_price_latest disable trigger asset_price_latest_basket_ins, disable trigger asset_price_latest_basket_upd;
+--   select refresh_event_baskets();   -- 例如每秒/每 5 秒跑一次
+-- 查询当前所有满足条件的 event（按 slack 索引，O(events)，不扫 ticks）：
+--   select * from find_basket_arbs(0.004);
+create table if not exists event_basket_latest (
+  event_id          bigint primary key,
+  n_legs            int not null,          -- watch_markets 中该 event 的 market 数（N）
+  n_yes_quoted      int not null,          -- 已有 YES ask 的腿数
+  n_no_quoted       int not null,          -- 已有 NO ask 的腿数
+  sum_yes_ask       numeric,               -- 所有腿都有 YES ask 时才非空
+  sum_no_ask        numeric,               -- 所有腿都有 NO ask 时才非空
+  stalest_as_of     timestamptz,           -- 各腿（YES/NO）as_of 的最小值
+  stalest_asset_id  text,
+  yes_slack         numeric generated always as (1 - sum_yes_ask) stored,              -- > fees 即 BUY_YES_ALL
+  no_slack          numeric generated always as ((n_legs - 1) - sum_no_ask) stored,   -- > fees 即 BUY_NO_ALL
+  updated_at        timestamptz not null default now()
+);
+
+create index if not exists event_basket_latest_yes_slack_idx on event_basket_latest (yes_slack desc);
+create index if not exists event_basket_latest_no_slack_idx on event_basket_latest (no_slack desc);
+create index if not exists asset_price_latest_market_outcome_as_of_idx on asset_price_latest (market_id, outcome, as_of desc);
+
+create or replace function refresh_event_basket(p_event_id bigint) returns void
+language plpgsql as $$
+begin
+  insert into event_basket_latest as b (
+    event_id, n_legs, n_yes_quoted, n_no_quoted, sum_yes_ask, sum_no_ask, stalest_as_of, stalest_asset_id
+  )
+  with legs as (
+    -- 每个 watch market 一条腿：各取该 market 最新的 YES / NO 行
+    select y.asset_id as yes_id, y.best_ask as yes_ask, y.as_of as yes_as_of,
+           n.asset_id as no_id, n.best_ask as no_ask, n.as_of as no_as_of
+    from watch_markets wm
+    left join lateral (
+      select l.asset_id, l.best_ask, l.as_of from asset_price_latest l
+      where l.market_id = wm.market_id and l.outcome = 'YES'
+      order by l.as_of desc limit 1
+    ) y on true
+    left join lateral (
+      select l.asset_id, l.best_ask, l.as_of from asset_price_latest l
+      where l.market_id = wm.market_id and l.outcome = 'NO'
+      order by l.as_of desc limit 1
+    ) n on true
+    where wm.event_id = p_event_id
+  ),
+  stale as (
+    select v.asset_id, v.as_of
+    from legs cross join lateral (values (yes_id, yes_as_of), (no_id, no_as_of)) v(asset_id, as_of)
+    where v.as_of is not null
+    order by v.as_of asc
+    limit 1
+  )
+  select
+    p_event_id,
+    count(*),
+    count(yes_ask),
+    count(no_ask),
+    case when count(yes_ask) = count(*) then sum(yes_ask) end,
+    case when count(no_ask) = count(*) then sum(no_ask) end,
+    (select as_of from stale),
+    (select asset_id from stale)
+  from legs
+  having count(*) > 0
+  on conflict (event_id) do update set
+    n_legs = excluded.n_legs,
+    n_yes_quoted = excluded.n_yes_quoted,
+    n_no_quoted = excluded.n_no_quoted,
+    sum_yes_ask = excluded.sum_yes_ask,
+    sum_no_ask = excluded.sum_no_ask,
+    stalest_as_of = excluded.stalest_as_of,
+    stalest_asset_id = excluded.stalest_asset_id,
+    updated_at = now();
+
+  if not found then
+    -- event 已不在 watchlist
+    delete from event_basket_latest where event_id = p_event_id;
+  end if;
+end;
+$$;
+
+-- 批量模式：重算所有 watch event，并清理已移出 watchlist 的行
+create or replace function refresh_event_baskets() returns int
+language plpgsql as $$
+declare
+  r record;
+  n int := 0;
+begin
+  for r in select distinct event_id from watch_markets loop
+    perform refresh_event_basket(r.event_id);
+    n := n + 1;
+  end loop;
+  delete from event_basket_latest b
+  where not exists (select 1 from watch_markets wm where wm.event_id = b.event_id);
+  return n;
+end;
+$$;
+
+create or replace function trg_event_basket_from_latest() returns trigger
+language plpgsql as $$
+declare
+  r record;
+begin
+  for r in
+    select distinct wm.event_id
+    from new_rows nr
+    join watch_markets wm on wm.market_id = nr.market_id
+  loop
+    perform refresh_event_basket(r.event_id);
+  end loop;
+  return null;
+end;
+$$;
+
+create or replace function trg_event_basket_from_watch() returns trigger
+language plpgsql as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') then
+    perform refresh_event_basket(old.event_id);
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') then
+    perform refresh_event_basket(new.event_id);
+  end if;
+  return null;
+end;
+$$;
+
+-- insert ... on conflict do update 会同时触发 INSERT 和 UPDATE 的语句级触发器（各自的 transition table）；
+-- 稳定运行时整批都是 update，INSERT 那个的 new_rows 为空，不做任何重算
+drop trigger if exists asset_price_latest_basket_ins on asset_price_latest;
+create trigger asset_price_latest_basket_ins
+  after insert on asset_price_latest
+  referencing new table as new_rows
+  for each statement execute function trg_event_basket_from_latest();
+
+drop trigger if exists asset_price_latest_basket_upd on asset_price_latest;
+create trigger asset_price_latest_basket_upd
+  after update on asset_price_latest
+  referencing new table as new_rows
+  for each statement execute function trg_event_basket_from_latest();
+
+drop trigger if exists watch_markets_basket on watch_markets;
+create trigger watch_markets_basket
+  after insert or update or delete on watch_markets
+  for each row execute function trg_event_basket_from_watch();
+
+-- p_fees：整篮子的绝对费用（与价格同单位）；p_max_stale：可选，过滤最旧腿过旧的 event
+create or replace function find_basket_arbs(p_fees numeric default 0, p_max_stale interval default null)
+returns table (
+  event_id bigint,
+  kind text,
+  edge numeric,
+  n_legs int,
+  sum_ask numeric,
+  stalest_as_of timestamptz,
+  stalest_asset_id text
+)
+language sql stable as $$
+  select b.event_id, 'BUY_YES_ALL', b.yes_slack - p_fees, b.n_legs, b.sum_yes_ask, b.stalest_as_of, b.stalest_asset_id
+  from event_basket_latest b
+  where b.yes_slack > p_fees
+    and (p_max_stale is null or b.stalest_as_of >= now() - p_max_stale)
+  union all
+  select b.event_id, 'BUY_NO_ALL', b.no_slack - p_fees, b.n_legs, b.sum_no_ask, b.stalest_as_of, b.stalest_asset_id
+  from event_basket_latest b
+  where b.no_slack > p_fees
+    and (p_max_stale is null or b.stalest_as_of >= now() - p_max_stale)
+  order by 3 desc
+$$;
+
+-- ---------- 滚动 K 线（采集端内存聚合，写完整的 bar）：研究/看板不再扫 asset_price_ticks ----------
+-- interval_s：1（秒线）/ 60（分钟线）…；bucket 为区间起点。只有有更新的区间才有行。
+-- 同一 bar 重启后可能再写一次（半根 + 半根）：写入时按 open 取旧、high/low 取极值、close 取新、n 累加合并。
+create table if not exists asset_price_bars (
+  asset_id          text not null,
+  interval_s        int not null,
+  bucket            timestamptz not null,
+  market_id         bigint,
+  outcome           text,
+  bid_open          numeric,
+  bid_high          numeric,
+  bid_low           numeric,
+  bid_close         numeric,
+  ask_open          numeric,
+  ask_high          numeric,
+  ask_low           numeric,
+  ask_close         numeric,
+  spread_min        numeric,
+  spread_max        numeric,
+  n_updates         int not null,
+  primary key (asset_id, interval_s, bucket)
+);
+
+create index if not exists asset_price_bars_market_id_bucket_idx on asset_price_bars (market_id, interval_s, bucket desc);
+
+create table if not exists event_basket_bars (
+  event_id          bigint not null,
+  interval_s        int not null,
+  bucket            timestamptz not null,
+  sum_yes_ask_open  numeric,
+  sum_yes_ask_min   numeric,
+  sum_yes_ask_close numeric,
+  sum_no_ask_open   numeric,
+  sum_no_ask_min    numeric,
+  sum_no_ask_close  numeric,
+  n_updates         int not null,
+  primary key (event_id, interval_s, bucket)
+);
+
+-- ---------- L2 深度快照（前 K 档，紧凑二进制，见 polymarket_pgsql.depth_codec）：滑点研究用 ----------
+-- kind：0=key 帧（完整前 K 档）/ 1=delta 帧（相对同一 asset 上一帧的改动）；seq 为采集进程内该 asset 的帧序号。
+-- 解码某时刻的深度：从 as_of 之前最近的 key 帧开始按 (as_of, seq) 顺序往后应用 delta。
+create table if not exists asset_depth_snapshots (
+  asset_id          text not null,
+  as_of             timestamptz not null,
+  seq               bigint not null,
+  kind              smallint not null,
+  levels            smallint not null,
+  payload           bytea not null,
+  primary key (asset_id, as_of, seq)
+);
+
+create index if not exists asset_depth_snapshots_key_idx on asset_depth_snapshots (asset_id, as_of desc) where kind = 0;
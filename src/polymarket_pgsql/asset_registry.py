@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import psycopg
+from psycopg.types.json import Jsonb
+
+from polymarket_pgsql.gmp import MarketTokens
+
+# asset id 驻留表（interning）：asset id 是 70+ 位的十进制字符串，
+# books / 篮子 / K 线 / 写库各自按它做 dict 查找，
+# 每条 WS 消息都要对新解码出的字符串重新 hash 好几次。
+# - 入口处（WS 消息解码后）只查一次 key(asset_id)，
+#   得到本进程内稠密的整数 key（0..n-1，按登记顺序）；
+#   之后 books、篮子腿、K 线、写库缓冲都用这个整数，元数据按 key 直接取 meta[key]（列表下标）
+# - AssetMeta 是紧凑的 slots 记录：market / event / outcome / 腿序号；
+#   asset_id 字符串全进程只留这一份
+# - persist() 把映射写进 asset_registry（asset_id -> 库内稳定的 asset_key + 元数据），
+#   重启 / 其它进程按 asset_key 关联；本进程的 key 只在进程内有效（不同运行订阅的 asset 集合不同）
+# 行情表（asset_price_*）仍按 asset_id 文本存，兼容现有查询 / 导出 / 回放。
+
+OUTCOMES = ("YES", "NO")
+
+# 只对新 asset 做 insert：identity 序列只在真正插入时取号
+# （insert ... on conflict 每行都会消耗一个号），asset_key 保持稠密；已有的行元数据变了才 update
+_PERSIST_SQL = """
+with r as (
+  select d->>'asset_id' as asset_id,
+         (d->>'market_id')::bigint as market_id,
+         (d->>'event_id')::bigint as event_id,
+         d->>'outcome' as outcome, (d->>'leg')::int as leg, n
+  from jsonb_array_elements(%s::jsonb) with ordinality as x(d, n)
+), upd as (
+  update asset_registry a set
+    market_id = r.market_id,
+    event_id = coalesce(r.event_id, a.event_id),
+    outcome = r.outcome,
+    leg = r.leg,
+    updated_at = now()
+  from r
+  where a.asset_id = r.asset_id
+    and (a.market_id, a.event_id, a.outcome, a.leg)
+        is distinct from (r.market_id, coalesce(r.event_id, a.event_id), r.outcome, r.leg)
+  returning 1
+), ins as (
+  insert into asset_registry (asset_id, market_id, event_id, outcome, leg)
+  select r.asset_id, r.market_id, r.event_id, r.outcome, r.leg
+  from r
+  where not exists (select 1 from asset_registry a where a.asset_id = r.asset_id)
+  order by r.n  -- 新 asset 按登记顺序取号
+  on conflict (asset_id) do nothing
+  returning 1
+)
+select (select count(*) from upd) + (select count(*) from ins)
+"""
+
+
+@dataclass(slots=True, frozen=True)
+class AssetMeta:
+    """
+    Compact per-asset record; key is the asset's index in its AssetRegistry.
+    """
+
+    key: int
+    asset_id: str
+    market_id: int
+    outcome: str  # 'YES' / 'NO'
+    event: int  # 登记时的 event 下标（PipelineConfig.events 的位置）
+    leg: int  # event 内第几个 market（篮子腿序号）
+    event_id: Optional[int] = None
+
+
+class AssetRegistry:
+    """
+    Asset id -> dense int key, with AssetMeta per key.
+
+    key() is the only string lookup (do it once at ingress); everything downstream indexes
+    meta / ids by the int.
+    """
+
+    __slots__ = ("ids", "meta", "_keys")
+
+    def __init__(self) -> None:
+        self.ids: List[str] = []  # key -> asset_id
+        self.meta: List[AssetMeta] = []  # key -> AssetMeta
+        self._keys: Dict[str, int] = {}
+
+    @classmethod
+    def from_events(
+        cls, events: Iterable[Tuple[Optional[int], Sequence[MarketTokens]]]
+    ) -> AssetRegistry:
+        """
+        Register the YES then NO asset of every leg, event by event (so keys follow event order).
+        """
+        reg = cls()
+        for event_id, tokens in events:
+            reg.add_event(event_id, tokens)
+        return reg
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, asset_id: str) -> bool:
+        return asset_id in self._keys
+
+    def __iter__(self) -> Iterator[AssetMeta]:
+        return iter(self.meta)
+
+    def __getitem__(self, key: int) -> AssetMeta:
+        return self.meta[key]
+
+    @property
+    def n_events(self) -> int:
+        return self.meta[-1].event + 1 if self.meta else 0
+
+    def key(self, asset_id: str) -> Optional[int]:
+        return self._keys.get(asset_id)
+
+    def meta_of(self, asset_id: str) -> Optional[AssetMeta]:
+        k = self._keys.get(asset_id)
+        return None if k is None else self.meta[k]
+
+    def intern(
+        self,
+        asset_id: str,
+        *,
+        market_id: int,
+        outcome: str,
+        event: int = 0,
+        leg: int = 0,
+        event_id: Optional[int] = None,
+    ) -> AssetMeta:
+        """
+        Key of asset_id, registering it on first sight; an asset keeps its first metadata.
+        """
+        k = self._keys.get(asset_id)
+        if k is not None:
+            return self.meta[k]
+        outcome = outcome.upper()
+        if outcome not in OUTCOMES:
+            raise ValueError(f"outcome must be YES or NO, got {outcome!r}")
+        k = len(self.ids)
+        m = AssetMeta(
+            key=k,
+            asset_id=asset_id,
+            market_id=int(market_id),
+            outcome=outcome,
+            event=event,
+            leg=leg,
+            event_id=event_id,
+        )
+        self._keys[asset_id] = k
+        self.ids.append(asset_id)
+        self.meta.append(m)
+        return m
+
+    def add_event(self, event_id: Optional[int], tokens: Sequence[MarketTokens]) -> List[int]:
+        """
+        Register one event's legs as a new event index; returns the keys in (YES, NO) per leg order.
+        """
+        e = self.n_events
+        keys: List[int] = []
+        for leg, t in enumerate(tokens):
+            for outcome in OUTCOMES:
+                m = self.intern(
+                    t.asset_for(outcome),
+                    market_id=t.market_id,
+                    outcome=outcome,
+                    event=e,
+                    leg=leg,
+                    event_id=event_id,
+                )
+                keys.append(m.key)
+        return keys
+
+    def persist(self, conn: psycopg.Connection[Any]) -> int:
+        """
+        UPSERT the mapping into asset_registry in one statement; returns rows inserted or changed.
+        """
+        if not self.meta:
+            return 0
+        rows = [
+            {
+                "asset_id": m.asset_id,
+                "market_id": m.market_id,
+                "event_id": m.event_id,
+                "outcome": m.outcome,
+                "leg": m.leg,
+            }
+            for m in self.meta
+        ]
+        row = conn.execute(_PERSIST_SQL, (Jsonb(rows),)).fetchone()
+        return int(row[0]) if row else 0
+
+    def db_keys(self, conn: psycopg.Connection[Any]) -> List[Optional[int]]:
+        """
+        Stable asset_key of every local key (None for assets not persisted yet).
+        """
+        found = dict(
+            conn.execute(
+                "select asset_id, asset_key from asset_registry where asset_id = any(%s)",
+                (self.ids,),
+            ).fetchall()
+        )
+        return [found.get(aid) for aid in self.ids]
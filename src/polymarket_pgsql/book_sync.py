@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from polymarket_pgsql.clob_rest import ClobRestClient
+from polymarket_pgsql.clob_ws import FixedBook, OrderBookState, apply_market_event
+
+# 盘口一致性校验 + 按 asset 定向重同步（不断整条 WS）：
+# - 序号：消息 timestamp（毫秒）按 asset 单调；消息带 seq/sequence 字段时检查是否连续
+# - 回显：price_change / best_bid_ask 带着服务端的 best_bid/best_ask，
+#   应用后与本地深度算出的最优价比对；同一条消息里同一 asset 的多笔变化中间态可能对不上，
+#   所以连续 confirm 次不一致才算漂移
+# - 交叉盘：快照 / 增量后本地 best_bid >= best_ask
+# - 过期：连接还活着，但某个 asset 超过 stale_after_s 没有任何消息
+# （快照 hash 无法由增量复算，只记录下来供排查。）
+# 发现漂移后只对该 asset 发 REST /book（线程里跑，不阻塞事件循环）；期间该 asset 的 WS 消息先缓存，
+# 快照装好后丢掉 timestamp 不晚于快照的部分、重放其余的。其它 asset 照常流式更新。
+
+Buffered = Tuple[datetime, Dict[str, Any], Optional[int]]  # (as_of, event, timestamp ms)
+
+
+def _int(x: Any) -> Optional[int]:
+    if x is None:
+        return None
+    try:
+        return int(x)
+    except (TypeError, ValueError):
+        return None
+
+
+def _log(msg: str) -> None:
+    print(msg, flush=True)
+
+
+def _crossed(st: Any) -> bool:
+    if isinstance(st, FixedBook):
+        bid, ask = st.best_bid_units, st.best_ask_units
+    else:
+        bid, ask = st.top.best_bid, st.top.best_ask
+    return bid is not None and ask is not None and bid >= ask
+
+
+@dataclass
+class AssetSync:
+    """
+    Integrity state of one asset's book.
+    """
+
+    last_ts_ms: Optional[int] = None
+    last_seq: Optional[int] = None
+    rest_ts_ms: Optional[int] = None  # 最近一次 REST 快照的时间；不晚于它的 WS 消息已包含在快照里
+    snapshot_hash: Optional[str] = None
+    last_msg_at: float = field(default_factory=time.monotonic)
+    mismatches: int = 0  # 连续的回显不一致次数
+    drifted: bool = False  # 已判定漂移、等待重同步（同一次漂移只计一次）
+    resyncing: bool = False
+    buffered: List[Buffered] = field(default_factory=list)
+    last_resync_at: float = float("-inf")
+    drifts: int = 0
+    resyncs: int = 0
+    last_reason: Optional[str] = None
+
+
+class BookSync:
+    """
+    Books for a set of assets with per-asset integrity checks and targeted REST resync.
+
+    on_event() applies one normalized WS event and returns the book (None while that asset is
+    being resynced, or if the event is already covered by its REST snapshot). poll() installs
+    finished snapshots, triggers stale checks, and returns the asset ids whose books were replaced
+    so callers can refresh whatever they derive from them. Without a client, drift is only counted.
+
+    Assets may be keyed by asset_registry ints instead of asset id strings: asset_id_of maps a key
+    back to the id for the REST call and log lines.
+    """
+
+    def __init__(
+        self,
+        *,
+        client: Optional[ClobRestClient] = None,
+        books: Optional[Dict[Any, Any]] = None,
+        book_factory: Callable[[], Any] = OrderBookState,
+        asset_ids: Iterable[Any] = (),
+        asset_id_of: Optional[Callable[[Any], str]] = None,
+        stale_after_s: float = 0.0,
+        confirm: int = 2,
+        cooldown_s: float = 2.0,
+        max_inflight: int = 4,
+        log: Callable[[str], None] = _log,
+    ) -> None:
+        self.client = client
+        self.books: Dict[Any, Any] = books if books is not None else {}
+        self.book_factory = book_factory
+        self.asset_id_of: Callable[[Any], str] = asset_id_of or str
+        self.stale_after_s = stale_after_s
+        self.confirm = max(1, confirm)
+        self.cooldown_s = cooldown_s
+        self.max_inflight = max_inflight
+        self.log = log
+        self.assets: Dict[Any, AssetSync] = {aid: AssetSync() for aid in asset_ids}
+        self._tasks: Dict[Any, asyncio.Future[Dict[str, Any]]] = {}
+        self._deferred: Dict[Any, str] = {}  # asset -> reason，等冷却/并发额度
+        self._last_stale_check = time.monotonic()
+        self.n_drifts = 0
+        self.n_resyncs = 0
+        self.n_failures = 0
+
+    # ---- WS side ----
+    def on_event(self, as_of: datetime, asset_id: Any, ev: Dict[str, Any]) -> Optional[Any]:
+        s = self.assets.get(asset_id)
+        if s is None:
+            s = self.assets[asset_id] = AssetSync()
+        raw = ev.get("raw")
+        ts = _int(raw.get("timestamp")) if isinstance(raw, dict) else None
+        s.last_msg_at = time.monotonic()
+        if s.resyncing:
+            s.buffered.append((as_of, ev, ts))
+            return None
+        return self._apply(asset_id, s, as_of, ev, ts)
+
+    def _apply(
+        self, asset_id: Any, s: AssetSync, as_of: datetime, ev: Dict[str, Any], ts: Optional[int]
+    ) -> Optional[Any]:
+        st = self.books.get(asset_id)
+        if st is None:
+            st = self.books[asset_id] = self.book_factory()
+        raw = ev.get("raw")
+        raw = raw if isinstance(raw, dict) else {}
+        seq = _int(raw.get("seq", raw.get("sequence")))
+        kind = ev.get("kind")
+        reason: Optional[str] = None
+        if kind == "snapshot":
+            s.drifted = False
+            s.rest_ts_ms = None
+            s.snapshot_hash = raw.get("hash")
+            s.mismatches = 0
+            s.last_ts_ms = ts
+            s.last_seq = seq
+            apply_market_event(st, ev, as_of=as_of)
+            if _crossed(st):
+                reason = "crossed"
+        else:
+            if ts is not None and s.rest_ts_ms is not None and ts <= s.rest_ts_ms:
+                return None
+            if ts is not None and s.last_ts_ms is not None and ts < s.last_ts_ms:
+                reason = "out_of_order"
+            if seq is not None:
+                if s.last_seq is not None and seq != s.last_seq + 1:
+                    reason = reason or "seq_gap"
+                s.last_seq = seq
+            if ts is not None and (s.last_ts_ms is None or ts > s.last_ts_ms):
+                s.last_ts_ms = ts
+            apply_market_event(st, ev, as_of=as_of)
+            if kind == "top":
+                if st.verify_top(ev.get("best_bid"), ev.get("best_ask")):
+                    s.mismatches = 0
+                else:
+                    s.mismatches += 1
+                    if s.mismatches >= self.confirm:
+                        reason = reason or "top_mismatch"
+            elif _crossed(st):
+                reason = reason or "crossed"
+        if reason is not None:
+            self.drift(asset_id, reason)
+        return st
+
+    # ---- drift / resync ----
+    def drift(self, asset_id: Any, reason: str) -> None:
+        """
+        Mark one asset's book as untrustworthy and schedule a REST resync for it.
+
+        Other assets are unaffected.
+        """
+        s = self.assets.setdefault(asset_id, AssetSync())
+        s.mismatches = 0
+        if s.drifted:
+            return
+        s.drifted = True
+        s.drifts += 1
+        s.last_reason = reason
+        self.n_drifts += 1
+        if self.client is None:
+            s.drifted = False  # 不重同步：只计数，下一次不一致再计
+            return
+        self._deferred[asset_id] = reason
+        self._start_due()
+
+    def _start_due(self) -> None:
+        if not self._deferred:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # 没有事件循环（离线回放等）：留到下次 poll
+        assert self.client is not None
+        now = time.monotonic()
+        for aid, reason in list(self._deferred.items()):
+            if len(self._tasks) >= self.max_inflight:
+                break
+            s = self.assets[aid]
+            if now - s.last_resync_at < self.cooldown_s:
+                continue
+            del self._deferred[aid]
+            s.resyncing = True
+            s.last_resync_at = now
+            asset_id = self.asset_id_of(aid)
+            self._tasks[aid] = loop.run_in_executor(None, self.client.get_book, asset_id)
+            self.log(
+                f"[sync] asset …{asset_id[-12:]} drift={reason} -> REST /book resync "
+                f"(in flight {len(self._tasks)})"
+            )
+
+    def poll(self) -> List[Any]:
+        """
+        Install finished REST snapshots (replaying buffered WS events) and run stale checks.
+
+        Returns the asset ids (or registry keys) whose books were replaced.
+        """
+        now = time.monotonic()
+        if self.stale_after_s > 0 and now - self._last_stale_check >= 1.0:
+            self._last_stale_check = now
+            for aid, s in self.assets.items():
+                if not s.resyncing and now - s.last_msg_at > self.stale_after_s:
+                    s.last_msg_at = now  # 每个过期周期只触发一次
+                    self.drift(aid, "stale")
+        done: List[Any] = []
+        if self._tasks:
+            for aid in [a for a, t in self._tasks.items() if t.done()]:
+                task = self._tasks.pop(aid)
+                s = self.assets[aid]
+                try:
+                    snap = task.result()
+                except Exception as e:
+                    self.n_failures += 1
+                    self.log(
+                        f"[sync] asset …{self.asset_id_of(aid)[-12:]} REST /book 失败："
+                        f"{type(e).__name__}: {e}（稍后重试）"
+                    )
+                    self._resume(aid, s, None)
+                    self._deferred[aid] = "retry"
+                    continue
+                self._resume(aid, s, snap)
+                done.append(aid)
+        self._start_due()
+        return done
+
+    def _resume(self, asset_id: Any, s: AssetSync, snap: Optional[Dict[str, Any]]) -> None:
+        if snap is not None:
+            ts = _int(snap.get("timestamp"))
+            st = self.books.get(asset_id)
+            if st is None:
+                st = self.books[asset_id] = self.book_factory()
+            raw = {**snap, "source": "rest_resync"}
+            apply_market_event(
+                st,
+                {"kind": "snapshot", "bids": snap["bids"], "asks": snap["asks"], "raw": raw},
+                as_of=datetime.now(timezone.utc),
+            )
+            s.rest_ts_ms = ts
+            s.last_ts_ms = ts
+            s.last_seq = None
+            s.snapshot_hash = snap.get("hash")
+            s.mismatches = 0
+            s.drifted = False
+            s.resyncs += 1
+            self.n_resyncs += 1
+        s.resyncing = False
+        buffered, s.buffered = s.buffered, []
+        for as_of, ev, ts_b in buffered:
+            self._apply(asset_id, s, as_of, ev, ts_b)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    def summary(self) -> str:
+        return (
+            f"drifts={self.n_drifts} resyncs={self.n_resyncs} failures={self.n_failures} "
+            f"in_flight={self.in_flight}"
+        )
+
+    def close(self) -> None:
+        for t in self._tasks.values():
+            t.cancel()
+        self._tasks.clear()
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import psycopg
+from psycopg.types.json import Jsonb
+
+from polymarket_pgsql.clob_ws import OrderBookState, OrderBookTop
+from polymarket_pgsql.gmp import MarketTokens
+from polymarket_pgsql.paper_ledger import PaperLedger, Position
+
+# 引擎状态 checkpoint（快速重启用）：
+# - 各 asset 的 top-of-book、market token 映射（重启时不必再查 Gamma）、开着的篮子仓位、
+#   账本持仓/PnL、计数器
+# - 本地文件：JSON，先写 .tmp 再 os.replace，崩溃时不会留下半个文件
+# - PG：存到 sync_state（source = 'engine:<event_id>'），多机/换机时也能恢复
+# 启动时先用 checkpoint，再用 asset_price_latest 里更新的行覆盖，WS 首个快照到达前就能给出有效信号。
+
+CHECKPOINT_VERSION = 1
+
+
+def _dec(x: Optional[str]) -> Optional[Decimal]:
+    return None if x is None else Decimal(x)
+
+
+def _str(x: Optional[Decimal]) -> Optional[str]:
+    return None if x is None else str(x)
+
+
+def _ts(x: str) -> datetime:
+    return datetime.fromisoformat(x)
+
+
+@dataclass
+class EngineCheckpoint:
+    event_id: int
+    saved_at: datetime
+    tokens: List[MarketTokens] = field(default_factory=list)
+    tops: Dict[str, OrderBookTop] = field(default_factory=dict)  # asset_id -> top (raw is not kept)
+    baskets: List[Dict[str, Any]] = field(default_factory=list)  # open basket positions, JSON-ready
+    positions: List[Position] = field(default_factory=list)  # ledger positions
+    counters: Dict[str, int] = field(default_factory=dict)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version": CHECKPOINT_VERSION,
+            "event_id": self.event_id,
+            "saved_at": self.saved_at.isoformat(),
+            "tokens": [asdict(t) for t in self.tokens],
+            "tops": {
+                aid: [_str(t.best_bid), _str(t.best_ask), t.as_of.isoformat()]
+                for aid, t in self.tops.items()
+            },
+            "baskets": self.baskets,
+            "positions": [
+                [
+                    p.market_id,
+                    p.outcome,
+                    str(p.qty),
+                    str(p.avg_price),
+                    str(p.realized_pnl),
+                    str(p.fees),
+                ]
+                for p in self.positions
+            ],
+            "counters": self.counters,
+        }
+
+    @classmethod
+    def from_json(cls, obj: Dict[str, Any]) -> EngineCheckpoint:
+        if obj.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"unsupported checkpoint version: {obj.get('version')!r}")
+        return cls(
+            event_id=int(obj["event_id"]),
+            saved_at=_ts(obj["saved_at"]),
+            tokens=[MarketTokens(**t) for t in obj.get("tokens") or []],
+            tops={
+                aid: OrderBookTop(
+                    best_bid=_dec(bid), best_ask=_dec(ask), as_of=_ts(as_of), raw=None
+                )
+                for aid, (bid, ask, as_of) in (obj.get("tops") or {}).items()
+            },
+            baskets=list(obj.get("baskets") or []),
+            positions=[
+                Position(
+                    market_id=int(m),
+                    outcome=str(o),
+                    qty=Decimal(q),
+                    avg_price=Decimal(a),
+                    realized_pnl=Decimal(r),
+                    fees=Decimal(f),
+                )
+                for m, o, q, a, r, f in obj.get("positions") or []
+            ],
+            counters={k: int(v) for k, v in (obj.get("counters") or {}).items()},
+        )
+
+
+def capture(
+    *,
+    event_id: int,
+    tokens: List[MarketTokens],
+    books: Dict[str, OrderBookState],
+    ledger: Optional[PaperLedger] = None,
+    baskets: Optional[List[Dict[str, Any]]] = None,
+    counters: Optional[Dict[str, int]] = None,
+) -> EngineCheckpoint:
+    """
+    Snapshot the engine state (book tops only; depth is rebuilt from the first WS snapshot).
+    """
+    return EngineCheckpoint(
+        event_id=event_id,
+        saved_at=datetime.now(timezone.utc),
+        tokens=list(tokens),
+        tops={
+            aid: st.top
+            for aid, st in books.items()
+            if st.top.best_bid is not None or st.top.best_ask is not None
+        },
+        baskets=list(baskets or []),
+        positions=[
+            Position(
+                market_id=p.market_id,
+                outcome=p.outcome,
+                qty=p.qty,
+                avg_price=p.avg_price,
+                realized_pnl=p.realized_pnl,
+                fees=p.fees,
+            )
+            for p in (ledger.positions.values() if ledger is not None else [])
+        ],
+        counters=dict(counters or {}),
+    )
+
+
+# ---- local file ----
+def save_file(path: str, cp: EngineCheckpoint) -> None:
+    tmp = f"{path}.tmp"
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cp.to_json(), f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load_file(path: str) -> Optional[EngineCheckpoint]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return EngineCheckpoint.from_json(json.load(f))
+    except FileNotFoundError:
+        return None
+
+
+# ---- PG (sync_state) ----
+def pg_source(event_id: int) -> str:
+    return f"engine:{event_id}"
+
+
+def save_pg(conn: psycopg.Connection[Any], cp: EngineCheckpoint) -> None:
+    conn.execute(
+        """
+        insert into sync_state (source, checkpoint) values (%s, %s)
+        on conflict (source) do update set checkpoint = excluded.checkpoint, updated_at = now()
+        """,
+        (pg_source(cp.event_id), Jsonb(cp.to_json())),
+    )
+
+
+def load_pg(conn: psycopg.Connection[Any], event_id: int) -> Optional[EngineCheckpoint]:
+    row = conn.execute(
+        "select checkpoint from sync_state where source = %s", (pg_source(event_id),)
+    ).fetchone()
+    if row is None:
+        return None
+    return EngineCheckpoint.from_json(row[0])
+
+
+def latest_tops(conn: psycopg.Connection[Any], asset_ids: Iterable[str]) -> Dict[str, OrderBookTop]:
+    """
+    Tops from asset_price_latest for the given assets (what the last run flushed).
+    """
+    rows = conn.execute(
+        "select asset_id, best_bid, best_ask, as_of from asset_price_latest "
+        "where asset_id = any(%s)",
+        (list(asset_ids),),
+    ).fetchall()
+    return {
+        str(aid): OrderBookTop(
+            best_bid=bid, best_ask=ask, as_of=as_of, raw={"seed": "asset_price_latest"}
+        )
+        for aid, bid, ask, as_of in rows
+    }
+
+
+def seed_books(
+    books: Dict[str, OrderBookState],
+    tops: Dict[str, OrderBookTop],
+    *,
+    max_age_s: Optional[float] = None,
+    now: Optional[datetime] = None,
+    factory: Callable[[], Any] = OrderBookState,
+) -> List[str]:
+    """
+    Install seed tops into books where they are newer than what the book has; returns seeded ids.
+
+    factory builds missing books (e.g. FixedBook in fixed-point mode).
+
+    Tops older than max_age_s are skipped: a stale seed is worse than waiting for the WS.
+    """
+    now = now or datetime.now(timezone.utc)
+    seeded: List[str] = []
+    for aid, top in tops.items():
+        if max_age_s is not None and (now - top.as_of).total_seconds() > max_age_s:
+            continue
+        st = books.get(aid)
+        if st is None:
+            st = books[aid] = factory()
+        if st.top.raw is not None and st.top.as_of >= top.as_of:
+            continue
+        st.apply_top(
+            best_bid=top.best_bid,
+            best_ask=top.best_ask,
+            as_of=top.as_of,
+            raw=top.raw or {"seed": "checkpoint"},
+        )
+        seeded.append(aid)
+    return seeded
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+import httpx
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+
+class ClobRestClient:
+    """
+    Minimal CLOB REST client for order book snapshots (public endpoints, no auth).
+
+    Base URL is typically https://clob.polymarket.com; point it at a local stand-in
+    (scripts/sim_market_ws.py serve also answers GET /book) for testing.
+    """
+
+    def __init__(self, base_url: str, timeout_s: float = 10.0) -> None:
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.Client(timeout=timeout_s, headers={"accept": "application/json"})
+
+    def close(self) -> None:
+        self._client.close()
+
+    @retry(wait=wait_exponential(min=0.2, max=2), stop=stop_after_attempt(3), reraise=True)
+    def get_json(self, path: str, params: Dict[str, Any]) -> Any:
+        resp = self._client.get(f"{self.base_url}{path}", params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    def get_book(self, token_id: str) -> Dict[str, Any]:
+        """
+        GET /book?token_id=...: {"asset_id","market","timestamp","hash","bids":[...],"asks":[...]}.
+        """
+        book = self.get_json("/book", {"token_id": token_id})
+        if (
+            not isinstance(book, dict)
+            or not isinstance(book.get("bids"), list)
+            or not isinstance(book.get("asks"), list)
+        ):
+            raise RuntimeError(f"CLOB /book?token_id={token_id} 返回格式不对：{str(book)[:200]}")
+        return book
+
@@ -2,13 +2,24 @@ from __future__ import annotations
 
 import asyncio
 import json
+import sys
+from bisect import bisect_left, bisect_right
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
 
 import websockets
 
+from polymarket_pgsql.fixedpoint import (
+    MONEY_SCALE,
+    PRICE_SCALE,
+    SIZE_SCALE,
+    parse_units,
+    to_decimal,
+)
+
 
 def utc_now() -> datetime:
     return datetime.now(timezone.utc)
@@ -25,6 +36,24 @@ def _to_decimal(x: Any) -> Optional[Decimal]:
         return None
 
 
+# 价格落在 tick 网格上，各 book 之间大量重复：
+# 按原始字符串缓存同一个 Decimal 对象（Decimal 不可变，可共享），
+# 每个档位省掉一个 Decimal，也省掉一次解析；数量各不相同，不缓存
+_PRICES: Dict[str, Decimal] = {}
+_PRICES_MAX = 1 << 16
+
+
+def _to_price(x: Any) -> Optional[Decimal]:
+    if type(x) is not str:
+        return _to_decimal(x)
+    d = _PRICES.get(x)
+    if d is None:
+        d = _to_decimal(x)
+        if d is not None and len(_PRICES) < _PRICES_MAX:
+            _PRICES[x] = d
+    return d
+
+
 def _parse_level(level: Any) -> Optional[Tuple[Decimal, Decimal]]:
     """
     Try to parse a single book level into (price, size).
@@ -35,14 +64,14 @@ def _parse_level(level: Any) -> Optional[Tuple[Decimal, Decimal]]:
     - {"price": "0.12", "quantity": "100"}
     """
     if isinstance(level, (list, tuple)) and len(level) >= 2:
-        p = _to_decimal(level[0])
+        p = _to_price(level[0])
         s = _to_decimal(level[1])
         if p is None or s is None:
             return None
         return p, s
 
     if isinstance(level, Mapping):
-        p = _to_decimal(level.get("price"))
+        p = _to_price(level.get("price"))
         s = _to_decimal(level.get("size"))
         if s is None:
             s = _to_decimal(level.get("quantity"))
@@ -72,7 +101,40 @@ def _best_from_levels(levels: Iterable[Any], *, side: str) -> Optional[Decimal]:
     return best
 
 
-@dataclass
+# 每个 book 在 top.raw 里留多少原始消息（也是写进 jsonb 的 raw）：
+# - full   ：整条消息；快照消息带整份 bids/asks 数组，每个 asset 都常驻一份
+#            （深度 10 时约 5KB/asset）
+# - trimmed：只留标量字段
+#            （event_type / asset_id / market / timestamp / hash / best_bid / best_ask …），
+#            去掉数组与嵌套对象；本来就没有数组的消息（price_change 拆出来的每条）原样保留、不拷贝
+# - none   ：不留，top.raw 为 None
+RAW_RETENTION_MODES = ("none", "trimmed", "full")
+DEFAULT_RAW_RETENTION = "trimmed"
+
+
+def _check_retention(mode: str) -> str:
+    if mode not in RAW_RETENTION_MODES:
+        raise ValueError(f"raw_retention must be one of {RAW_RETENTION_MODES}: {mode!r}")
+    return mode
+
+
+def retain_raw(raw: Dict[str, Any], mode: str) -> Optional[Dict[str, Any]]:
+    """
+    What a book keeps of a message payload under a raw retention mode (see RAW_RETENTION_MODES).
+    """
+    if mode == "trimmed":
+        for v in raw.values():
+            if isinstance(v, (list, dict)):
+                return {k: v for k, v in raw.items() if not isinstance(v, (list, dict))}
+        return raw
+    if mode == "full":
+        return raw
+    if mode == "none":
+        return None
+    raise ValueError(f"raw_retention must be one of {RAW_RETENTION_MODES}: {mode!r}")
+
+
+@dataclass(slots=True)
 class OrderBookTop:
     best_bid: Optional[Decimal] = None
     best_ask: Optional[Decimal] = None
@@ -86,18 +148,176 @@ class OrderBookTop:
         return (self.best_bid + self.best_ask) / Decimal("2")
 
 
-@dataclass
+_ZERO = Decimal("0")
+_ONE = Decimal("1")
+
+
+def _best(levels: Mapping[Any, Any], pick: Any) -> Any:
+    # 增量路径会删掉 size=0 的档，通常直接对 key 取 max/min（C 里完成）；快照里带 0 档时再过滤
+    if not levels:
+        return None
+    p = pick(levels)
+    if levels[p] > 0:
+        return p
+    return pick((q for q, s in levels.items() if s > 0), default=None)
+
+
+def _echo_matches(ours: Any, echo: Any, empty: Any) -> bool:
+    # 行情回显的 best_bid/best_ask：缺字段不校验；空的一侧线上写成 "0"（bid）/ "1"（ask）
+    if echo is None:
+        return True
+    if ours is None:
+        return echo == empty
+    return ours == echo
+
+
+@dataclass(frozen=True)
+class DepthFill:
+    """
+    Result of walking one side of the book for `requested` size.
+
+    filled < requested if the depth ran out.
+    """
+
+    requested: Decimal
+    filled: Decimal
+    cost: Decimal  # sum(price * size) over the consumed levels
+    worst_price: Optional[Decimal]
+    levels: int
+
+    @property
+    def complete(self) -> bool:
+        return self.filled >= self.requested
+
+    @property
+    def vwap(self) -> Optional[Decimal]:
+        return self.cost / self.filled if self.filled > 0 else None
+
+
+@dataclass(frozen=True)
+class DepthLadder:
+    """
+    One side of the book, best price first, with cumulative size / notional prefix arrays.
+
+    keys are prices for asks and negated prices for bids, so both sides are ascending for bisect.
+    """
+
+    side: str
+    prices: List[Decimal]
+    keys: List[Decimal]
+    cum_size: List[Decimal]
+    cum_cost: List[Decimal]
+
+    @property
+    def total_size(self) -> Decimal:
+        return self.cum_size[-1] if self.cum_size else _ZERO
+
+    def size_to_price(self, price: Decimal) -> Decimal:
+        n = bisect_right(self.keys, price if self.side == "ask" else -price)
+        return self.cum_size[n - 1] if n else _ZERO
+
+    def walk(self, size: Decimal) -> DepthFill:
+        if size <= 0 or not self.prices:
+            return DepthFill(requested=size, filled=_ZERO, cost=_ZERO, worst_price=None, levels=0)
+        i = bisect_left(self.cum_size, size)
+        if i >= len(self.prices):
+            return DepthFill(
+                requested=size,
+                filled=self.cum_size[-1],
+                cost=self.cum_cost[-1],
+                worst_price=self.prices[-1],
+                levels=len(self.prices),
+            )
+        before_size = self.cum_size[i - 1] if i else _ZERO
+        before_cost = self.cum_cost[i - 1] if i else _ZERO
+        cost = before_cost + (size - before_size) * self.prices[i]
+        return DepthFill(
+            requested=size, filled=size, cost=cost, worst_price=self.prices[i], levels=i + 1
+        )
+
+
+@dataclass(slots=True)
 class OrderBookState:
     bids: Dict[Decimal, Decimal] = field(default_factory=dict)  # price -> size
     asks: Dict[Decimal, Decimal] = field(default_factory=dict)  # price -> size
     top: OrderBookTop = field(default_factory=OrderBookTop)
+    raw_retention: str = DEFAULT_RAW_RETENTION  # apply_market_event 往 top.raw 里留多少原始消息
+    # side -> DepthLadder；任何改动 bids/asks/top 的路径都会清空，查询时按需重建
+    _ladders: Dict[str, DepthLadder] = field(default_factory=dict, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        _check_retention(self.raw_retention)
 
     def _recompute_top(self, *, as_of: datetime, raw: Optional[Dict[str, Any]] = None) -> None:
         best_bid = max((p for p, s in self.bids.items() if s > 0), default=None)
         best_ask = min((p for p, s in self.asks.items() if s > 0), default=None)
         self.top = OrderBookTop(best_bid=best_bid, best_ask=best_ask, as_of=as_of, raw=raw)
+        self._ladders.clear()
+
+    # ---- depth queries ----
+    def ladder(self, side: str) -> DepthLadder:
+        """
+        Cached depth ladder for side "ask" (what a buyer walks) or "bid" (what a seller walks).
+
+        Levels better than the current top are skipped: top-only updates (best_bid_ask) can move
+        the top without telling us which levels were consumed.
+        """
+        lad = self._ladders.get(side)
+        if lad is not None:
+            return lad
+        if side == "ask":
+            limit = self.top.best_ask
+            levels = sorted(
+                (p, s) for p, s in self.asks.items() if s > 0 and (limit is None or p >= limit)
+            )
+        elif side == "bid":
+            limit = self.top.best_bid
+            levels = sorted(
+                ((p, s) for p, s in self.bids.items() if s > 0 and (limit is None or p <= limit)),
+                reverse=True,
+            )
+        else:
+            raise ValueError(f"side must be 'ask' or 'bid': {side!r}")
+        prices: List[Decimal] = []
+        cum_size: List[Decimal] = []
+        cum_cost: List[Decimal] = []
+        size_acc = _ZERO
+        cost_acc = _ZERO
+        for p, s in levels:
+            size_acc += s
+            cost_acc += p * s
+            prices.append(p)
+            cum_size.append(size_acc)
+            cum_cost.append(cost_acc)
+        keys = prices if side == "ask" else [-p for p in prices]
+        lad = DepthLadder(side=side, prices=prices, keys=keys, cum_size=cum_size, cum_cost=cum_cost)
+        self._ladders[side] = lad
+        return lad
+
+    def depth_to_price(self, side: str, price: Decimal) -> Decimal:
+        """
+        Cumulative size available at `price` or better (asks <= price, bids >= price).
+        """
+        return self.ladder(side).size_to_price(price)
+
+    def walk(self, side: str, size: Decimal) -> DepthFill:
+        return self.ladder(side).walk(size)
+
+    def vwap(self, side: str, size: Decimal) -> Optional[Decimal]:
+        """
+        Average fill price for `size` walked through `side`; None if the book is not deep enough.
+        """
+        f = self.ladder(side).walk(size)
+        return f.vwap if f.complete else None
 
-    def apply_snapshot(self, bids: Iterable[Any], asks: Iterable[Any], *, as_of: datetime, raw: Dict[str, Any]) -> None:
+    def apply_snapshot(
+        self,
+        bids: Iterable[Any],
+        asks: Iterable[Any],
+        *,
+        as_of: datetime,
+        raw: Optional[Dict[str, Any]],
+    ) -> None:
         self.bids.clear()
         self.asks.clear()
         for lvl in bids:
@@ -114,7 +334,9 @@ class OrderBookState:
             self.asks[p] = s
         self._recompute_top(as_of=as_of, raw=raw)
 
-    def apply_changes(self, changes: Iterable[Any], *, as_of: datetime, raw: Dict[str, Any]) -> None:
+    def apply_changes(
+        self, changes: Iterable[Any], *, as_of: datetime, raw: Optional[Dict[str, Any]]
+    ) -> None:
         """
         Apply incremental updates if server emits 'changes' style messages.
 
@@ -123,7 +345,14 @@ class OrderBookState:
         - ["sell", "0.13", "0"]   (ask delete)
         - {"side":"buy","price":"0.12","size":"100"}
         """
+        self.apply_levels(changes)
+        self._recompute_top(as_of=as_of, raw=raw)
 
+    def apply_levels(self, changes: Iterable[Any]) -> None:
+        """
+        Apply level updates (same formats as apply_changes) to depth only; top is left untouched.
+        """
+        self._ladders.clear()
         for ch in changes:
             side: Optional[str] = None
             price: Optional[Decimal] = None
@@ -131,11 +360,11 @@ class OrderBookState:
 
             if isinstance(ch, (list, tuple)) and len(ch) >= 3:
                 side = str(ch[0]).lower()
-                price = _to_decimal(ch[1])
+                price = _to_price(ch[1])
                 size = _to_decimal(ch[2])
             elif isinstance(ch, Mapping):
                 side = str(ch.get("side") or ch.get("type") or "").lower()
-                price = _to_decimal(ch.get("price"))
+                price = _to_price(ch.get("price"))
                 size = _to_decimal(ch.get("size") if "size" in ch else ch.get("quantity"))
 
             if side not in {"buy", "sell", "bid", "ask"}:
@@ -154,18 +383,273 @@ class OrderBookState:
                 else:
                     self.asks[price] = size
 
-        self._recompute_top(as_of=as_of, raw=raw)
-
     def apply_top(
         self,
         *,
         best_bid: Optional[Decimal],
         best_ask: Optional[Decimal],
         as_of: datetime,
-        raw: Dict[str, Any],
+        raw: Optional[Dict[str, Any]],
     ) -> None:
         # 不强制更新 bids/asks 全量深度；仅维护 top-of-book
         self.top = OrderBookTop(best_bid=best_bid, best_ask=best_ask, as_of=as_of, raw=raw)
+        self._ladders.clear()
+
+    def verify_top(self, best_bid: Any, best_ask: Any) -> bool:
+        """
+        True if the depth levels agree with a top echoed by the feed (price_change / best_bid_ask).
+        """
+        return (
+            _echo_matches(_best(self.bids, max), _opt_decimal(best_bid), _ZERO)
+            and _echo_matches(_best(self.asks, min), _opt_decimal(best_ask), _ONE)
+        )
+
+
+def _parse_level_units(level: Any) -> Optional[Tuple[int, int]]:
+    """
+    Same level formats as _parse_level, parsed straight into fixed-point units.
+    """
+    if isinstance(level, (list, tuple)) and len(level) >= 2:
+        p = parse_units(level[0])
+        s = parse_units(level[1])
+    elif isinstance(level, Mapping):
+        p = parse_units(level.get("price"))
+        s = parse_units(level.get("size"))
+        if s is None:
+            s = parse_units(level.get("quantity"))
+    else:
+        return None
+    if p is None or s is None:
+        return None
+    return p, s
+
+
+class FixedBook:
+    """
+    Integer twin of OrderBookState: levels and top kept in fixed-point units (see fixedpoint),
+    parsed once.
+
+    The Decimal read API (top, bids/asks, ladder, walk, vwap) is built on demand, so a FixedBook can
+    stand in for an OrderBookState at the output boundaries (DB writes, checkpoints, paper fills).
+    """
+
+    __slots__ = (
+        "bid_units",
+        "ask_units",
+        "best_bid_units",
+        "best_ask_units",
+        "as_of",
+        "raw",
+        "raw_retention",
+        "_top",
+        "_unit_ladders",
+        "_ladders",
+    )
+
+    def __init__(self, *, raw_retention: str = DEFAULT_RAW_RETENTION) -> None:
+        self.raw_retention = _check_retention(raw_retention)
+        self.bid_units: Dict[int, int] = {}
+        self.ask_units: Dict[int, int] = {}
+        self.best_bid_units: Optional[int] = None
+        self.best_ask_units: Optional[int] = None
+        self.as_of: datetime = utc_now()
+        self.raw: Optional[Dict[str, Any]] = None
+        self._top: Optional[OrderBookTop] = None
+        # side -> (prices, cum_size, cum_cost) in units；
+        # 和 OrderBookState._ladders 一样，任何改动都清空
+        self._unit_ladders: Dict[str, Tuple[List[int], List[int], List[int]]] = {}
+        self._ladders: Dict[str, DepthLadder] = {}
+
+    def _touch(self) -> None:
+        self._top = None
+        self._unit_ladders.clear()
+        self._ladders.clear()
+
+    # ---- Decimal views (output boundary) ----
+    @property
+    def top(self) -> OrderBookTop:
+        t = self._top
+        if t is None:
+            t = self._top = OrderBookTop(
+                best_bid=to_decimal(self.best_bid_units),
+                best_ask=to_decimal(self.best_ask_units),
+                as_of=self.as_of,
+                raw=self.raw,
+            )
+        return t
+
+    @property
+    def bids(self) -> Dict[Decimal, Decimal]:
+        return {
+            Decimal(p) / PRICE_SCALE: Decimal(s) / SIZE_SCALE for p, s in self.bid_units.items()
+        }
+
+    @property
+    def asks(self) -> Dict[Decimal, Decimal]:
+        return {
+            Decimal(p) / PRICE_SCALE: Decimal(s) / SIZE_SCALE for p, s in self.ask_units.items()
+        }
+
+    # ---- depth ----
+    def unit_ladder(self, side: str) -> Tuple[List[int], List[int], List[int]]:
+        """
+        (prices, cum_size, cum_cost) best first, in units.
+
+        Same level filtering as OrderBookState.ladder().
+        """
+        lad = self._unit_ladders.get(side)
+        if lad is not None:
+            return lad
+        if side == "ask":
+            limit = self.best_ask_units
+            levels = sorted(
+                (p, s) for p, s in self.ask_units.items() if s > 0 and (limit is None or p >= limit)
+            )
+        elif side == "bid":
+            limit = self.best_bid_units
+            levels = sorted(
+                (
+                    (p, s)
+                    for p, s in self.bid_units.items()
+                    if s > 0 and (limit is None or p <= limit)
+                ),
+                reverse=True,
+            )
+        else:
+            raise ValueError(f"side must be 'ask' or 'bid': {side!r}")
+        prices: List[int] = []
+        cum_size: List[int] = []
+        cum_cost: List[int] = []
+        size_acc = 0
+        cost_acc = 0
+        for p, s in levels:
+            size_acc += s
+            cost_acc += p * s
+            prices.append(p)
+            cum_size.append(size_acc)
+            cum_cost.append(cost_acc)
+        lad = self._unit_ladders[side] = (prices, cum_size, cum_cost)
+        return lad
+
+    def walk_units(self, side: str, size: int) -> Optional[int]:
+        """
+        Cost (MONEY_SCALE units) of trading `size` units through `side`.
+
+        None if the book is not deep enough.
+        """
+        prices, cum_size, cum_cost = self.unit_ladder(side)
+        if size <= 0:
+            return 0
+        i = bisect_left(cum_size, size)
+        if i >= len(prices):
+            return None
+        before_size = cum_size[i - 1] if i else 0
+        before_cost = cum_cost[i - 1] if i else 0
+        return before_cost + (size - before_size) * prices[i]
+
+    def ladder(self, side: str) -> DepthLadder:
+        lad = self._ladders.get(side)
+        if lad is not None:
+            return lad
+        prices_u, size_u, cost_u = self.unit_ladder(side)
+        prices = [Decimal(p) / PRICE_SCALE for p in prices_u]
+        lad = DepthLadder(
+            side=side,
+            prices=prices,
+            keys=prices if side == "ask" else [-p for p in prices],
+            cum_size=[Decimal(x) / SIZE_SCALE for x in size_u],
+            cum_cost=[Decimal(x) / MONEY_SCALE for x in cost_u],
+        )
+        self._ladders[side] = lad
+        return lad
+
+    def depth_to_price(self, side: str, price: Decimal) -> Decimal:
+        return self.ladder(side).size_to_price(price)
+
+    def walk(self, side: str, size: Decimal) -> DepthFill:
+        return self.ladder(side).walk(size)
+
+    def vwap(self, side: str, size: Decimal) -> Optional[Decimal]:
+        f = self.ladder(side).walk(size)
+        return f.vwap if f.complete else None
+
+    # ---- updates (same entry points as OrderBookState) ----
+    def _recompute_top(self, *, as_of: datetime, raw: Optional[Dict[str, Any]]) -> None:
+        self.best_bid_units = max((p for p, s in self.bid_units.items() if s > 0), default=None)
+        self.best_ask_units = min((p for p, s in self.ask_units.items() if s > 0), default=None)
+        self.as_of = as_of
+        self.raw = raw
+        self._touch()
+
+    def apply_snapshot(
+        self,
+        bids: Iterable[Any],
+        asks: Iterable[Any],
+        *,
+        as_of: datetime,
+        raw: Optional[Dict[str, Any]],
+    ) -> None:
+        self.bid_units.clear()
+        self.ask_units.clear()
+        for lvl in bids:
+            parsed = _parse_level_units(lvl)
+            if parsed is not None:
+                self.bid_units[parsed[0]] = parsed[1]
+        for lvl in asks:
+            parsed = _parse_level_units(lvl)
+            if parsed is not None:
+                self.ask_units[parsed[0]] = parsed[1]
+        self._recompute_top(as_of=as_of, raw=raw)
+
+    def apply_changes(
+        self, changes: Iterable[Any], *, as_of: datetime, raw: Optional[Dict[str, Any]]
+    ) -> None:
+        self.apply_levels(changes)
+        self._recompute_top(as_of=as_of, raw=raw)
+
+    def apply_levels(self, changes: Iterable[Any]) -> None:
+        self._touch()
+        for ch in changes:
+            if isinstance(ch, (list, tuple)) and len(ch) >= 3:
+                side = str(ch[0]).lower()
+                price = parse_units(ch[1])
+                size = parse_units(ch[2])
+            elif isinstance(ch, Mapping):
+                side = str(ch.get("side") or ch.get("type") or "").lower()
+                price = parse_units(ch.get("price"))
+                size = parse_units(ch.get("size") if "size" in ch else ch.get("quantity"))
+            else:
+                continue
+            if price is None or size is None:
+                continue
+            if side in {"buy", "bid"}:
+                book = self.bid_units
+            elif side in {"sell", "ask"}:
+                book = self.ask_units
+            else:
+                continue
+            if size <= 0:
+                book.pop(price, None)
+            else:
+                book[price] = size
+
+    def apply_top(
+        self, *, best_bid: Any, best_ask: Any, as_of: datetime, raw: Optional[Dict[str, Any]]
+    ) -> None:
+        """
+        best_bid / best_ask as Decimal or str (parsed to units), like OrderBookState.apply_top.
+        """
+        self.best_bid_units = parse_units(best_bid)
+        self.best_ask_units = parse_units(best_ask)
+        self.as_of = as_of
+        self.raw = raw
+        self._touch()
+
+    def verify_top(self, best_bid: Any, best_ask: Any) -> bool:
+        return (
+            _echo_matches(_best(self.bid_units, max), parse_units(best_bid), 0)
+            and _echo_matches(_best(self.ask_units, min), parse_units(best_ask), PRICE_SCALE)
+        )
 
 
 def extract_asset_id(msg: Mapping[str, Any]) -> Optional[str]:
@@ -182,6 +666,9 @@ def parse_market_channel_message(msg: Mapping[str, Any]) -> Tuple[Optional[str],
 
     normalized_event is one of:
     - {"kind":"snapshot","bids":[...],"asks":[...], "raw": msg}
+    - {"kind":"top","best_bid":...,"best_ask":..., "raw": msg}
+      (+ "changes":[{"side","price","size"}] when the message also carries the level that moved,
+       as price_change entries do)
     - {"kind":"changes","changes":[...], "raw": msg}
     """
     asset_id = extract_asset_id(msg)
@@ -194,7 +681,15 @@ def parse_market_channel_message(msg: Mapping[str, Any]) -> Tuple[Optional[str],
 
     # top-of-book style
     if "best_bid" in msg or "best_ask" in msg:
-        return asset_id, {"kind": "top", "best_bid": msg.get("best_bid"), "best_ask": msg.get("best_ask"), "raw": dict(msg)}
+        ev = {
+            "kind": "top",
+            "best_bid": msg.get("best_bid"),
+            "best_ask": msg.get("best_ask"),
+            "raw": dict(msg),
+        }
+        if "price" in msg and "size" in msg and "side" in msg:
+            ev["changes"] = [{"side": msg["side"], "price": msg["price"], "size": msg["size"]}]
+        return asset_id, ev
 
     # delta style
     if "changes" in msg and isinstance(msg.get("changes"), list):
@@ -203,6 +698,241 @@ def parse_market_channel_message(msg: Mapping[str, Any]) -> Tuple[Optional[str],
     return asset_id, {"kind": "unknown", "raw": dict(msg)}
 
 
+def iter_market_channel_events(
+    msg: Any, *, as_of: datetime
+) -> List[Tuple[datetime, str, Dict[str, Any]]]:
+    """
+    Normalize one decoded WS payload (dict or list of dicts) into (as_of, asset_id, event) tuples.
+
+    Some events batch multiple per message: {"event_type":"price_change","price_changes":[...]}
+    """
+    if isinstance(msg, list):
+        out: List[Tuple[datetime, str, Dict[str, Any]]] = []
+        for item in msg:
+            out.extend(iter_market_channel_events(item, as_of=as_of))
+        return out
+
+    if not isinstance(msg, dict):
+        return []
+
+    if isinstance(msg.get("price_changes"), list):
+        out = []
+        for pc in msg["price_changes"]:
+            if not isinstance(pc, dict):
+                continue
+            merged = dict(pc)
+            # keep some context
+            if "timestamp" in msg and "timestamp" not in merged:
+                merged["timestamp"] = msg["timestamp"]
+            if "market" in msg and "market" not in merged:
+                merged["market"] = msg["market"]
+            if "event_type" in msg and "event_type" not in merged:
+                merged["event_type"] = msg["event_type"]
+            asset_id, norm = parse_market_channel_message(merged)
+            if asset_id is None or norm is None:
+                continue
+            out.append((as_of, asset_id, norm))
+        return out
+
+    asset_id, norm = parse_market_channel_message(msg)
+    if asset_id is None or norm is None:
+        return []
+    return [(as_of, asset_id, norm)]
+
+
+def decode_market_frame(raw: Any, *, as_of: datetime) -> List[Tuple[datetime, str, Dict[str, Any]]]:
+    """
+    Decode one raw WS frame (str/bytes) into normalized events.
+
+    Keepalives and non-JSON frames yield [].
+    """
+    if isinstance(raw, bytes):
+        try:
+            raw = raw.decode("utf-8", errors="replace")
+        except Exception:
+            return []
+
+    if not isinstance(raw, str):
+        return []
+
+    if raw in {"PONG", "PING"}:
+        return []
+
+    try:
+        msg = json.loads(raw)
+    except Exception:
+        # non-json keepalives or unexpected payloads
+        return []
+
+    return iter_market_channel_events(msg, as_of=as_of)
+
+
+def _opt_decimal(x: Any) -> Optional[Decimal]:
+    return None if x is None else _to_price(x)
+
+
+def apply_market_event(
+    st: OrderBookState | FixedBook, ev: Mapping[str, Any], *, as_of: datetime
+) -> None:
+    """
+    Apply one normalized market channel event (see parse_market_channel_message) to a book.
+
+    The book keeps only what its raw_retention allows of the message payload as top.raw.
+    """
+    kind = ev.get("kind")
+    msg = ev.get("raw") if isinstance(ev.get("raw"), dict) else {"raw": ev}
+    raw = retain_raw(msg, st.raw_retention)
+    if kind == "snapshot":
+        st.apply_snapshot(ev.get("bids", []), ev.get("asks", []), as_of=as_of, raw=raw)
+    elif kind == "top":
+        if ev.get("changes"):
+            st.apply_levels(ev["changes"])
+        if isinstance(st, FixedBook):
+            # 定点 book 直接从原始字符串解析成整数，不经过 Decimal
+            st.apply_top(
+                best_bid=ev.get("best_bid"), best_ask=ev.get("best_ask"), as_of=as_of, raw=raw
+            )
+            return
+        st.apply_top(
+            best_bid=_opt_decimal(ev.get("best_bid")),
+            best_ask=_opt_decimal(ev.get("best_ask")),
+            as_of=as_of,
+            raw=raw,
+        )
+    elif kind == "changes":
+        st.apply_changes(ev.get("changes", []), as_of=as_of, raw=raw)
+    else:
+        # unknown: try best-effort read if it contains bids/asks-like fields
+        bids = msg.get("bids")
+        asks = msg.get("asks")
+        if isinstance(bids, list) and isinstance(asks, list):
+            st.apply_snapshot(bids, asks, as_of=as_of, raw=raw)
+        # otherwise ignore
+
+
+# ---------------- memory accounting ----------------
+
+
+@dataclass
+class BookMemory:
+    """
+    Approximate resident bytes of a set of books (sys.getsizeof over the object graph).
+
+    Objects shared between books (interned strings, cached small ints, module constants) are
+    counted once, so the per-book figure is what one more book adds. With `sample`, the byte counts
+    are extrapolated from the first `sampled` books.
+    """
+
+    n_books: int = 0
+    sampled: int = 0
+    levels: int = 0  # bids + asks 档位数
+    level_bytes: int = 0  # 档位 dict 及其中的价格 / 数量对象
+    raw_bytes: int = 0  # top.raw 留存的原始消息
+    cache_bytes: int = 0  # ladder / top 的惰性缓存
+    book_bytes: int = 0  # book 对象本身、top、时间戳等
+    index_bytes: int = 0  # books 映射本身与 asset id 字符串
+
+    @property
+    def total_bytes(self) -> int:
+        return (
+            self.level_bytes
+            + self.raw_bytes
+            + self.cache_bytes
+            + self.book_bytes
+            + self.index_bytes
+        )
+
+    @property
+    def bytes_per_book(self) -> float:
+        return self.total_bytes / self.n_books if self.n_books else 0.0
+
+    def summary(self) -> str:
+        mb = 1 << 20
+        return (
+            f"books={self.n_books} total={self.total_bytes / mb:.1f}MiB "
+            f"({self.bytes_per_book:.0f}B/book: "
+            f"levels={self.level_bytes / mb:.1f}MiB raw={self.raw_bytes / mb:.1f}MiB "
+            f"cache={self.cache_bytes / mb:.1f}MiB book={self.book_bytes / mb:.1f}MiB "
+            f"index={self.index_bytes / mb:.1f}MiB)"
+        )
+
+
+_ATOMS = (type(None), bool)
+
+
+def _slot_values(o: Any) -> Iterator[Any]:
+    for cls in type(o).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            v = getattr(o, name, None)
+            if v is not None:
+                yield v
+
+
+def _deep_size(root: Any, seen: set) -> int:
+    total = 0
+    stack = [root]
+    while stack:
+        o = stack.pop()
+        if isinstance(o, _ATOMS) or id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif isinstance(o, (str, bytes, int, float, Decimal, datetime)):
+            continue
+        else:
+            d = getattr(o, "__dict__", None)
+            if d is not None:
+                stack.append(d)
+            stack.extend(_slot_values(o))
+    return total
+
+
+def book_memory(books: Mapping[str, Any], *, sample: Optional[int] = None) -> BookMemory:
+    """
+    Memory accounting for a books mapping (asset_id -> OrderBookState / FixedBook); see BookMemory.
+
+    Walks every object of every book (about 1s per 10k depth-10 books); pass sample=N to measure
+    only up to N books spread evenly over the mapping and extrapolate, e.g. for a status line.
+    """
+    m = BookMemory(n_books=len(books))
+    seen: set = set()
+    items: Iterable[Tuple[Any, Any]] = books.items()
+    if sample is not None and 0 < sample < len(books):
+        # 等距抽样：不只量插入顺序里的前 N 个（通常是同几个 event）
+        items = islice(items, 0, None, -(-len(books) // sample))
+    for aid, st in items:
+        m.sampled += 1
+        if isinstance(st, FixedBook):
+            raw = st.raw
+            level_maps: Tuple[Any, ...] = (st.bid_units, st.ask_units)
+            caches: Tuple[Any, ...] = (st._unit_ladders, st._ladders, st._top)
+        else:
+            raw = st.top.raw
+            level_maps = (st.bids, st.asks)
+            caches = (st._ladders,)
+        m.levels += len(level_maps[0]) + len(level_maps[1])
+        m.index_bytes += _deep_size(aid, seen)
+        m.raw_bytes += _deep_size(raw, seen)
+        m.level_bytes += sum(_deep_size(x, seen) for x in level_maps)
+        m.cache_bytes += sum(_deep_size(x, seen) for x in caches)
+        m.book_bytes += _deep_size(st, seen)
+    if m.sampled and m.sampled < m.n_books:
+        f = m.n_books / m.sampled
+        m.levels = round(m.levels * f)
+        m.raw_bytes = round(m.raw_bytes * f)
+        m.level_bytes = round(m.level_bytes * f)
+        m.cache_bytes = round(m.cache_bytes * f)
+        m.book_bytes = round(m.book_bytes * f)
+        m.index_bytes = round(m.index_bytes * f)
+    m.index_bytes += sys.getsizeof(books)
+    return m
+
+
 async def market_channel_stream(
     *,
     ws_url: str,
@@ -210,6 +940,7 @@ async def market_channel_stream(
     auth: Optional[Dict[str, str]] = None,
     ping_interval_s: float = 5.0,
     recv_timeout_s: float = 60.0,
+    max_frame_bytes: Optional[int] = 16 << 20,
 ) -> Iterable[Tuple[datetime, str, Dict[str, Any]]]:
     """
     Connect to Polymarket CLOB market channel and yield normalized events.
@@ -220,7 +951,8 @@ async def market_channel_stream(
     if auth:
         subscribe_msg["auth"] = auth
 
-    async with websockets.connect(ws_url, ping_interval=None) as ws:
+    # 订阅上千个 asset 时，首帧的 book 快照列表会超过 websockets 默认的 1 MiB 上限
+    async with websockets.connect(ws_url, ping_interval=None, max_size=max_frame_bytes) as ws:
         await ws.send(json.dumps(subscribe_msg))
 
         async def _ping_loop() -> None:
@@ -235,62 +967,8 @@ async def market_channel_stream(
         try:
             while True:
                 raw = await asyncio.wait_for(ws.recv(), timeout=recv_timeout_s)
-                as_of = utc_now()
-
-                if isinstance(raw, bytes):
-                    try:
-                        raw = raw.decode("utf-8", errors="replace")
-                    except Exception:
-                        continue
-
-                if not isinstance(raw, str):
-                    continue
-
-                if raw in {"PONG", "PING"}:
-                    continue
-
-                try:
-                    msg = json.loads(raw)
-                except Exception:
-                    # non-json keepalives or unexpected payloads
-                    continue
-
-                def _yield_one(m: Any) -> Iterable[Tuple[datetime, str, Dict[str, Any]]]:
-                    if not isinstance(m, dict):
-                        return []
-
-                    # Some events batch multiple per message: {"event_type":"price_change","price_changes":[...]}
-                    if isinstance(m.get("price_changes"), list):
-                        out: List[Tuple[datetime, str, Dict[str, Any]]] = []
-                        for pc in m["price_changes"]:
-                            if not isinstance(pc, dict):
-                                continue
-                            merged = dict(pc)
-                            # keep some context
-                            if "timestamp" in m and "timestamp" not in merged:
-                                merged["timestamp"] = m["timestamp"]
-                            if "market" in m and "market" not in merged:
-                                merged["market"] = m["market"]
-                            if "event_type" in m and "event_type" not in merged:
-                                merged["event_type"] = m["event_type"]
-                            asset_id, norm = parse_market_channel_message(merged)
-                            if asset_id is None or norm is None:
-                                continue
-                            out.append((as_of, asset_id, norm))
-                        return out
-
-                    asset_id, norm = parse_market_channel_message(m)
-                    if asset_id is None or norm is None:
-                        return []
-                    return [(as_of, asset_id, norm)]
-
-                if isinstance(msg, list):
-                    for item in msg:
-                        for tup in _yield_one(item):
-                            yield tup
-                else:
-                    for tup in _yield_one(msg):
-                        yield tup
+                for tup in decode_market_frame(raw, as_of=utc_now()):
+                    yield tup
         finally:
             ping_task.cancel()
 
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import os
+from typing import Dict, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -15,8 +18,6 @@ def load_settings() -> Settings:
     """
     Load settings from environment variables (optionally via python-dotenv in callers).
     """
-    import os
-
     return Settings(
         database_url=os.getenv("DATABASE_URL", Settings.model_fields["database_url"].default),
         gamma_base_url=os.getenv("GAMMA_BASE_URL", Settings.model_fields["gamma_base_url"].default),
@@ -26,3 +27,23 @@ def load_settings() -> Settings:
     )
 
 
+def load_clob_auth_from_env() -> Optional[Dict[str, str]]:
+    """
+    Market channel is typically public, but docs show an optional auth object.
+    Support both naming styles:
+    - apiKey/secret/passphrase
+    - CLOB_API_KEY/CLOB_API_SECRET/CLOB_API_PASSPHRASE
+    """
+    api_key = os.getenv("CLOB_API_KEY") or os.getenv("CLOB_APIKEY") or os.getenv("API_KEY")
+    api_secret = os.getenv("CLOB_API_SECRET") or os.getenv("CLOB_SECRET") or os.getenv("API_SECRET")
+    api_passphrase = (
+        os.getenv("CLOB_API_PASSPHRASE")
+        or os.getenv("CLOB_PASSPHRASE")
+        or os.getenv("API_PASSPHRASE")
+    )
+
+    if not api_key and not api_secret and not api_passphrase:
+        return None
+
+    # Polymarket docs often use: {"apiKey": "...", "secret": "...", "passphrase": "..."}
+    return {"apiKey": api_key or "", "secret": api_secret or "", "passphrase": api_passphrase or ""}
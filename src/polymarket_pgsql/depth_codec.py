@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import psycopg
+
+from polymarket_pgsql.clob_ws import FixedBook, OrderBookState
+from polymarket_pgsql.fixedpoint import PRICE_SCALE
+from polymarket_pgsql.fixedpoint import SIZE_SCALE as UNIT_SIZE_SCALE
+
+# L2 深度快照（前 K 档）的紧凑二进制编码，落 asset_depth_snapshots.payload（bytea）。
+# - 价格存整数 tick（PRICE_SCALE），数量存整数（SIZE_SCALE），全部 varint
+# - 每帧先除以本帧价格的最大公约数（0.01 的盘口 → 相邻档差 1），档间价格差分，通常每档 2~3 字节
+# - key 帧：完整的前 K 档；delta 帧：相对上一帧的改动（price, size），size=0 表示该档离开前 K 档
+# - 每个 asset 第一帧、每 keyframe_every 帧、每 keyframe_interval_s 秒强制 key 帧，解码链有界；
+#   进程重启后第一帧也是 key 帧，所以按 (as_of, seq) 顺序从最近的 key 帧往后解即可
+# 同样的前 10 档存成 jsonb raw（价格/数量字符串）要大几十倍（delta 帧常见只有十几字节）。
+
+SIZE_SCALE = 100  # 数量精度 0.01 股（CLOB 的最小数量单位）
+
+KIND_KEY = 0
+KIND_DELTA = 1
+
+_COPY_SQL = "copy asset_depth_snapshots (asset_id, as_of, seq, kind, levels, payload) from stdin"
+
+# 一侧的档位：[(price_ticks, size_units), ...]，bids 价格降序、asks 升序
+Levels = List[Tuple[int, int]]
+
+
+def _np() -> Any:
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError("深度快照解码为数组需要 numpy：pip install numpy") from e
+    return numpy
+
+
+# ---- varint ----
+def _put(buf: bytearray, n: int) -> None:
+    while n >= 0x80:
+        buf.append((n & 0x7F) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _get(data: bytes, pos: int) -> Tuple[int, int]:
+    n = 0
+    shift = 0
+    while True:
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _quantum(*sides: Sequence[Tuple[int, int]]) -> int:
+    q = 0
+    for side in sides:
+        for p, _ in side:
+            q = math.gcd(q, p)
+    return q or 1
+
+
+def _put_side(buf: bytearray, levels: Sequence[Tuple[int, int]], q: int) -> None:
+    # 调用方保证价格单调（bids 降序、asks 升序、delta 改动升序），相邻差取绝对值即可
+    _put(buf, len(levels))
+    prev = None
+    for p, s in levels:
+        pq = p // q
+        _put(buf, pq if prev is None else abs(pq - prev))
+        _put(buf, s)
+        prev = pq
+
+
+def _get_side(data: bytes, pos: int, q: int, descending: bool) -> Tuple[Levels, int]:
+    n, pos = _get(data, pos)
+    out: Levels = []
+    prev = 0
+    for i in range(n):
+        d, pos = _get(data, pos)
+        s, pos = _get(data, pos)
+        pq = d if i == 0 else (prev - d if descending else prev + d)
+        out.append((pq * q, s))
+        prev = pq
+    return out, pos
+
+
+def encode_key(bids: Sequence[Tuple[int, int]], asks: Sequence[Tuple[int, int]]) -> bytes:
+    buf = bytearray((KIND_KEY,))
+    q = _quantum(bids, asks)
+    _put(buf, q)
+    _put_side(buf, bids, q)
+    _put_side(buf, asks, q)
+    return bytes(buf)
+
+
+def _changes(prev: Levels, cur: Levels) -> Levels:
+    old = dict(prev)
+    new = dict(cur)
+    out = [(p, s) for p, s in new.items() if old.get(p) != s]
+    out.extend((p, 0) for p in old if p not in new)
+    out.sort()
+    return out
+
+
+def encode_delta(prev_bids: Levels, prev_asks: Levels, bids: Levels, asks: Levels) -> bytes:
+    bc = _changes(prev_bids, bids)
+    ac = _changes(prev_asks, asks)
+    buf = bytearray((KIND_DELTA,))
+    q = _quantum(bc, ac)
+    _put(buf, q)
+    _put_side(buf, bc, q)
+    _put_side(buf, ac, q)
+    return bytes(buf)
+
+
+def _apply(levels: Levels, changes: Levels, descending: bool) -> Levels:
+    book = dict(levels)
+    for p, s in changes:
+        if s:
+            book[p] = s
+        else:
+            book.pop(p, None)
+    return sorted(book.items(), reverse=descending)
+
+
+def decode_frame(payload: bytes, bids: Levels, asks: Levels) -> Tuple[Levels, Levels]:
+    """
+    Apply one frame to the previous levels (ignored for key frames) and return the new (bids, asks).
+    """
+    kind = payload[0]
+    q, pos = _get(payload, 1)
+    if kind == KIND_KEY:
+        nb, pos = _get_side(payload, pos, q, descending=True)
+        na, pos = _get_side(payload, pos, q, descending=False)
+        return nb, na
+    if kind == KIND_DELTA:
+        # 改动列表按价格升序编码（两侧都是）
+        bc, pos = _get_side(payload, pos, q, descending=False)
+        ac, pos = _get_side(payload, pos, q, descending=False)
+        return _apply(bids, bc, descending=True), _apply(asks, ac, descending=False)
+    raise ValueError(f"unknown depth frame kind: {kind}")
+
+
+# ---- book -> levels ----
+# 价格只有几百到几千个不同值（0~1 × tick size），Decimal -> tick 的换算缓存起来
+_PRICE_TICKS: Dict[Decimal, int] = {}
+
+
+def _ticks(p: Decimal) -> int:
+    t = _PRICE_TICKS.get(p)
+    if t is None:
+        t = int(p * PRICE_SCALE)
+        if len(_PRICE_TICKS) < 100_000:
+            _PRICE_TICKS[p] = t
+    return t
+
+
+def _top_units(levels: Dict[int, int], best: Optional[int], k: int, *, bid: bool) -> Levels:
+    step = UNIT_SIZE_SCALE // SIZE_SCALE
+    if bid:
+        px = sorted(
+            (p for p, s in levels.items() if s > 0 and (best is None or p <= best)), reverse=True
+        )[:k]
+    else:
+        px = sorted(p for p, s in levels.items() if s > 0 and (best is None or p >= best))[:k]
+    return [(p, levels[p] // step or 1) for p in px]
+
+
+def top_levels(st: OrderBookState | FixedBook, k: int) -> Tuple[Levels, Levels]:
+    """
+    Top k levels per side as integer (price ticks, size units).
+
+    Same filtering as OrderBookState.ladder().
+    """
+    if isinstance(st, FixedBook):
+        # 定点 book 的价格单位就是 tick，数量只需换到 SIZE_SCALE
+        return (
+            _top_units(st.bid_units, st.best_bid_units, k, bid=True),
+            _top_units(st.ask_units, st.best_ask_units, k, bid=False),
+        )
+    bb = st.top.best_bid
+    ba = st.top.best_ask
+    # 单边通常只有几十档，整体排序比 heapq 快
+    bid_px = sorted(
+        (p for p, s in st.bids.items() if s > 0 and (bb is None or p <= bb)), reverse=True
+    )[:k]
+    ask_px = sorted(p for p, s in st.asks.items() if s > 0 and (ba is None or p >= ba))[:k]
+    # 不足一个数量单位的档记为 1（size=0 在 delta 里表示删档）
+    bids = [(_ticks(p), int(st.bids[p] * SIZE_SCALE) or 1) for p in bid_px]
+    asks = [(_ticks(p), int(st.asks[p] * SIZE_SCALE) or 1) for p in ask_px]
+    return bids, asks
+
+
+# ---- decoded snapshots ----
+@dataclass
+class DepthSnapshot:
+    """
+    One decoded snapshot; prices in PRICE_SCALE ticks and sizes in SIZE_SCALE units (int64 arrays).
+    """
+
+    as_of: datetime
+    bid_px: Any
+    bid_sz: Any
+    ask_px: Any
+    ask_sz: Any
+
+    @classmethod
+    def from_levels(cls, as_of: datetime, bids: Levels, asks: Levels) -> DepthSnapshot:
+        np = _np()
+
+        def cols(levels: Levels) -> Tuple[Any, Any]:
+            a = np.array(levels, dtype=np.int64).reshape(-1, 2)
+            return a[:, 0].copy(), a[:, 1].copy()
+
+        bid_px, bid_sz = cols(bids)
+        ask_px, ask_sz = cols(asks)
+        return cls(as_of=as_of, bid_px=bid_px, bid_sz=bid_sz, ask_px=ask_px, ask_sz=ask_sz)
+
+    def prices(self, side: str) -> Any:
+        return (self.bid_px if side == "bid" else self.ask_px) / PRICE_SCALE
+
+    def sizes(self, side: str) -> Any:
+        return (self.bid_sz if side == "bid" else self.ask_sz) / SIZE_SCALE
+
+
+def decode_frames(
+    frames: Iterable[Tuple[datetime, bytes]],
+) -> Iterator[Tuple[datetime, Levels, Levels]]:
+    """
+    Decode one asset's frames in (as_of, seq) order; frames before the first key frame are skipped.
+    """
+    bids: Levels = []
+    asks: Levels = []
+    keyed = False
+    for as_of, payload in frames:
+        if not keyed:
+            if payload[0] != KIND_KEY:
+                continue
+            keyed = True
+        bids, asks = decode_frame(bytes(payload), bids, asks)
+        yield as_of, bids, asks
+
+
+def load_depth(
+    conn: psycopg.Connection[Any],
+    asset_id: str,
+    start: datetime,
+    end: datetime,
+) -> List[DepthSnapshot]:
+    """
+    Snapshots of one asset in [start, end] as NumPy arrays.
+
+    Decoding starts at the last key frame <= start.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            select as_of, payload
+            from asset_depth_snapshots
+            where asset_id = %(a)s
+              and as_of >= coalesce(
+                (select max(as_of) from asset_depth_snapshots
+                 where asset_id = %(a)s and kind = 0 and as_of <= %(start)s),
+                %(start)s)
+              and as_of <= %(end)s
+            order by as_of, seq
+            """,
+            {"a": asset_id, "start": start, "end": end},
+        )
+        rows = cur.fetchall()
+    return [DepthSnapshot.from_levels(ts, b, a) for ts, b, a in decode_frames(rows) if ts >= start]
+
+
+# ---- recorder ----
+@dataclass
+class _AssetDepth:
+    bids: Levels = field(default_factory=list)
+    asks: Levels = field(default_factory=list)
+    seq: int = 0
+    since_key: int = 0
+    last_at: Optional[datetime] = None
+    last_key_at: Optional[datetime] = None
+    dirty: bool = False
+
+
+class DepthRecorder:
+    """
+    Throttled on-change L2 snapshots per asset, buffered as encoded frames until flush().
+    """
+
+    def __init__(
+        self,
+        *,
+        levels: int = 10,
+        min_interval_s: float = 1.0,
+        keyframe_every: int = 60,
+        keyframe_interval_s: float = 60.0,
+    ) -> None:
+        self.levels = levels
+        self.min_interval_s = min_interval_s
+        self.keyframe_every = keyframe_every
+        self.keyframe_interval_s = keyframe_interval_s
+        self._assets: Dict[str, _AssetDepth] = {}
+        self._rows: List[Tuple[str, datetime, int, int, int, bytes]] = []
+        self.frames = 0
+        self.payload_bytes = 0
+        self.frames_written = 0
+
+    def on_book(self, asset_id: str, st: OrderBookState, as_of: datetime) -> bool:
+        """
+        Call after every update of `st`; records a frame unless one was taken < min_interval_s ago.
+        """
+        a = self._assets.get(asset_id)
+        if a is None:
+            a = self._assets[asset_id] = _AssetDepth()
+        if a.last_at is not None and (as_of - a.last_at).total_seconds() < self.min_interval_s:
+            a.dirty = True
+            return False
+        return self._capture(asset_id, a, st, as_of)
+
+    def capture_due(self, books: Mapping[str, OrderBookState], now: datetime) -> int:
+        """
+        Record throttled changes that are now due, and periodic key frames for quiet assets.
+        """
+        n = 0
+        for aid, a in self._assets.items():
+            st = books.get(aid)
+            if st is None:
+                continue
+            if a.last_key_at is None or a.last_at is None:
+                continue
+            key_due = (now - a.last_key_at).total_seconds() >= self.keyframe_interval_s
+            if key_due or (a.dirty and (now - a.last_at).total_seconds() >= self.min_interval_s):
+                n += self._capture(aid, a, st, now)
+        return n
+
+    def _capture(self, asset_id: str, a: _AssetDepth, st: OrderBookState, as_of: datetime) -> bool:
+        bids, asks = top_levels(st, self.levels)
+        a.dirty = False
+        key = (
+            a.last_key_at is None
+            or a.since_key >= self.keyframe_every
+            or (as_of - a.last_key_at).total_seconds() >= self.keyframe_interval_s
+        )
+        if not key and bids == a.bids and asks == a.asks:
+            return False
+        if key:
+            payload = encode_key(bids, asks)
+            a.since_key = 0
+            a.last_key_at = as_of
+        else:
+            payload = encode_delta(a.bids, a.asks, bids, asks)
+            a.since_key += 1
+        a.bids = bids
+        a.asks = asks
+        a.last_at = as_of
+        kind = KIND_KEY if key else KIND_DELTA
+        self._rows.append((asset_id, as_of, a.seq, kind, self.levels, payload))
+        a.seq += 1
+        self.frames += 1
+        self.payload_bytes += len(payload)
+        return True
+
+    @property
+    def pending(self) -> int:
+        return len(self._rows)
+
+    def flush(self, conn: psycopg.Connection[Any]) -> int:
+        """
+        COPY buffered frames into asset_depth_snapshots in one transaction.
+
+        On error the frames stay queued for the next flush.
+        """
+        if not self._rows:
+            return 0
+        rows = self._rows
+        self._rows = []
+        try:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    with cur.copy(_COPY_SQL) as cp:
+                        for r in rows:
+                            cp.write_row(r)
+        except Exception:
+            self._rows = rows + self._rows
+            raise
+        self.frames_written += len(rows)
+        return len(rows)
+
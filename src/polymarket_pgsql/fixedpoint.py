@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Optional
+
+# 定点数：价格、数量、费率在入口解析一次成整数，引擎内部只做整数运算，
+# 出口（打印/写库/账本）再转 Decimal。
+# - 价格/数量/费率都按 1e-6 缩放（PRICE_SCALE / SIZE_SCALE / RATE_SCALE）；
+#   CLOB 价格是 0.01/0.001 tick，数量 2 位小数，都能精确表示；更细的输入按四舍六入五成双取整到 1e-6
+# - 金额（价格 × 数量）按 MONEY_SCALE = 1e12 表示，同样精确；手续费与 gmp.calc_fee 一样量化到 1e-8
+# 行情里的价格只有几百到几千种字符串，解析结果缓存起来，热路径上基本是一次 dict 查找。
+# 无法解析的输入（含 Infinity / NaN）返回 None，不抛异常：一条坏报价不该打断整条 WS。
+
+PRICE_SCALE = 1_000_000  # 1 tick = 1e-6（Polymarket 价格在 0~1，int32 足够）
+SIZE_SCALE = 1_000_000
+RATE_SCALE = 1_000_000
+MONEY_SCALE = PRICE_SCALE * SIZE_SCALE
+FEE_QUANTUM = MONEY_SCALE // 10**8  # calc_fee 量化到 0.00000001
+
+_DIGITS = 6
+_POW10 = [10**i for i in range(_DIGITS + 1)]
+_CACHE: Dict[str, Optional[int]] = {}
+_CACHE_MAX = 200_000
+
+
+def div_round(n: int, d: int) -> int:
+    """
+    n / d rounded half-to-even (Decimal's default rounding), for d > 0.
+    """
+    q, r = divmod(n, d)
+    r2 = 2 * r
+    if r2 > d or (r2 == d and q & 1):
+        q += 1
+    return q
+
+
+def _parse_str(s: str) -> Optional[int]:
+    whole, _, frac = s.strip().partition(".")
+    if (
+        whole.isascii()
+        and whole.isdigit()
+        and (not frac or (frac.isascii() and frac.isdigit() and len(frac) <= _DIGITS))
+    ):
+        units = int(whole) * PRICE_SCALE
+        if frac:
+            units += int(frac) * _POW10[_DIGITS - len(frac)]
+        return units
+    # 负数、科学计数法、超过 6 位小数等少见写法：走 Decimal（Infinity / NaN 视为无法解析）
+    try:
+        d = Decimal(s)
+    except (InvalidOperation, ValueError):
+        return None
+    return decimal_to_units(d) if d.is_finite() else None
+
+
+def parse_units(x: Any) -> Optional[int]:
+    """
+    str / Decimal / int / float -> integer units of 1e-6; None for None or unparsable input.
+    """
+    if isinstance(x, str):
+        # 只缓存字符串：True / 1 / 1.0 / Decimal(1) 相等且同 hash，混进同一个缓存会互相串值
+        try:
+            return _CACHE[x]
+        except KeyError:
+            pass
+        v = _parse_str(x)
+        if len(_CACHE) >= _CACHE_MAX:
+            _CACHE.clear()
+        _CACHE[x] = v
+        return v
+    if isinstance(x, Decimal):
+        return decimal_to_units(x) if x.is_finite() else None
+    if isinstance(x, int) and not isinstance(x, bool):
+        return x * PRICE_SCALE
+    if isinstance(x, float):
+        return _parse_str(repr(x))
+    return None
+
+
+def decimal_to_units(x: Decimal, scale: int = PRICE_SCALE) -> int:
+    return int((x * scale).to_integral_value())
+
+
+def to_decimal(units: Optional[int], scale: int = PRICE_SCALE) -> Optional[Decimal]:
+    if units is None:
+        return None
+    return Decimal(units) / scale
+
+
+def money_to_decimal(units: int) -> Decimal:
+    return Decimal(units) / MONEY_SCALE
+
+
+def fee_units(notional: int, rate: int) -> int:
+    """
+    Fee in MONEY_SCALE units for a notional in MONEY_SCALE units; same result as gmp.calc_fee.
+    """
+    if rate <= 0:
+        return 0
+    return div_round(notional * rate, RATE_SCALE * FEE_QUANTUM) * FEE_QUANTUM
+
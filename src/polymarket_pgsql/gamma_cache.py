@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from polymarket_pgsql.gamma_client import GammaClient
+from polymarket_pgsql.gamma_sync import parse_ts
+
+# Gamma 详情请求（Event-by-ID / Market-by-ID）的合并 + 缓存：
+# event 变更时 sync、watchlist、启动代码会同时去拉同一个 event / market
+# （docs/prd.md：event 变了就调 Event-by-ID 重同步其 markets）。
+# - 合并：同一个 (kind, id) 已有请求在途时，后来的调用者等它的结果，不再发 HTTP
+#   （出错时一起收到同一个异常）
+# - 缓存：结果按 TTL 保留，超过 max_entries 按 LRU 淘汰
+# - 失效：list_events / list_markets（以及详情里内嵌的 markets）
+#   看到比缓存更新的 updatedAt 就丢掉该条；
+#   在途请求记下期间看到的最新 updatedAt：返回的结果比它旧就照常返回给等待者，但不进缓存
+# 返回的是缓存里的同一个对象：调用方只读，不要改。
+
+Key = Tuple[str, int]  # ("events" | "markets", id)
+
+
+@dataclass
+class CacheStats:
+    requests: int = 0  # get_event / get_market 调用次数
+    hits: int = 0
+    merged: int = 0  # 等了别人在途的请求
+    fetches: int = 0  # 真正发出去的（成功的）请求
+    errors: int = 0
+    invalidated: int = 0  # 因更新的 updatedAt 丢掉的缓存
+    evicted: int = 0  # LRU 淘汰
+    expired: int = 0  # TTL 过期
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.requests if self.requests else 0.0
+
+    @property
+    def merge_rate(self) -> float:
+        return self.merged / self.requests if self.requests else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"requests={self.requests} hits={self.hits} ({self.hit_rate:.1%}) merged={self.merged} "
+            f"({self.merge_rate:.1%}) fetches={self.fetches} errors={self.errors} "
+            f"invalidated={self.invalidated} evicted={self.evicted} expired={self.expired}"
+        )
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error", "seen")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.seen: Optional[datetime] = None  # 在途期间列表里看到的最新 updatedAt
+
+
+def _id(x: Any) -> Optional[int]:
+    try:
+        return int(x)
+    except (TypeError, ValueError):
+        return None
+
+
+class CachedGammaClient(GammaClient):
+    """
+    GammaClient whose get_event / get_market coalesce concurrent identical calls and cache results
+    (TTL + LRU), invalidated by newer updatedAt values seen in list responses.
+
+    Thread-safe; share one instance between the callers that should share requests.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout_s: float = 30.0,
+        *,
+        ttl_s: float = 60.0,
+        max_entries: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(base_url, timeout_s=timeout_s)
+        self.ttl_s = ttl_s
+        self.max_entries = max(1, max_entries)
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (expires_at, value, updated_at)
+        self._cache: OrderedDict[Key, Tuple[float, Any, Optional[datetime]]] = OrderedDict()
+        self._flights: Dict[Key, _Flight] = {}
+        self.stats = CacheStats()
+
+    # ---- detail fetches ----
+    def get_event(self, event_id: int) -> Any:
+        return self._get("events", event_id, super().get_event)
+
+    def get_market(self, market_id: int) -> Any:
+        return self._get("markets", market_id, super().get_market)
+
+    def _get(self, kind: str, obj_id: int, fetch: Callable[[int], Any]) -> Any:
+        key = (kind, int(obj_id))
+        with self._lock:
+            self.stats.requests += 1
+            ent = self._cache.get(key)
+            if ent is not None:
+                if ent[0] > self._clock():
+                    self._cache.move_to_end(key)
+                    self.stats.hits += 1
+                    return ent[1]
+                del self._cache[key]
+                self.stats.expired += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.stats.merged += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = fetch(obj_id)
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.stats.errors += 1
+                del self._flights[key]
+            flight.done.set()
+            raise
+        flight.value = value
+        with self._lock:
+            self.stats.fetches += 1
+            del self._flights[key]
+            updated = parse_ts(value.get("updatedAt")) if isinstance(value, dict) else None
+            # 在途期间列表里出现过更新的版本：这次拿到的已经过时，不缓存
+            stale = flight.seen is not None and (updated is None or updated < flight.seen)
+            if not stale and self.ttl_s > 0:
+                self._cache[key] = (self._clock() + self.ttl_s, value, updated)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+                    self.stats.evicted += 1
+        flight.done.set()
+        if kind == "events" and isinstance(value, dict):
+            self.observe("markets", value.get("markets") or ())
+        return value
+
+    # ---- list pass-through (feeds invalidation) ----
+    def list_events(self, **params: Any) -> Any:
+        page = super().list_events(**params)
+        self.observe("events", page)
+        return page
+
+    def list_markets(self, **params: Any) -> Any:
+        page = super().list_markets(**params)
+        self.observe("markets", page)
+        return page
+
+    # ---- invalidation ----
+    def observe(self, kind: str, objs: Any) -> int:
+        """
+        Drop cached entries older than the updatedAt of the given Gamma objects (events also carry
+        their markets); returns how many were invalidated.
+        """
+        if not isinstance(objs, (list, tuple)):
+            return 0
+        n = 0
+        with self._lock:
+            for o in objs:
+                if not isinstance(o, dict):
+                    continue
+                n += self._observe_one(kind, _id(o.get("id")), parse_ts(o.get("updatedAt")))
+                if kind == "events":
+                    for m in o.get("markets") or ():
+                        if isinstance(m, dict):
+                            n += self._observe_one(
+                                "markets", _id(m.get("id")), parse_ts(m.get("updatedAt"))
+                            )
+        return n
+
+    def _observe_one(self, kind: str, obj_id: Optional[int], updated: Optional[datetime]) -> int:
+        if obj_id is None or updated is None:
+            return 0
+        key = (kind, obj_id)
+        flight = self._flights.get(key)
+        if flight is not None and (flight.seen is None or updated > flight.seen):
+            flight.seen = updated
+        ent = self._cache.get(key)
+        if ent is None or (ent[2] is not None and ent[2] >= updated):
+            return 0
+        del self._cache[key]
+        self.stats.invalidated += 1
+        return 1
+
+    def invalidate(self, kind: str, obj_id: int) -> bool:
+        with self._lock:
+            return self._cache.pop((kind, int(obj_id)), None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import json
+from typing import Any, Dict, List, Optional
 
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from polymarket_pgsql.gmp import MarketTokens
+
 
 class GammaClient:
     """
@@ -42,3 +45,55 @@ class GammaClient:
         return self.get_json(f"/markets/{market_id}")
 
 
+def fetch_market_tokens(
+    gamma_base_url: str, market_ids: List[int], *, client: Optional[GammaClient] = None
+) -> List[MarketTokens]:
+    # client：共用已有的客户端（例如 gamma_cache.CachedGammaClient，与同步 / watchlist 合并请求）；
+    # 不传则临时建一个
+    c = client if client is not None else GammaClient(gamma_base_url)
+    out: List[MarketTokens] = []
+    try:
+        for mid in market_ids:
+            m = c.get_market(mid)
+            if not isinstance(m, dict):
+                raise RuntimeError(f"Gamma /markets/{mid} 返回非 dict：{type(m)}")
+
+            question = str(m.get("question") or "")
+            clob_ids = m.get("clobTokenIds")
+            outcomes = m.get("outcomes")
+
+            # Gamma 有时会把数组字段作为 JSON 字符串返回（例如 '["...","..."]'）
+            if isinstance(clob_ids, str):
+                try:
+                    clob_ids = json.loads(clob_ids)
+                except Exception:
+                    pass
+            if isinstance(outcomes, str):
+                try:
+                    outcomes = json.loads(outcomes)
+                except Exception:
+                    pass
+
+            if not (isinstance(clob_ids, list) and len(clob_ids) >= 2):
+                raise RuntimeError(f"market {mid} clobTokenIds 非数组或长度不足: {clob_ids}")
+            if not (isinstance(outcomes, list) and len(outcomes) >= 2):
+                raise RuntimeError(f"market {mid} outcomes 非数组或长度不足: {outcomes}")
+
+            # 该 event 下是标准二元 market：outcomes=["Yes","No"]，clobTokenIds 顺序一致
+            yes_idx = next((i for i, o in enumerate(outcomes) if str(o).lower() == "yes"), None)
+            no_idx = next((i for i, o in enumerate(outcomes) if str(o).lower() == "no"), None)
+            if yes_idx is None or no_idx is None:
+                raise RuntimeError(f"market {mid} outcomes 非 Yes/No：{outcomes}")
+
+            out.append(
+                MarketTokens(
+                    market_id=mid,
+                    question=question,
+                    yes_asset_id=str(clob_ids[yes_idx]),
+                    no_asset_id=str(clob_ids[no_idx]),
+                )
+            )
+    finally:
+        if client is None:
+            c.close()
+    return out
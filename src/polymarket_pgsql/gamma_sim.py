@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# 本地 Gamma API 替身（离线测同步吞吐 / 重试，
+# 见 scripts/sim_gamma.py、scripts/bench_gamma_sync.py）：
+# - GammaCatalogue：可配置规模的合成 event × market 目录，字段形态与线上一致（id 为字符串、
+#   outcomes / clobTokenIds 是 JSON 字符串、createdAt / updatedAt 为 ISO8601 Z）；
+#   churn() 随机更新一批 event（updatedAt 前移，连带其中一个 market）
+# - GammaStandIn：stdlib HTTP 服务，提供 /events、/events/{id}、/markets、/markets/{id}；
+#   列表支持 limit / offset / order(updatedAt|createdAt|id) / ascending / closed / id 过滤；
+#   可注入固定延迟 + 抖动、按比例返回 429（带 Retry-After）与 5xx
+# 同一 seed 生成的目录完全一致。
+
+_ORDER_KEYS = {
+    "updatedAt": "_updated",
+    "updated_at": "_updated",
+    "createdAt": "_created",
+    "id": "_id",
+}
+
+
+def _iso(ts: datetime) -> str:
+    return ts.astimezone(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _flag(v: Optional[str]) -> Optional[bool]:
+    if v is None:
+        return None
+    return v.strip().lower() in ("1", "true", "yes")
+
+
+@dataclass
+class GammaCatalogue:
+    """
+    Deterministic synthetic Gamma catalogue.
+
+    n_events events with markets_per_event binary markets each.
+
+    Ids start at id_base (events) and id_base * 10 (markets) so they can be told apart from real
+    rows in a shared database.
+    """
+
+    n_events: int = 1000
+    markets_per_event: int = 4
+    seed: int = 0
+    id_base: int = 9_000_000
+    closed_ratio: float = 0.2
+    start: datetime = field(default_factory=lambda: datetime(2025, 1, 1, tzinfo=timezone.utc))
+
+    events: Dict[int, Dict[str, Any]] = field(init=False, default_factory=dict)
+    markets: Dict[int, Dict[str, Any]] = field(init=False, default_factory=dict)
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+        self._sorted: Dict[Tuple[str, bool], List[Dict[str, Any]]] = {}
+        self._clock = self.start
+        span_s = 180 * 86400
+        for i in range(self.n_events):
+            eid = self.id_base + i
+            created = self.start - timedelta(seconds=self._rng.randrange(span_s))
+            age_s = max(1, int((self.start - created).total_seconds()))
+            updated = created + timedelta(seconds=self._rng.randrange(age_s))
+            closed = self._rng.random() < self.closed_ratio
+            ev: Dict[str, Any] = {
+                "id": str(eid),
+                "ticker": f"sim-event-{eid}",
+                "slug": f"sim-event-{eid}",
+                "title": f"Synthetic event {eid}",
+                "active": not closed,
+                "closed": closed,
+                "createdAt": _iso(created),
+                "updatedAt": _iso(updated),
+                "markets": [],
+                "_id": eid,
+                "_created": created,
+                "_updated": updated,
+            }
+            for j in range(self.markets_per_event):
+                mid = self.id_base * 10 + i * self.markets_per_event + j
+                yes = str(self._rng.getrandbits(252))
+                no = str(self._rng.getrandbits(252))
+                m = {
+                    "id": str(mid),
+                    "question": f"Synthetic event {eid} outcome {j}?",
+                    "conditionId": f"0x{self._rng.getrandbits(256):064x}",
+                    "slug": f"sim-market-{mid}",
+                    "groupItemTitle": f"outcome {j}",
+                    "outcomes": json.dumps(["Yes", "No"]),
+                    "outcomePrices": json.dumps(
+                        [
+                            f"{1 / self.markets_per_event:.3f}",
+                            f"{1 - 1 / self.markets_per_event:.3f}",
+                        ]
+                    ),
+                    "clobTokenIds": json.dumps([yes, no]),
+                    "active": not closed,
+                    "closed": closed,
+                    "createdAt": _iso(created),
+                    "updatedAt": _iso(updated),
+                    "events": [{"id": str(eid)}],
+                    "_id": mid,
+                    "_created": created,
+                    "_updated": updated,
+                }
+                self.markets[mid] = m
+                ev["markets"].append(m)
+            self.events[eid] = ev
+
+    # ---- mutation ----
+    def churn(self, n: int, *, now: Optional[datetime] = None) -> List[int]:
+        """
+        Bump updatedAt of n random events (and one market of each); returns their ids.
+        """
+        with self._lock:
+            now = now or datetime.now(timezone.utc)
+            self._clock = max(self._clock + timedelta(milliseconds=1), now)
+            ids = self._rng.sample(sorted(self.events), min(n, len(self.events)))
+            for eid in ids:
+                ev = self.events[eid]
+                ev["_updated"] = self._clock
+                ev["updatedAt"] = _iso(self._clock)
+                if ev["markets"]:
+                    m = self._rng.choice(ev["markets"])
+                    m["_updated"] = self._clock
+                    m["updatedAt"] = _iso(self._clock)
+                    m["outcomePrices"] = json.dumps(
+                        [f"{self._rng.random():.3f}", f"{self._rng.random():.3f}"]
+                    )
+            self._sorted.clear()
+            return ids
+
+    # ---- queries (return JSON text) ----
+    @staticmethod
+    def _public(obj: Dict[str, Any]) -> Dict[str, Any]:
+        out = {k: v for k, v in obj.items() if not k.startswith("_")}
+        if "markets" in out:
+            out["markets"] = [
+                {k: v for k, v in m.items() if not k.startswith("_")} for m in out["markets"]
+            ]
+        return out
+
+    def _ordered(self, kind: str, order: str, ascending: bool) -> List[Dict[str, Any]]:
+        key = _ORDER_KEYS.get(order, "_id")
+        cache_key = (f"{kind}:{key}", ascending)
+        rows = self._sorted.get(cache_key)
+        if rows is None:
+            src = self.events if kind == "events" else self.markets
+            rows = sorted(src.values(), key=lambda o: (o[key], o["_id"]), reverse=not ascending)
+            self._sorted[cache_key] = rows
+        return rows
+
+    def list_json(self, kind: str, params: Dict[str, List[str]]) -> str:
+        one = {k: v[-1] for k, v in params.items() if v}
+        limit = max(0, min(int(one.get("limit", 100)), 1000))
+        offset = max(0, int(one.get("offset", 0)))
+        ascending = _flag(one.get("ascending")) is not False if "ascending" in one else True
+        closed = _flag(one.get("closed"))
+        ids = {int(x) for x in params.get("id", []) if x.isdigit()}
+        with self._lock:
+            rows = self._ordered(kind, one.get("order", "id"), ascending)
+            if ids or closed is not None:
+                rows = [
+                    r
+                    for r in rows
+                    if (not ids or r["_id"] in ids) and (closed is None or r["closed"] == closed)
+                ]
+            return json.dumps([self._public(r) for r in rows[offset : offset + limit]])
+
+    def get_json(self, kind: str, obj_id: int) -> Optional[str]:
+        with self._lock:
+            obj = (self.events if kind == "events" else self.markets).get(obj_id)
+            return None if obj is None else json.dumps(self._public(obj))
+
+
+@dataclass
+class StandInStats:
+    requests: int = 0
+    served: int = 0
+    throttled: int = 0  # 429
+    errors: int = 0  # 5xx
+    not_found: int = 0
+    by_path: Dict[str, int] = field(default_factory=dict)
+
+
+class GammaStandIn:
+    """
+    Local HTTP server for a GammaCatalogue with injected latency, 429s and 5xx errors.
+    """
+
+    def __init__(
+        self,
+        catalogue: GammaCatalogue,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        rate_429: float = 0.0,
+        error_rate: float = 0.0,
+        retry_after_s: int = 1,
+        seed: int = 0,
+    ) -> None:
+        self.catalogue = catalogue
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.error_rate = error_rate
+        self.retry_after_s = retry_after_s
+        self.stats = StandInStats()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        sim = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self) -> None:  # noqa: N802
+                status, body, headers = sim.handle(self.path)
+                data = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.host, self.port = self._httpd.server_address[:2]
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="gamma-sim", daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> GammaStandIn:
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        # 没 start() 过（只用 handle()）时 shutdown() 会一直等 serve_forever 退出
+        if self._thread.is_alive():
+            self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def handle(self, target: str) -> Tuple[int, str, Dict[str, str]]:
+        """
+        (status, JSON body, extra headers) for one GET.
+
+        Also used directly by tests without a socket.
+        """
+        parts = urlsplit(target)
+        path = parts.path.rstrip("/") or "/"
+        segs = [s for s in path.split("/") if s]
+        route = "/" + "/".join(segs[:1]) + ("/{id}" if len(segs) > 1 else "")
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.by_path[route] = self.stats.by_path.get(route, 0) + 1
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+            delay = max(0.0, self.latency_ms + jitter) / 1000.0
+            r = self._rng.random()
+        if delay:
+            time.sleep(delay)
+        if r < self.rate_429:
+            with self._lock:
+                self.stats.throttled += 1
+            headers = {"Retry-After": str(self.retry_after_s)}
+            return 429, json.dumps({"error": "rate limited"}), headers
+        if r < self.rate_429 + self.error_rate:
+            with self._lock:
+                self.stats.errors += 1
+            return 503, json.dumps({"error": "upstream unavailable"}), {}
+        body: Optional[str] = None
+        if segs and segs[0] in ("events", "markets"):
+            if len(segs) == 1:
+                try:
+                    body = self.catalogue.list_json(segs[0], parse_qs(parts.query))
+                except ValueError:
+                    return 400, json.dumps({"error": "bad query"}), {}
+            elif len(segs) == 2 and segs[1].isdigit():
+                body = self.catalogue.get_json(segs[0], int(segs[1]))
+        if body is None:
+            with self._lock:
+                self.stats.not_found += 1
+            return 404, json.dumps({"error": "not found"}), {}
+        with self._lock:
+            self.stats.served += 1
+        return 200, body, {}
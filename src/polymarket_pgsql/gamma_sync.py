@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import psycopg
+from psycopg.types.json import Jsonb
+
+from polymarket_pgsql.gamma_client import GammaClient
+
+# Gamma 元数据增量同步（docs/prd.md「增量策略」）：
+# - /events 按 updatedAt 倒序分页（limit + offset），每页的 event 与其内嵌 markets 各用一条语句
+#   UPSERT 进 staging_events / staging_markets；updated_at 没变的行不改写
+#   （rowcount 即真正写入的行数）
+# - 翻到整页都早于 checkpoint - overlap 时停止；overlap 窗口覆盖上次同步时还没落地 / 时钟偏差的更新
+# - 倒序 offset 分页时，翻页期间有 event 被更新只会把它挪到第一页
+#   （后面的页整体后移一位 → 重复读到一行），不会漏行；重复的行由 UPSERT 吸收
+# - 每页单独提交；全部页成功后才推进 sync_state 里的 checkpoint（{"last_updated_at": ...}），
+#   中途失败下次从旧 checkpoint 重来
+# - fetch_details：对本次真正变更的 event 再调 Event-by-ID 取完整 markets
+#   （列表里内嵌的字段可能不全）
+#   （传入 gamma_cache.CachedGammaClient 时，与其它调用方并发的同一请求会合并，
+#   列表页里更新的 updatedAt 让缓存失效）
+
+DEFAULT_SOURCE = "gamma_events"
+
+# 整页对象作为一个 jsonb 参数发给服务端、在 SQL 里取字段：客户端只做一次 json 序列化，
+# 不逐格转换 7~9 个数组参数（纯 Python 的数组转义每页要几十毫秒）
+_STATUS_SQL = """
+case when (d->>'archived')::boolean then 'archived'
+     when (d->>'closed')::boolean then 'closed'
+     when coalesce((d->>'active')::boolean, true) then 'active'
+     else 'inactive' end
+"""
+
+_EVENTS_SQL = f"""
+insert into staging_events
+  (event_id, created_at, updated_at, status, slug, title, data, ingested_at)
+select (d->>'id')::bigint,
+       (d->>'createdAt')::timestamptz, (d->>'updatedAt')::timestamptz, {_STATUS_SQL},
+       d->>'slug', d->>'title', d, now()
+from jsonb_array_elements(%s::jsonb) as e(d)
+on conflict (event_id) do update set
+  created_at = excluded.created_at,
+  updated_at = excluded.updated_at,
+  status = excluded.status,
+  slug = excluded.slug,
+  title = excluded.title,
+  data = excluded.data,
+  ingested_at = excluded.ingested_at
+where staging_events.updated_at is distinct from excluded.updated_at
+returning event_id
+"""
+
+# event_id 按位置与 market 对齐；为 null 时取 market 自带的 events[0].id
+_MARKETS_SQL = f"""
+insert into staging_markets
+  (market_id, event_id, created_at, updated_at, status, question, condition_id, clob_token_ids,
+   data, ingested_at)
+select (d->>'id')::bigint,
+       coalesce(e.event_id, (d #>> '{{events,0,id}}')::bigint),
+       (d->>'createdAt')::timestamptz, (d->>'updatedAt')::timestamptz, {_STATUS_SQL},
+       d->>'question', d->>'conditionId',
+       -- Gamma 有时会把数组字段作为 JSON 字符串返回
+       case jsonb_typeof(d->'clobTokenIds')
+         when 'string' then (d->>'clobTokenIds')::jsonb
+         else d->'clobTokenIds'
+       end,
+       d, now()
+from jsonb_array_elements(%s::jsonb) with ordinality as m(d, k)
+join unnest(%s::bigint[]) with ordinality as e(event_id, k) using (k)
+on conflict (market_id) do update set
+  event_id = excluded.event_id,
+  created_at = excluded.created_at,
+  updated_at = excluded.updated_at,
+  status = excluded.status,
+  question = excluded.question,
+  condition_id = excluded.condition_id,
+  clob_token_ids = excluded.clob_token_ids,
+  data = excluded.data,
+  ingested_at = excluded.ingested_at
+where staging_markets.updated_at is distinct from excluded.updated_at
+"""
+
+
+@dataclass
+class SyncStats:
+    """
+    Counters of one sync run; upserted counts only rows actually inserted or changed.
+    """
+
+    pages: int = 0
+    events: int = 0  # event 行（含 overlap 里重复读到的）
+    markets: int = 0
+    events_upserted: int = 0
+    markets_upserted: int = 0
+    details: int = 0  # Event-by-ID 调用次数
+    elapsed_s: float = 0.0
+    checkpoint_s: Optional[float] = None  # 从开始到 checkpoint 提交的耗时
+    since: Optional[datetime] = None  # 本次的下界（旧 checkpoint - overlap）
+    last_updated_at: Optional[datetime] = None  # 本次之后的 checkpoint
+    changed_event_ids: List[int] = field(default_factory=list)
+
+    @property
+    def rows_upserted(self) -> int:
+        return self.events_upserted + self.markets_upserted
+
+
+def parse_ts(v: Any) -> Optional[datetime]:
+    """
+    Gamma ISO8601 timestamp ("...Z", with or without fractional seconds) -> aware datetime.
+    """
+    if not v:
+        return None
+    s = str(v).strip()
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    try:
+        ts = datetime.fromisoformat(s)
+    except ValueError:
+        return None
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
+
+
+def _int(x: Any) -> Optional[int]:
+    try:
+        return int(x)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_checkpoint(
+    conn: psycopg.Connection[Any], source: str = DEFAULT_SOURCE
+) -> Optional[datetime]:
+    row = conn.execute("select checkpoint from sync_state where source = %s", (source,)).fetchone()
+    if row is None or not isinstance(row[0], dict):
+        return None
+    return parse_ts(row[0].get("last_updated_at"))
+
+
+def write_checkpoint(
+    conn: psycopg.Connection[Any], source: str, last_updated_at: datetime, **extra: Any
+) -> None:
+    conn.execute(
+        """
+        insert into sync_state (source, checkpoint) values (%s, %s)
+        on conflict (source) do update set checkpoint = excluded.checkpoint, updated_at = now()
+        """,
+        (source, Jsonb({"last_updated_at": last_updated_at.isoformat(), **extra})),
+    )
+    conn.commit()
+
+
+def upsert_events(conn: psycopg.Connection[Any], events: Iterable[Dict[str, Any]]) -> List[int]:
+    """
+    UPSERT Gamma event objects into staging_events; returns the ids actually inserted or changed.
+    """
+    rows = [ev for ev in events if _int(ev.get("id")) is not None]
+    if not rows:
+        return []
+    return [r[0] for r in conn.execute(_EVENTS_SQL, (Jsonb(rows),)).fetchall()]
+
+
+def upsert_markets(
+    conn: psycopg.Connection[Any], markets: Iterable[Tuple[Optional[int], Dict[str, Any]]]
+) -> int:
+    """
+    UPSERT (event_id, Gamma market object) pairs into staging_markets.
+
+    Returns the number of rows inserted or changed.
+
+    event_id None means "take it from the market's own events[0].id".
+    """
+    pairs = [(eid, m) for eid, m in markets if _int(m.get("id")) is not None]
+    if not pairs:
+        return 0
+    cur = conn.execute(_MARKETS_SQL, (Jsonb([m for _, m in pairs]), [eid for eid, _ in pairs]))
+    return max(cur.rowcount, 0)
+
+
+def sync_events(
+    client: GammaClient,
+    conn: psycopg.Connection[Any],
+    *,
+    source: str = DEFAULT_SOURCE,
+    page_size: int = 100,
+    overlap_s: float = 600.0,
+    max_pages: Optional[int] = None,
+    fetch_details: bool = False,
+    params: Optional[Dict[str, Any]] = None,
+) -> SyncStats:
+    """
+    Incremental Gamma events/markets sync into staging tables.
+
+    See the module comment for the strategy.
+
+    The first run (no checkpoint) pages through the whole catalogue. A run cut short by max_pages
+    keeps the old checkpoint, so the next run covers the pages it did not reach. params are passed
+    through to /events (e.g. {"closed": "false"}).
+    """
+    t0 = time.perf_counter()
+    st = SyncStats()
+    prev = read_checkpoint(conn, source)
+    conn.commit()
+    st.since = prev - timedelta(seconds=overlap_s) if prev is not None else None
+    newest = prev
+    offset = 0
+    complete = False  # 翻到了最后一页或 checkpoint - overlap；被 max_pages 截断时不推进 checkpoint
+    while max_pages is None or st.pages < max_pages:
+        page = client.list_events(
+            order="updatedAt", ascending="false", limit=page_size, offset=offset, **(params or {})
+        )
+        if not isinstance(page, list):
+            raise RuntimeError(f"Gamma /events 返回非 list：{type(page)}")
+        st.pages += 1
+        fresh = [
+            ev
+            for ev in page
+            if isinstance(ev, dict)
+            and (st.since is None or (parse_ts(ev.get("updatedAt")) or st.since) >= st.since)
+        ]
+        for ev in fresh:
+            ts = parse_ts(ev.get("updatedAt"))
+            if ts is not None and (newest is None or ts > newest):
+                newest = ts
+        changed = upsert_events(conn, fresh)
+        st.events += len(fresh)
+        st.events_upserted += len(changed)
+        markets: List[Tuple[Optional[int], Dict[str, Any]]] = []
+        if fetch_details:
+            for eid in changed:
+                detail = client.get_event(eid)
+                st.details += 1
+                if isinstance(detail, dict):
+                    markets.extend(
+                        (eid, m) for m in detail.get("markets") or () if isinstance(m, dict)
+                    )
+        else:
+            for ev in fresh:
+                eid = _int(ev.get("id"))
+                markets.extend((eid, m) for m in ev.get("markets") or () if isinstance(m, dict))
+        st.markets += len(markets)
+        st.markets_upserted += upsert_markets(conn, markets)
+        conn.commit()
+        st.changed_event_ids.extend(changed)
+        if len(page) < page_size or len(fresh) < len(page):
+            complete = True
+            break  # 最后一页，或已翻过 checkpoint - overlap
+        offset += len(page)
+    if complete and newest is not None:
+        write_checkpoint(conn, source, newest, pages=st.pages, rows_upserted=st.rows_upserted)
+        st.checkpoint_s = time.perf_counter() - t0
+    st.last_updated_at = newest if complete else prev
+    st.elapsed_s = time.perf_counter() - t0
+    return st
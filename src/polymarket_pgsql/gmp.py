@@ -0,0 +1,521 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from decimal import Decimal
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple
+
+from polymarket_pgsql.clob_ws import FixedBook, OrderBookState, OrderBookTop
+from polymarket_pgsql.fixedpoint import PRICE_SCALE, to_decimal
+
+# GMP（同一 event 多个互斥 outcome market）一揽子套利的共享计算：
+# 实时脚本、benchmark 与后续策略都从这里取，保证口径一致。
+
+
+def d(x: float | str | Decimal) -> Decimal:
+    return x if isinstance(x, Decimal) else Decimal(str(x))
+
+
+@dataclass(frozen=True)
+class MarketTokens:
+    market_id: int
+    question: str
+    yes_asset_id: str
+    no_asset_id: str
+
+    def asset_for(self, outcome: str) -> str:
+        return self.yes_asset_id if outcome.upper() == "YES" else self.no_asset_id
+
+
+def calc_fee(*, fee_rate: Decimal, notional: Decimal) -> Decimal:
+    # 极简：按成交额比例收费（不考虑最小费/阶梯/返利等）
+    if fee_rate <= 0:
+        return d("0")
+    return (notional * fee_rate).quantize(d("0.00000001"))
+
+
+def safe_mid(bid: Optional[Decimal], ask: Optional[Decimal]) -> Optional[Decimal]:
+    if bid is None or ask is None:
+        return None
+    return (bid + ask) / d("2")
+
+
+def compute_prices(
+    *,
+    tokens: List[MarketTokens],
+    books: Dict[str, OrderBookState],
+) -> Tuple[Dict[int, Dict[str, Optional[Decimal]]], Optional[Decimal]]:
+    """
+    Returns:
+    - per_market: market_id -> {"yes_bid","yes_ask","no_bid","no_ask"}
+    - sum_yes_ask (None if incomplete)
+    """
+    per_market: Dict[int, Dict[str, Optional[Decimal]]] = {}
+    sum_yes_ask: Decimal = d("0")
+    complete = True
+
+    for t in tokens:
+        yes_top = books.get(t.yes_asset_id).top if t.yes_asset_id in books else None
+        no_top = books.get(t.no_asset_id).top if t.no_asset_id in books else None
+
+        yes_bid = yes_top.best_bid if yes_top else None
+        yes_ask = yes_top.best_ask if yes_top else None
+        no_bid = no_top.best_bid if no_top else None
+        no_ask = no_top.best_ask if no_top else None
+
+        per_market[t.market_id] = {
+            "yes_bid": yes_bid,
+            "yes_ask": yes_ask,
+            "no_bid": no_bid,
+            "no_ask": no_ask,
+        }
+
+        if yes_ask is None:
+            complete = False
+        else:
+            sum_yes_ask += yes_ask
+
+    return per_market, (sum_yes_ask if complete else None)
+
+
+@dataclass(frozen=True)
+class BasketSizing:
+    """
+    How much of a basket (one unit = one share of every leg) the book can absorb at a profit.
+
+    limit: what stopped the walk — "edge" (next level no longer profitable), "depth" (a leg ran
+    out of levels), "max_size", or "incomplete" (a leg has no book).
+    """
+
+    size: Decimal
+    cost: Decimal
+    fees: Decimal
+    payout: Decimal
+    marginal_sum: Optional[Decimal]  # sum of the legs' prices at the level where the walk stopped
+    limit: str
+
+    @property
+    def profit(self) -> Decimal:
+        return self.payout - self.cost - self.fees
+
+    @property
+    def avg_basket_price(self) -> Optional[Decimal]:
+        return self.cost / self.size if self.size > 0 else None
+
+
+def max_profitable_basket_size(
+    *,
+    tokens: List[MarketTokens],
+    books: Dict[str, OrderBookState],
+    outcome: str = "YES",
+    fee_rate: Decimal = Decimal("0"),
+    payout_per_basket: Optional[Decimal] = None,
+    max_size: Optional[Decimal] = None,
+) -> BasketSizing:
+    """
+    Walk the ask ladders of every leg together and return the largest basket size whose marginal
+    unit is still profitable: sum(marginal ask) * (1 + fee_rate) < payout_per_basket.
+
+    payout_per_basket defaults to 1 for YES baskets and N-1 for NO baskets (exactly one market
+    resolves YES). The prefix arrays cached on each OrderBookState keep this O(total levels).
+    """
+    outcome = outcome.upper()
+    n = len(tokens)
+    payout_unit = payout_per_basket
+    if payout_unit is None:
+        payout_unit = d("1") if outcome == "YES" else d(n - 1)
+    zero = d("0")
+
+    ladders = []
+    for t in tokens:
+        st = books.get(t.asset_for(outcome))
+        lad = st.ladder("ask") if st is not None else None
+        if lad is None or not lad.prices:
+            return BasketSizing(
+                size=zero, cost=zero, fees=zero, payout=zero, marginal_sum=None, limit="incomplete"
+            )
+        ladders.append(lad)
+
+    one_plus_fee = d("1") + (fee_rate if fee_rate > 0 else zero)
+    idx = [0] * n
+    size = zero
+    limit = "edge"
+    marginal: Optional[Decimal] = None
+    while True:
+        marginal = sum((lad.prices[i] for lad, i in zip(ladders, idx, strict=True)), zero)
+        if marginal * one_plus_fee >= payout_unit:
+            limit = "edge"
+            break
+        nxt = min(lad.cum_size[i] for lad, i in zip(ladders, idx, strict=True))
+        if max_size is not None and nxt >= max_size:
+            size = max_size
+            limit = "max_size"
+            break
+        size = nxt
+        exhausted = False
+        for k, lad in enumerate(ladders):
+            while idx[k] < len(lad.prices) and lad.cum_size[idx[k]] <= size:
+                idx[k] += 1
+            if idx[k] >= len(lad.prices):
+                exhausted = True
+        if exhausted:
+            limit = "depth"
+            break
+
+    cost = zero
+    fees = zero
+    for lad in ladders:
+        leg_cost = lad.walk(size).cost if size > 0 else zero
+        cost += leg_cost
+        fees += calc_fee(fee_rate=fee_rate, notional=leg_cost)
+    return BasketSizing(
+        size=size,
+        cost=cost,
+        fees=fees,
+        payout=payout_unit * size,
+        marginal_sum=marginal,
+        limit=limit,
+    )
+
+
+@dataclass(frozen=True)
+class BasketSignal:
+    """
+    One basket condition that currently holds.
+
+    kind: BUY_YES_ALL / BUY_NO_ALL (buy every leg at ask below the settlement payout) or
+          SELL_YES_ALL / SELL_NO_ALL (unwind: every leg's bid adds up to more than the payout).
+    total: sum of the legs' asks (BUY_*) or bids (SELL_*); edge is relative to payout.
+    """
+
+    kind: str
+    outcome: str
+    total: Decimal
+    payout: Decimal
+    edge: Decimal
+    n_legs: int
+
+
+class BasketState:
+    """
+    Incremental per-event top-of-book aggregate for a GMP basket.
+
+    update() touches only the leg whose asset changed and keeps running sums of the YES/NO
+    bids and asks, so evaluating all four basket conditions after a message is O(1) instead of
+    rescanning every leg's book.
+    """
+
+    _FIELDS = ("yes_bid", "yes_ask", "no_bid", "no_ask")
+    _ONE = Decimal("1")
+    _ZERO = Decimal("0")
+
+    def __init__(self, tokens: List[MarketTokens]) -> None:
+        self.tokens = list(tokens)
+        self.n = len(self.tokens)
+        # asset_id -> (leg index, bid field, ask field)
+        self._slot: Dict[str, Tuple[int, str, str]] = {}
+        for i, t in enumerate(self.tokens):
+            self._slot[t.yes_asset_id] = (i, "yes_bid", "yes_ask")
+            self._slot[t.no_asset_id] = (i, "no_bid", "no_ask")
+        self._q: Dict[str, List[Optional[Decimal]]] = {f: [None] * self.n for f in self._FIELDS}
+        self._sum: Dict[str, Decimal] = {f: self._ZERO for f in self._FIELDS}
+        self._missing: Dict[str, int] = {f: self.n for f in self._FIELDS}
+        self._payout = {"YES": self._ONE, "NO": Decimal(max(self.n - 1, 0))}
+
+    def __contains__(self, asset_id: str) -> bool:
+        return asset_id in self._slot
+
+    def _set(self, field: str, i: int, v: Optional[Decimal]) -> None:
+        arr = self._q[field]
+        old = arr[i]
+        if old == v:
+            return
+        if old is not None:
+            self._sum[field] -= old
+        else:
+            self._missing[field] -= 1
+        if v is not None:
+            self._sum[field] += v
+        else:
+            self._missing[field] += 1
+        arr[i] = v
+
+    def update(self, asset_id: str, top: OrderBookTop) -> bool:
+        """
+        Take the new top of one asset; returns False if the asset is not a leg of this basket.
+        """
+        return self.update_quote(asset_id, top.best_bid, top.best_ask)
+
+    def update_quote(
+        self, asset_id: str, best_bid: Optional[Decimal], best_ask: Optional[Decimal]
+    ) -> bool:
+        """
+        Same as update() for callers that carry bare quotes (e.g. ring records) instead of a top.
+        """
+        slot = self._slot.get(asset_id)
+        if slot is None:
+            return False
+        i, bid_field, ask_field = slot
+        self._set(bid_field, i, best_bid)
+        self._set(ask_field, i, best_ask)
+        return True
+
+    def update_leg(
+        self, leg: int, outcome: str, best_bid: Optional[Decimal], best_ask: Optional[Decimal]
+    ) -> None:
+        """
+        Same as update_quote() addressed by leg index and outcome (asset_registry.AssetMeta).
+
+        No asset id lookup.
+        """
+        if outcome == "NO":
+            self._set("no_bid", leg, best_bid)
+            self._set("no_ask", leg, best_ask)
+        else:
+            self._set("yes_bid", leg, best_bid)
+            self._set("yes_ask", leg, best_ask)
+
+    def total(self, field: str) -> Optional[Decimal]:
+        """
+        Sum of one quote ("yes_ask", "no_bid", ...) over all legs; None while any leg is missing.
+        """
+        return self._sum[field] if self._missing[field] == 0 and self.n > 0 else None
+
+    @property
+    def sum_yes_ask(self) -> Optional[Decimal]:
+        return self.total("yes_ask")
+
+    @property
+    def sum_no_ask(self) -> Optional[Decimal]:
+        return self.total("no_ask")
+
+    def payout(self, outcome: str) -> Decimal:
+        # 恰有一个 market resolve 为 YES：YES 篮子兑现 1，NO 篮子兑现 N-1
+        return self._payout[outcome.upper()]
+
+    def per_market(self) -> Dict[int, Dict[str, Optional[Decimal]]]:
+        """
+        Same shape as compute_prices()[0].
+        """
+        return {
+            t.market_id: {f: self._q[f][i] for f in self._FIELDS} for i, t in enumerate(self.tokens)
+        }
+
+    def evaluate(
+        self,
+        *,
+        fee_rate: Decimal = Decimal("0"),
+        yes_threshold: Optional[Decimal] = None,
+        no_threshold: Optional[Decimal] = None,
+    ) -> List[BasketSignal]:
+        """
+        All basket conditions that hold right now.
+
+        BUY_<O>_ALL:  sum(ask) * (1 + fee_rate) < threshold (default: payout)
+        SELL_<O>_ALL: sum(bid) * (1 - fee_rate) > payout
+        """
+        out: List[BasketSignal] = []
+        if self.n < 2:
+            return out
+        missing = self._missing
+        sums = self._sum
+        fee = fee_rate if fee_rate > 0 else None
+        for outcome, bid_field, ask_field, threshold in (
+            ("YES", "yes_bid", "yes_ask", yes_threshold),
+            ("NO", "no_bid", "no_ask", no_threshold),
+        ):
+            payout = self._payout[outcome]
+            if not missing[ask_field]:
+                ask = sums[ask_field]
+                cost = ask if fee is None else ask * (self._ONE + fee)
+                if cost < (payout if threshold is None else threshold):
+                    out.append(
+                        BasketSignal(
+                            kind="BUY_YES_ALL" if outcome == "YES" else "BUY_NO_ALL",
+                            outcome=outcome,
+                            total=ask,
+                            payout=payout,
+                            edge=(payout - cost) / payout,
+                            n_legs=self.n,
+                        )
+                    )
+            if not missing[bid_field]:
+                bid = sums[bid_field]
+                proceeds = bid if fee is None else bid * (self._ONE - fee)
+                if proceeds > payout:
+                    out.append(
+                        BasketSignal(
+                            kind="SELL_YES_ALL" if outcome == "YES" else "SELL_NO_ALL",
+                            outcome=outcome,
+                            total=bid,
+                            payout=payout,
+                            edge=(proceeds - payout) / payout,
+                            n_legs=self.n,
+                        )
+                    )
+        return out
+
+
+class FixedBasketState:
+    """
+    BasketState on fixed-point units (see fixedpoint): integer running sums, and the fee/threshold
+    conditions folded into precomputed integer limits, so evaluate() is four integer compares.
+
+    Signals carry the same Decimal values BasketState.evaluate() would produce (built only when a
+    condition holds).
+    """
+
+    _FIELDS = BasketState._FIELDS
+
+    def __init__(
+        self,
+        tokens: List[MarketTokens],
+        *,
+        fee_rate: Decimal = Decimal("0"),
+        yes_threshold: Optional[Decimal] = None,
+        no_threshold: Optional[Decimal] = None,
+    ) -> None:
+        self.tokens = list(tokens)
+        self.n = len(self.tokens)
+        self._slot: Dict[str, Tuple[int, int, int]] = {}
+        for i, t in enumerate(self.tokens):
+            self._slot[t.yes_asset_id] = (i, 0, 1)
+            self._slot[t.no_asset_id] = (i, 2, 3)
+        # 按 _FIELDS 顺序：yes_bid, yes_ask, no_bid, no_ask
+        self._q: List[List[Optional[int]]] = [[None] * self.n for _ in self._FIELDS]
+        self._sum = [0, 0, 0, 0]
+        self._missing = [self.n] * 4
+        self._payout = {"YES": Decimal(1), "NO": Decimal(max(self.n - 1, 0))}
+        self.configure(fee_rate=fee_rate, yes_threshold=yes_threshold, no_threshold=no_threshold)
+
+    def configure(
+        self,
+        *,
+        fee_rate: Decimal = Decimal("0"),
+        yes_threshold: Optional[Decimal] = None,
+        no_threshold: Optional[Decimal] = None,
+    ) -> None:
+        """
+        Precompute the integer limits.
+
+        Exact rational bounds, so no rounding differences vs Decimal.
+
+        BUY:  sum(ask) * (1 + fee) < threshold  <=>  sum_ask_units < ceil(threshold * S / (1 + fee))
+        SELL: sum(bid) * (1 - fee) > payout     <=>  sum_bid_units > floor(payout * S / (1 - fee))
+        """
+        self.fee_rate = fee_rate if fee_rate > 0 else Decimal("0")
+        self._last: Dict[str, Tuple[int, BasketSignal]] = {}
+        self._fee: Optional[Decimal] = fee_rate if fee_rate > 0 else None
+        fee = Fraction(self.fee_rate)
+        self._buy_limit: List[Optional[int]] = []
+        self._sell_limit: List[Optional[int]] = []
+        for outcome, threshold in (("YES", yes_threshold), ("NO", no_threshold)):
+            limit = Fraction(self._payout[outcome] if threshold is None else threshold)
+            self._buy_limit.append(math.ceil(limit * PRICE_SCALE / (1 + fee)))
+            # 费率 >= 1 时卖出所得 <= 0，SELL 条件永远不成立
+            payout = Fraction(self._payout[outcome])
+            self._sell_limit.append(
+                math.floor(payout * PRICE_SCALE / (1 - fee)) if fee < 1 else None
+            )
+
+    def __contains__(self, asset_id: str) -> bool:
+        return asset_id in self._slot
+
+    def _set(self, f: int, i: int, v: Optional[int]) -> None:
+        arr = self._q[f]
+        old = arr[i]
+        if old == v:
+            return
+        if old is not None:
+            self._sum[f] -= old
+        else:
+            self._missing[f] -= 1
+        if v is not None:
+            self._sum[f] += v
+        else:
+            self._missing[f] += 1
+        arr[i] = v
+
+    def update_units(self, asset_id: str, best_bid: Optional[int], best_ask: Optional[int]) -> bool:
+        slot = self._slot.get(asset_id)
+        if slot is None:
+            return False
+        i, bf, af = slot
+        self._set(bf, i, best_bid)
+        self._set(af, i, best_ask)
+        return True
+
+    def update_leg_units(
+        self, leg: int, outcome: str, best_bid: Optional[int], best_ask: Optional[int]
+    ) -> None:
+        f = 2 if outcome == "NO" else 0
+        self._set(f, leg, best_bid)
+        self._set(f + 1, leg, best_ask)
+
+    def update(self, asset_id: str, book: FixedBook) -> bool:
+        return self.update_units(asset_id, book.best_bid_units, book.best_ask_units)
+
+    def total_units(self, field: str) -> Optional[int]:
+        f = self._FIELDS.index(field)
+        return self._sum[f] if self._missing[f] == 0 and self.n > 0 else None
+
+    def total(self, field: str) -> Optional[Decimal]:
+        return to_decimal(self.total_units(field))
+
+    @property
+    def sum_yes_ask(self) -> Optional[Decimal]:
+        return self.total("yes_ask")
+
+    @property
+    def sum_no_ask(self) -> Optional[Decimal]:
+        return self.total("no_ask")
+
+    def payout(self, outcome: str) -> Decimal:
+        return self._payout[outcome.upper()]
+
+    def per_market(self) -> Dict[int, Dict[str, Optional[Decimal]]]:
+        return {
+            t.market_id: {f: to_decimal(self._q[k][i]) for k, f in enumerate(self._FIELDS)}
+            for i, t in enumerate(self.tokens)
+        }
+
+    def evaluate(self) -> List[BasketSignal]:
+        """
+        All basket conditions that hold right now (fee and thresholds from configure()).
+        """
+        out: List[BasketSignal] = []
+        if self.n < 2:
+            return out
+        missing = self._missing
+        sums = self._sum
+        for k, outcome in enumerate(("YES", "NO")):
+            bf = 2 * k
+            af = bf + 1
+            if not missing[af] and sums[af] < self._buy_limit[k]:  # type: ignore[operator]
+                out.append(self._signal(f"BUY_{outcome}_ALL", outcome, sums[af], buy=True))
+            sell_limit = self._sell_limit[k]
+            if not missing[bf] and sell_limit is not None and sums[bf] > sell_limit:
+                out.append(self._signal(f"SELL_{outcome}_ALL", outcome, sums[bf], buy=False))
+        return out
+
+    def _signal(self, kind: str, outcome: str, units: int, *, buy: bool) -> BasketSignal:
+        # 只在条件成立时转 Decimal，数值与 BasketState.evaluate() 完全一致；
+        # 信号持续期间总和不变就复用上一个
+        last = self._last.get(kind)
+        if last is not None and last[0] == units:
+            return last[1]
+        total = Decimal(units) / PRICE_SCALE
+        payout = self._payout[outcome]
+        fee = self._fee
+        if buy:
+            cost = total if fee is None else total * (Decimal(1) + fee)
+            edge = (payout - cost) / payout
+        else:
+            proceeds = total if fee is None else total * (Decimal(1) - fee)
+            edge = (proceeds - payout) / payout
+        sig = BasketSignal(
+            kind=kind, outcome=outcome, total=total, payout=payout, edge=edge, n_legs=self.n
+        )
+        self._last[kind] = (units, sig)
+        return sig
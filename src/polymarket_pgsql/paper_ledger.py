@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import psycopg
+
+# Paper trading 账本（event-sourced）：
+# - 下单/成交先追加到内存 journal，持仓（数量、均价、已实现 PnL）随每笔成交增量更新
+# - flush() 在一个事务里把 journal 批量写入
+#   paper_orders / paper_fills / paper_positions / paper_pnl：
+#   order_id 一次性从序列预取，订单与成交走 COPY，不是每笔成交一次往返
+# - flush 失败时 journal 原样保留，下次重试
+
+_ZERO = Decimal("0")
+
+_ORDERS_COPY = (
+    "copy paper_orders (order_id, event_id, market_id, side, outcome, qty, limit_price, "
+    "status, created_at, updated_at, meta) from stdin"
+)
+_ORDER_STATUS_SQL = "update paper_orders set status = %s, updated_at = %s where order_id = %s"
+_FILLS_COPY = "copy paper_fills (order_id, market_id, filled_at, qty, price, fee, meta) from stdin"
+_POSITIONS_SQL = """
+insert into paper_positions (market_id, outcome, qty, avg_price, realized_pnl)
+values (%s, %s, %s, %s, %s)
+on conflict (market_id, outcome) do update set
+  qty = excluded.qty,
+  avg_price = excluded.avg_price,
+  realized_pnl = excluded.realized_pnl,
+  updated_at = now()
+"""
+_PNL_SQL = """
+insert into paper_pnl (event_id, realized_pnl, unrealized_pnl)
+values (%s, %s, %s)
+on conflict (event_id) do update set
+  realized_pnl = excluded.realized_pnl,
+  unrealized_pnl = excluded.unrealized_pnl,
+  updated_at = now()
+"""
+
+PositionKey = Tuple[int, str]  # (market_id, outcome)
+
+
+@dataclass
+class Position:
+    market_id: int
+    outcome: str
+    qty: Decimal = _ZERO  # >0 多头；允许卖超变为负（空头）
+    avg_price: Decimal = _ZERO
+    realized_pnl: Decimal = _ZERO  # 含手续费
+    fees: Decimal = _ZERO
+
+    def apply(self, *, side: str, qty: Decimal, price: Decimal, fee: Decimal) -> Decimal:
+        """
+        Apply one fill; returns the realized PnL delta (closing part minus fee).
+        """
+        signed = qty if side == "BUY" else -qty
+        realized = -fee
+        if self.qty == 0 or (self.qty > 0) == (signed > 0):
+            new_qty = self.qty + signed
+            self.avg_price = (self.avg_price * abs(self.qty) + price * qty) / abs(new_qty)
+            self.qty = new_qty
+        else:
+            closed = min(qty, abs(self.qty))
+            direction = 1 if self.qty > 0 else -1
+            realized += (price - self.avg_price) * closed * direction
+            self.qty += signed
+            if self.qty == 0:
+                self.avg_price = _ZERO
+            elif (self.qty > 0) != (direction > 0):
+                self.avg_price = price  # 反手：剩余部分按本次价格开仓
+        self.fees += fee
+        self.realized_pnl += realized
+        return realized
+
+
+@dataclass
+class _Order:
+    key: int
+    event_id: int
+    market_id: int
+    side: str
+    outcome: str
+    qty: Decimal
+    limit_price: Optional[Decimal]
+    created_at: datetime
+    meta: Optional[Dict[str, Any]]
+    filled_qty: Decimal = _ZERO
+    updated_at: Optional[datetime] = None
+    order_id: Optional[int] = None  # 写库后才有
+
+    @property
+    def status(self) -> str:
+        if self.filled_qty <= 0:
+            return "NEW"
+        return "FILLED" if self.filled_qty >= self.qty else "PARTIAL"
+
+
+@dataclass
+class _Fill:
+    order: _Order
+    filled_at: datetime
+    qty: Decimal
+    price: Decimal
+    fee: Decimal
+    meta: Optional[Dict[str, Any]]
+
+
+def _json(x: Optional[Dict[str, Any]]) -> Optional[str]:
+    return None if x is None else json.dumps(x, default=str)
+
+
+@dataclass
+class PaperLedger:
+    """
+    In-memory order/fill journal with incrementally maintained positions for one event.
+    """
+
+    event_id: int
+    positions: Dict[PositionKey, Position] = field(default_factory=dict)
+    _orders: Dict[int, _Order] = field(default_factory=dict, repr=False)  # 未完全成交或未写库的订单
+    _new_orders: List[_Order] = field(default_factory=list, repr=False)
+    _updated_orders: Dict[int, _Order] = field(default_factory=dict, repr=False)
+    _fills: List[_Fill] = field(default_factory=list, repr=False)
+    _dirty_positions: Dict[PositionKey, Position] = field(default_factory=dict, repr=False)
+    _next_key: int = 1
+    n_orders: int = 0
+    n_fills: int = 0
+
+    # ---- journal ----
+    def submit(
+        self,
+        *,
+        market_id: int,
+        outcome: str,
+        side: str,
+        qty: Decimal,
+        as_of: datetime,
+        limit_price: Optional[Decimal] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """
+        Journal a new order; returns its local key (used by fill()).
+        """
+        side = side.upper()
+        if side not in {"BUY", "SELL"}:
+            raise ValueError(f"side must be BUY or SELL: {side!r}")
+        o = _Order(
+            key=self._next_key,
+            event_id=self.event_id,
+            market_id=market_id,
+            side=side,
+            outcome=outcome.upper(),
+            qty=qty,
+            limit_price=limit_price,
+            created_at=as_of,
+            meta=meta,
+        )
+        self._next_key += 1
+        self._orders[o.key] = o
+        self._new_orders.append(o)
+        self.n_orders += 1
+        return o.key
+
+    def fill(
+        self,
+        key: int,
+        *,
+        qty: Decimal,
+        price: Decimal,
+        as_of: datetime,
+        fee: Decimal = _ZERO,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> Decimal:
+        """
+        Journal a fill against an open order and update the position; returns realized PnL delta.
+        """
+        o = self._orders.get(key)
+        if o is None:
+            raise KeyError(f"unknown or already closed order key {key}")
+        if qty <= 0 or o.filled_qty + qty > o.qty:
+            raise ValueError(
+                f"fill qty {qty} invalid for order {key} ({o.filled_qty}/{o.qty} filled)"
+            )
+        o.filled_qty += qty
+        o.updated_at = as_of
+        if o.order_id is not None:
+            self._updated_orders[o.key] = o
+        self._fills.append(
+            _Fill(order=o, filled_at=as_of, qty=qty, price=price, fee=fee, meta=meta)
+        )
+        self.n_fills += 1
+
+        pk = (o.market_id, o.outcome)
+        pos = self.positions.get(pk)
+        if pos is None:
+            pos = self.positions[pk] = Position(market_id=o.market_id, outcome=o.outcome)
+        self._dirty_positions[pk] = pos
+        return pos.apply(side=o.side, qty=qty, price=price, fee=fee)
+
+    def execute(
+        self,
+        *,
+        market_id: int,
+        outcome: str,
+        side: str,
+        qty: Decimal,
+        price: Decimal,
+        as_of: datetime,
+        fee: Decimal = _ZERO,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> Decimal:
+        """
+        Market order filled completely at price (submit + fill); returns realized PnL delta.
+        """
+        key = self.submit(
+            market_id=market_id, outcome=outcome, side=side, qty=qty, as_of=as_of, meta=meta
+        )
+        return self.fill(key, qty=qty, price=price, as_of=as_of, fee=fee)
+
+    # ---- views ----
+    @property
+    def realized_pnl(self) -> Decimal:
+        return sum((p.realized_pnl for p in self.positions.values()), _ZERO)
+
+    def unrealized_pnl(self, marks: Mapping[PositionKey, Optional[Decimal]]) -> Optional[Decimal]:
+        """
+        Mark open positions at marks[(market_id, outcome)]; None if an open position has no mark.
+        """
+        total = _ZERO
+        for pk, pos in self.positions.items():
+            if pos.qty == 0:
+                continue
+            mark = marks.get(pk)
+            if mark is None:
+                return None
+            total += (mark - pos.avg_price) * pos.qty
+        return total
+
+    @property
+    def pending(self) -> int:
+        """
+        Journal entries not yet written to PG.
+        """
+        return len(self._new_orders) + len(self._updated_orders) + len(self._fills)
+
+    # ---- persistence ----
+    def flush(
+        self, conn: psycopg.Connection[Any], *, unrealized_pnl: Optional[Decimal] = None
+    ) -> int:
+        """
+        Write the journal (orders, fills, touched positions, event PnL) in one transaction.
+
+        Returns the number of order/fill events written. On error nothing is committed and the
+        journal is kept for the next flush.
+        """
+        new_orders = list(self._new_orders)
+        updated = list(self._updated_orders.values())
+        fills = list(self._fills)
+        positions = list(self._dirty_positions.values())
+        assigned: List[_Order] = []
+        try:
+            with conn.transaction():
+                with conn.cursor() as cur:
+                    if new_orders:
+                        cur.execute(
+                            "select nextval(pg_get_serial_sequence('paper_orders', 'order_id')) "
+                            "from generate_series(1, %s)",
+                            (len(new_orders),),
+                        )
+                        for o, (oid,) in zip(new_orders, cur.fetchall(), strict=True):
+                            o.order_id = int(oid)
+                            assigned.append(o)
+                        with cur.copy(_ORDERS_COPY) as cp:
+                            for o in new_orders:
+                                cp.write_row(
+                                    (
+                                        o.order_id,
+                                        o.event_id,
+                                        o.market_id,
+                                        o.side,
+                                        o.outcome,
+                                        o.qty,
+                                        o.limit_price,
+                                        o.status,
+                                        o.created_at,
+                                        o.updated_at or o.created_at,
+                                        _json(o.meta),
+                                    )
+                                )
+                    if updated:
+                        cur.executemany(
+                            _ORDER_STATUS_SQL,
+                            [(o.status, o.updated_at, o.order_id) for o in updated],
+                        )
+                    if fills:
+                        with cur.copy(_FILLS_COPY) as cp:
+                            for f in fills:
+                                cp.write_row(
+                                    (
+                                        f.order.order_id,
+                                        f.order.market_id,
+                                        f.filled_at,
+                                        f.qty,
+                                        f.price,
+                                        f.fee,
+                                        _json(f.meta),
+                                    )
+                                )
+                    if positions:
+                        cur.executemany(
+                            _POSITIONS_SQL,
+                            [
+                                (p.market_id, p.outcome, p.qty, p.avg_price, p.realized_pnl)
+                                for p in positions
+                            ],
+                        )
+                    unrealized = unrealized_pnl if unrealized_pnl is not None else _ZERO
+                    cur.execute(_PNL_SQL, (self.event_id, self.realized_pnl, unrealized))
+        except Exception:
+            for o in assigned:
+                o.order_id = None
+            raise
+
+        # 写库成功：清空 journal；已完全成交的订单不再需要留在内存里
+        self._new_orders.clear()
+        self._updated_orders.clear()
+        self._fills.clear()
+        self._dirty_positions.clear()
+        for o in new_orders + updated:
+            if o.status == "FILLED":
+                self._orders.pop(o.key, None)
+        return len(new_orders) + len(updated) + len(fills)
+
+    def restore_positions(self, positions: Iterable[Position]) -> None:
+        """
+        Load positions from a checkpoint; their orders/fills are not journaled again, but the
+        positions are marked dirty so the next flush brings paper_positions up to date.
+        """
+        for p in positions:
+            key = (p.market_id, p.outcome)
+            self.positions[key] = p
+            self._dirty_positions[key] = p
@@ -1,28 +1,116 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Iterator, Optional
 
 import psycopg
 from psycopg.types.json import Jsonb
 
+from polymarket_pgsql import checkpoint
+from polymarket_pgsql.asset_registry import AssetRegistry
+from polymarket_pgsql.clob_ws import OrderBookTop
+from polymarket_pgsql.depth_codec import DepthRecorder
+from polymarket_pgsql.paper_ledger import PaperLedger
+from polymarket_pgsql.rollups import BarRoller
+from polymarket_pgsql.signal_bus import CHANNEL_PREFIX
+
+# 写库延迟主要是往返次数（PG 不在同机房时每条语句 1 个 RTT）：
+# - 热路径的 upsert/insert 用服务端 prepared statement（prepare=True，只解析/规划一次）
+# - batch() 里的写入走 psycopg pipeline 模式 + 一个事务：语句连发不等结果，
+#   提交时一次同步（约 1 个 RTT）
+# - 可选连接池（make_pool）：同一进程里多个 PgWriter 共用，close() 把连接还回池
+# COPY 不能在 pipeline 里执行：ledger / bars / depth 的 flush 各自一个事务，不要放进 batch()。
+# 信号 insert 与按 kind 的 pg_notify 是同一条语句（polymarket_pgsql.signal_bus），
+# 随所在事务一起提交。
+
+_SIGNAL_SQL = """
+insert into arb_signals (event_id, as_of, kind, edge, detail)
+values (%(event_id)s, %(as_of)s, %(kind)s, %(edge)s, %(detail)s)
+"""
+
+# payload 与 signal_bus.SignalMessage.payload() 同格式
+_SIGNAL_NOTIFY_SQL = f"""
+with s as ({_SIGNAL_SQL} returning signal_id, event_id, as_of, kind, edge)
+select pg_notify(
+  '{CHANNEL_PREFIX}' || lower(s.kind),
+  concat_ws(' ', s.event_id, s.edge, (extract(epoch from s.as_of) * 1000000)::bigint, s.signal_id)
+)
+from s
+"""
+
+# 整批 latest 一条语句：asset_price_latest 上的语句级触发器（event_basket_latest）
+# 每次 flush 只跑一次，每个受影响的 event 重算一次；
+# 同一条语句里 asset_id 不能重复（upsert_asset_latest_many 已去重）
+_LATEST_MANY_SQL = """
+insert into asset_price_latest as l (
+  asset_id, market_id, outcome, as_of, best_bid, best_ask, mid, source, raw
+)
+select d->>'asset_id', (d->>'market_id')::bigint, d->>'outcome', (d->>'as_of')::timestamptz,
+       (d->>'best_bid')::numeric, (d->>'best_ask')::numeric, (d->>'mid')::numeric,
+       d->>'source', d->'raw'
+from jsonb_array_elements(%s::jsonb) as x(d)
+on conflict (asset_id) do update set
+  market_id = excluded.market_id,
+  outcome = excluded.outcome,
+  as_of = excluded.as_of,
+  best_bid = excluded.best_bid,
+  best_ask = excluded.best_ask,
+  mid = excluded.mid,
+  source = excluded.source,
+  raw = excluded.raw,
+  updated_at = now()
+"""
+
+
+def _num(x: Optional[Decimal]) -> Optional[str]:
+    # 价格以字符串进 jsonb，库端 ::numeric 原样还原（不经 float）
+    return None if x is None else str(x)
+
+
+def make_pool(database_url: str, *, min_size: int = 1, max_size: int = 4) -> Any:
+    """
+    Autocommit connection pool (psycopg_pool.ConnectionPool) to share between PgWriters.
+    """
+    try:
+        from psycopg_pool import ConnectionPool
+    except ImportError as e:
+        raise RuntimeError("连接池需要 psycopg-pool：pip install psycopg-pool") from e
+    return ConnectionPool(
+        database_url,
+        min_size=min_size,
+        max_size=max_size,
+        kwargs={"autocommit": True},
+        open=True,
+        name="polymarket_pgsql",
+    )
+
 
 @dataclass
 class PgWriter:
     database_url: str
     conn: Optional[psycopg.Connection[Any]] = None
+    pool: Optional[Any] = None  # psycopg_pool.ConnectionPool：有则从池里借连接
+    notify_signals: bool = True  # 插入信号时同时 NOTIFY arb_signal_<kind>
 
     def connect(self) -> None:
         if self.conn is not None and not self.conn.closed:
             return
-        self.conn = psycopg.connect(self.database_url, autocommit=True)
+        if self.pool is not None:
+            self.conn = self.pool.getconn()
+        else:
+            self.conn = psycopg.connect(self.database_url, autocommit=True)
 
     def close(self) -> None:
         if self.conn is not None:
             try:
-                self.conn.close()
+                if self.pool is not None:
+                    # 坏连接由池丢弃并补新的
+                    self.pool.putconn(self.conn)
+                else:
+                    self.conn.close()
             finally:
                 self.conn = None
 
@@ -31,6 +119,18 @@ class PgWriter:
         assert self.conn is not None
         return self.conn
 
+    @contextmanager
+    def batch(self) -> Iterator[psycopg.Connection[Any]]:
+        """
+        Pipeline the writes made inside the block and commit them in one transaction (about one
+        round trip).
+
+        Errors surface when the block exits and roll back the whole batch.
+        """
+        conn = self._ensure()
+        with conn.pipeline(), conn.transaction():
+            yield conn
+
     def upsert_asset_latest(
         self,
         *,
@@ -74,8 +174,34 @@ class PgWriter:
                 "source": source,
                 "raw": Jsonb(raw),
             },
+            prepare=True,
         )
 
+    def upsert_asset_latest_many(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        UPSERT many asset_price_latest rows (same keys as upsert_asset_latest) in one statement.
+
+        The basket statement triggers then fire once per flush instead of once per asset;
+        the last row of an asset_id wins. Returns the number of rows sent.
+        """
+        by_asset: Dict[str, Dict[str, Any]] = {}
+        for r in rows:
+            by_asset[r["asset_id"]] = {
+                "asset_id": r["asset_id"],
+                "market_id": int(r["market_id"]),
+                "outcome": r["outcome"],
+                "as_of": r["as_of"].isoformat(),
+                "best_bid": _num(r["best_bid"]),
+                "best_ask": _num(r["best_ask"]),
+                "mid": _num(r["mid"]),
+                "source": r["source"],
+                "raw": r["raw"],
+            }
+        if not by_asset:
+            return 0
+        self._ensure().execute(_LATEST_MANY_SQL, (Jsonb(list(by_asset.values())),), prepare=True)
+        return len(by_asset)
+
     def insert_asset_tick(
         self,
         *,
@@ -110,6 +236,7 @@ class PgWriter:
                 "source": source,
                 "raw": Jsonb(raw),
             },
+            prepare=True,
         )
 
     def insert_arb_signal(
@@ -123,11 +250,9 @@ class PgWriter:
     ) -> None:
         conn = self._ensure()
         conn.execute(
-            """
-            insert into arb_signals (event_id, as_of, kind, edge, detail)
-            values (%(event_id)s, %(as_of)s, %(kind)s, %(edge)s, %(detail)s)
-            """,
+            _SIGNAL_NOTIFY_SQL if self.notify_signals else _SIGNAL_SQL,
             {"event_id": event_id, "as_of": as_of, "kind": kind, "edge": edge, "detail": Jsonb(detail)},
+            prepare=True,
         )
 
     def upsert_paper_pnl(
@@ -148,8 +273,40 @@ class PgWriter:
               updated_at = now()
             """,
             {"event_id": event_id, "realized": realized_pnl, "unrealized": unrealized_pnl},
+            prepare=True,
         )
 
+    def flush_paper_ledger(
+        self, ledger: PaperLedger, *, unrealized_pnl: Optional[Decimal] = None
+    ) -> int:
+        """
+        Write the ledger's pending orders/fills/positions and the event pnl in one transaction.
+        """
+        return ledger.flush(self._ensure(), unrealized_pnl=unrealized_pnl)
+
+    def flush_bars(self, roller: BarRoller, *, now: Optional[datetime] = None) -> int:
+        """
+        Write completed rollup bars (asset_price_bars / event_basket_bars) in one transaction.
+        """
+        return roller.flush(self._ensure(), now=now)
+
+    def flush_depth(self, recorder: DepthRecorder) -> int:
+        """
+        COPY buffered L2 depth frames into asset_depth_snapshots in one transaction.
+        """
+        return recorder.flush(self._ensure())
+
+    def save_asset_registry(self, registry: AssetRegistry) -> int:
+        """
+        Persist the asset id -> key mapping (asset_registry); returns rows inserted or changed.
+        """
+        return registry.persist(self._ensure())
 
+    def save_checkpoint(self, cp: checkpoint.EngineCheckpoint) -> None:
+        checkpoint.save_pg(self._ensure(), cp)
 
+    def load_checkpoint(self, event_id: int) -> Optional[checkpoint.EngineCheckpoint]:
+        return checkpoint.load_pg(self._ensure(), event_id)
 
+    def latest_tops(self, asset_ids: Iterable[str]) -> Dict[str, OrderBookTop]:
+        return checkpoint.latest_tops(self._ensure(), asset_ids)
@@ -0,0 +1,640 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import multiprocessing as mp
+import os
+import queue
+import signal
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from polymarket_pgsql.asset_registry import AssetRegistry
+from polymarket_pgsql.book_sync import BookSync
+from polymarket_pgsql.clob_rest import ClobRestClient
+from polymarket_pgsql.clob_ws import FixedBook, market_channel_stream
+from polymarket_pgsql.fixedpoint import PRICE_SCALE, to_decimal
+from polymarket_pgsql.gmp import FixedBasketState, MarketTokens, safe_mid
+from polymarket_pgsql.ring import REC_BASKET, REC_SIGNAL, REC_TOP, ShmRing
+from polymarket_pgsql.rollups import BarRoller
+from polymarket_pgsql.signal_bus import SignalMessage, SignalPublisher
+from polymarket_pgsql.status import (
+    ConsoleRenderer,
+    EventStatus,
+    StatusBoard,
+    StatusServer,
+    StatusSnapshot,
+    basket_edge,
+    top_by_edge,
+)
+
+# 多进程流水线（绕开 GIL，按核数扩展）：
+#
+#   ingest × K ──ring──┐
+#   (WS 分片 + books)   ├─> strategy ──ring──> writer
+#   ingest × K ──ring──┘   (FixedBasketState)  (PG)
+#
+# - ingest：每个进程一条 WS 连接，负责一部分 event
+#   （同一 event 的腿在同一连接上；event 数少于 K 时按 market 分），
+#   解码、维护 FixedBook（价格入口即解析成整数 tick），
+#   top 变化时往自己的 ring 里写一条 REC_TOP（整数 tick，不 pickle）
+#   （BookSync 逐 asset 校验盘口，漂移时只对该 asset 走 REST /book 重建）
+# - strategy：轮询所有 ingest ring，增量更新各 event 的 FixedBasketState（纯整数比较），
+#   信号上升沿写 REC_SIGNAL；行情与信号一并转给 writer
+# - writer：按 asset 合并最新 top，每 db_interval_s 批量写 asset_price_latest（可选 ticks）
+#   与滚动 K 线，信号立即写（insert 同一语句里 NOTIFY arb_signal_<kind>）；
+#   signal_socket 时 strategy 在上升沿直接发到本机 Unix socket
+# - 状态：strategy 每 print_interval_s 把按 edge 排序的前 status_top 个 event 打成不可变快照
+#   经队列送到主进程，由主进程打印 / 提供 HTTP 状态页（渲染不占 strategy 的时间）
+# asset/event 用下标表示：asset 下标即 AssetRegistry 的 key（由配置确定性生成，各进程一致），
+# ingest 只在 WS 入口查一次 asset_id -> key，之后 books、篮子腿、K 线与写库缓冲都按 key 取；
+# writer 启动时把映射写进 asset_registry。
+
+SIGNAL_KINDS = ("BUY_YES_ALL", "BUY_NO_ALL", "SELL_YES_ALL", "SELL_NO_ALL")
+_KIND_CODE = {k: i + 1 for i, k in enumerate(SIGNAL_KINDS)}
+NO_PRICE = -1
+
+EventTokens = Tuple[int, List[MarketTokens]]  # (event_id, legs)
+
+
+@dataclass
+class PipelineConfig:
+    ws_url: str
+    events: List[EventTokens]
+    ingest_procs: int = 2
+    auth: Optional[Dict[str, str]] = None
+    ping_interval_s: float = 5.0
+    reconnect_delay_s: float = 3.0
+    fee_rate: str = "0"
+    yes_threshold: Optional[str] = None
+    no_threshold: Optional[str] = None
+    database_url: Optional[str] = None
+    db_interval_s: float = 5.0
+    write_ticks: bool = False
+    print_interval_s: float = 1.0
+    status_top: int = 10  # 状态快照里按 edge 展示的 event 数
+    status_port: int = 0  # >0：主进程在该端口提供 HTTP 状态页
+    status_host: str = "127.0.0.1"
+    bar_intervals: Tuple[int, ...] = (1, 60)
+    ring_capacity: int = 1 << 16
+    ring_prefix: str = field(default_factory=lambda: f"pm_ring_{os.getpid()}")
+    clob_rest_url: Optional[str] = None  # 盘口漂移时按 asset 重同步用的 REST 地址；None=只校验
+    book_stale_s: float = 0.0
+    signal_socket: Optional[str] = None  # strategy 进程把新信号发布到该 Unix socket（signal_bus）
+
+    def registry(self) -> AssetRegistry:
+        """
+        Every leg's YES/NO asset interned in event order; the key is the asset's ring index.
+        """
+        return AssetRegistry.from_events(self.events)
+
+    def shard_of(self, registry: Optional[AssetRegistry] = None) -> List[int]:
+        """
+        Ingest shard of every asset key; YES/NO of a market always share one.
+        """
+        reg = registry if registry is not None else self.registry()
+        if len(self.events) >= self.ingest_procs:
+            return [m.event % self.ingest_procs for m in reg]
+        return [(m.key // 2) % self.ingest_procs for m in reg]
+
+    def ingest_ring(self, k: int) -> str:
+        return f"{self.ring_prefix}_in{k}"
+
+    @property
+    def writer_ring(self) -> str:
+        return f"{self.ring_prefix}_out"
+
+
+def _price(t: int) -> Optional[Decimal]:
+    return None if t == NO_PRICE else to_decimal(t)
+
+
+def _units(t: Optional[int]) -> int:
+    return NO_PRICE if t is None else t
+
+
+def _ns_to_dt(ns: int) -> datetime:
+    return datetime.fromtimestamp(ns / 1e9, tz=timezone.utc)
+
+
+def _pct(xs: List[float], q: float) -> float:
+    if not xs:
+        return float("nan")
+    if len(xs) < 2:
+        return xs[0]
+    return statistics.quantiles(xs, n=100, method="inclusive")[int(q) - 1]
+
+
+# ---------------- ingest ----------------
+
+
+def ingest_main(cfg: PipelineConfig, k: int) -> None:
+    ring = ShmRing.attach(cfg.ingest_ring(k))
+    registry = cfg.registry()
+    try:
+        asyncio.run(_ingest(cfg, k, ring, registry))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+async def _ingest(cfg: PipelineConfig, k: int, ring: ShmRing, registry: AssetRegistry) -> None:
+    mine = [i for i, shard in enumerate(cfg.shard_of(registry)) if shard == k]
+    index = {registry.ids[i]: i for i in mine}  # 入口处唯一一次按字符串查找
+    asset_ids = [registry.ids[i] for i in mine]
+    books: Dict[int, FixedBook] = {}  # asset key -> book
+    sent: Dict[int, Tuple[int, int]] = {}  # asset key -> (bid, ask) last pushed
+    sync = BookSync(
+        client=ClobRestClient(cfg.clob_rest_url) if cfg.clob_rest_url else None,
+        books=books,
+        # 多进程模式写库用自己的 raw，book 不需要留原始消息
+        book_factory=functools.partial(FixedBook, raw_retention="none"),
+        asset_ids=mine,
+        asset_id_of=registry.ids.__getitem__,
+        stale_after_s=cfg.book_stale_s,
+        log=lambda msg: print(f"[ingest {k}] {msg}", flush=True),
+    )
+
+    def push(i: int, st: FixedBook, as_of_ns: int, src_ns: int) -> None:
+        q = (_units(st.best_bid_units), _units(st.best_ask_units))
+        if sent.get(i) == q:
+            return
+        sent[i] = q
+        ring.put(REC_TOP, 0, i, q[0], q[1], as_of_ns, src_ns)
+
+    while True:
+        try:
+            async for as_of, asset_id, ev in market_channel_stream(
+                ws_url=cfg.ws_url,
+                asset_ids=asset_ids,
+                auth=cfg.auth,
+                ping_interval_s=cfg.ping_interval_s,
+                recv_timeout_s=max(10.0, cfg.ping_interval_s * 6),
+            ):
+                i = index.get(asset_id)
+                if i is None:
+                    continue
+                as_of_ns = int(as_of.timestamp() * 1e9)
+                for j in sync.poll():
+                    push(j, books[j], as_of_ns, as_of_ns)
+                st = sync.on_event(as_of, i, ev)
+                if st is None:
+                    continue
+                raw = ev.get("raw")
+                src_ns = raw.get("sim_sent_ns") if isinstance(raw, dict) else None
+                push(i, st, as_of_ns, int(src_ns) if src_ns else as_of_ns)
+        except Exception as e:
+            ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+            print(
+                f"[{ts}] [ingest {k}] WS error: {type(e).__name__}: {e} (reconnect...)", flush=True
+            )
+            await asyncio.sleep(cfg.reconnect_delay_s)
+
+
+# ---------------- strategy ----------------
+
+
+def _status_snapshot(
+    cfg: PipelineConfig,
+    baskets: List[FixedBasketState],
+    active: List[set],
+    fee_rate: Decimal,
+    yes_threshold: Optional[Decimal],
+    no_threshold: Optional[Decimal],
+    *,
+    feed: Tuple[Tuple[str, Any], ...],
+) -> StatusSnapshot:
+    # 所有 event 只算一个 edge（float），只有前 status_top 个转成展示用的行
+    edges = [basket_edge(b, fee_rate) for b in baskets]
+    rows = []
+    for e in top_by_edge(edges, cfg.status_top):
+        b = baskets[e]
+        rows.append(
+            EventStatus(
+                event_id=cfg.events[e][0],
+                sum_yes_ask=b.sum_yes_ask,
+                sum_no_ask=b.sum_no_ask,
+                yes_limit=b.payout("YES") if yes_threshold is None else yes_threshold,
+                no_limit=b.payout("NO") if no_threshold is None else no_threshold,
+                edge=edges[e],
+                signals=tuple(sorted(active[e])),
+            )
+        )
+    return StatusSnapshot(
+        as_of=datetime.now(timezone.utc), events=tuple(rows), n_events=len(baskets), feed=feed
+    )
+
+
+def strategy_main(cfg: PipelineConfig, stop: Any, done: Any, status_q: Any) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # 由主进程通过 stop 事件收尾
+    status_q.cancel_join_thread()  # 收尾时主进程不再读队列：退出不等没送出的快照
+    rings = [ShmRing.attach(cfg.ingest_ring(k)) for k in range(cfg.ingest_procs)]
+    out = ShmRing.attach(cfg.writer_ring) if cfg.database_url else None
+    pub = SignalPublisher(cfg.signal_socket) if cfg.signal_socket else None
+    try:
+        _strategy(cfg, stop, rings, out, status_q, pub)
+    finally:
+        for r in rings:
+            r.close()
+        if out is not None:
+            out.close()
+        if pub is not None:
+            pub.close()
+        done.set()
+
+
+def _strategy(
+    cfg: PipelineConfig,
+    stop: Any,
+    rings: List[ShmRing],
+    out: Optional[ShmRing],
+    status_q: Any,
+    pub: Optional[SignalPublisher] = None,
+) -> None:
+    meta = cfg.registry().meta
+    fee_rate = Decimal(cfg.fee_rate)
+    yes_threshold = Decimal(cfg.yes_threshold) if cfg.yes_threshold is not None else None
+    no_threshold = Decimal(cfg.no_threshold) if cfg.no_threshold is not None else None
+    baskets = [
+        FixedBasketState(
+            tokens, fee_rate=fee_rate, yes_threshold=yes_threshold, no_threshold=no_threshold
+        )
+        for _, tokens in cfg.events
+    ]
+    active: List[set] = [set() for _ in cfg.events]
+
+    n_records = 0
+    n_signals = 0
+    lat_ms: List[float] = []
+    last_print = time.monotonic()
+    stopping = False
+    parent = os.getppid()  # 主进程异常退出时不留孤儿
+    while True:
+        if stop.is_set():
+            stopping = True  # ingest 已退出：把 ring 里剩下的读完再走
+        # event index -> (as_of_ns, src_ns) of its latest record
+        dirty: Dict[int, Tuple[int, int]] = {}
+        got = 0
+        for r in rings:
+            batch = r.get_batch()
+            got += len(batch)
+            for rtype, code, i, bid, ask, as_of_ns, src_ns in batch:
+                if rtype != REC_TOP:
+                    continue
+                m = meta[i]
+                e = m.event
+                baskets[e].update_leg_units(
+                    m.leg,
+                    m.outcome,
+                    None if bid == NO_PRICE else bid,
+                    None if ask == NO_PRICE else ask,
+                )
+                dirty[e] = (as_of_ns, src_ns)
+                if out is not None:
+                    out.put(rtype, code, i, bid, ask, as_of_ns, src_ns)
+            if batch:
+                now_ns = time.time_ns()
+                lat_ms.append((now_ns - batch[-1][6]) / 1e6)
+        n_records += got
+
+        for e, (as_of_ns, src_ns) in dirty.items():
+            b = baskets[e]
+            if out is not None and cfg.bar_intervals:
+                out.put(
+                    REC_BASKET,
+                    0,
+                    e,
+                    _units(b.total_units("yes_ask")),
+                    _units(b.total_units("no_ask")),
+                    as_of_ns,
+                    src_ns,
+                )
+            signals = b.evaluate()
+            kinds = {s.kind for s in signals}
+            for sig in signals:
+                if sig.kind in active[e]:
+                    continue
+                n_signals += 1
+                if pub is not None:
+                    pub.publish(
+                        SignalMessage(
+                            kind=sig.kind,
+                            event_id=cfg.events[e][0],
+                            edge=sig.edge,
+                            as_of=_ns_to_dt(as_of_ns),
+                        )
+                    )
+                if out is not None:
+                    out.put(
+                        REC_SIGNAL,
+                        _KIND_CODE[sig.kind],
+                        e,
+                        int(sig.edge * PRICE_SCALE),
+                        int(sig.total * PRICE_SCALE),
+                        as_of_ns,
+                        src_ns,
+                    )
+            active[e] = kinds
+
+        now = time.monotonic()
+        if now - last_print >= cfg.print_interval_s:
+            sec = now - last_print
+            last_print = now
+            feed: Tuple[Tuple[str, Any], ...] = (
+                ("records_per_s", n_records / sec),
+                ("signals", n_signals),
+                ("backlog", sum(len(r) for r in rings)),
+                (
+                    "lat_ms_p50_p99_max",
+                    (_pct(lat_ms, 50), _pct(lat_ms, 99), max(lat_ms, default=float("nan"))),
+                ),
+                ("active", (sum(1 for a in active if a), len(active))),
+            )
+            if out is not None:
+                feed += (("writer_backlog", len(out)),)
+            if pub is not None:
+                feed += (("signal_subscribers", pub.subscribers),)
+            try:
+                status_q.put_nowait(
+                    _status_snapshot(
+                        cfg, baskets, active, fee_rate, yes_threshold, no_threshold, feed=feed
+                    )
+                )
+            except queue.Full:
+                pass  # 主进程没跟上：丢掉这一帧，下一帧更新
+            n_records = 0
+            lat_ms = []
+
+        if not got:
+            if stopping or os.getppid() != parent:
+                return
+            if pub is not None:
+                pub.flush()  # 空闲时补发积压、接受新订阅者
+            time.sleep(0.0002)
+
+
+# ---------------- writer ----------------
+
+
+def writer_main(cfg: PipelineConfig, upstream_done: Any) -> None:
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from polymarket_pgsql.pg_writer import PgWriter
+
+    ring = ShmRing.attach(cfg.writer_ring)
+    assert cfg.database_url is not None
+    db = PgWriter(cfg.database_url)
+    registry = cfg.registry()
+    try:
+        db.save_asset_registry(registry)
+    except Exception as e:
+        print(f"[writer] asset_registry persist failed: {type(e).__name__}: {e}", flush=True)
+    try:
+        _writer(cfg, ring, db, upstream_done, registry)
+    finally:
+        ring.close()
+        db.close()
+
+
+def _writer(
+    cfg: PipelineConfig, ring: ShmRing, db: Any, upstream_done: Any, registry: AssetRegistry
+) -> None:
+    meta = registry.meta
+    latest: Dict[int, Tuple[int, int, int]] = {}  # asset key -> (bid, ask, as_of_ns)，只留最新
+    ticks: List[Tuple[int, int, int, int]] = []  # (asset key, bid, ask, as_of_ns)
+    bars = BarRoller(cfg.bar_intervals) if cfg.bar_intervals else None
+    last_flush = time.monotonic()
+
+    def reconnect() -> None:
+        try:
+            db.close()
+        except Exception:
+            pass
+        db.connect()
+
+    def write_tops(
+        pending: Dict[int, Tuple[int, int, int]], pending_ticks: List[Tuple[int, int, int, int]]
+    ) -> None:
+        rows = []
+        for i, (bid, ask, as_of_ns) in pending.items():
+            m = meta[i]
+            b, a = _price(bid), _price(ask)
+            rows.append(
+                {
+                    "asset_id": m.asset_id,
+                    "market_id": m.market_id,
+                    "outcome": m.outcome,
+                    "as_of": _ns_to_dt(as_of_ns),
+                    "best_bid": b,
+                    "best_ask": a,
+                    "mid": safe_mid(b, a),
+                    "source": "clob_ws",
+                    "raw": {"pipeline": True},
+                }
+            )
+        # 一条语句写整批 latest：event_basket_latest 触发器每次 flush 只跑一次
+        db.upsert_asset_latest_many(rows)
+        for i, bid, ask, as_of_ns in pending_ticks:
+            m = meta[i]
+            b, a = _price(bid), _price(ask)
+            db.insert_asset_tick(
+                asset_id=m.asset_id,
+                market_id=m.market_id,
+                outcome=m.outcome,
+                as_of=_ns_to_dt(as_of_ns),
+                best_bid=b,
+                best_ask=a,
+                mid=safe_mid(b, a),
+                source="clob_ws",
+                raw={"pipeline": True},
+            )
+
+    def flush() -> None:
+        nonlocal latest, ticks
+        pending, pending_ticks = latest, ticks
+        latest, ticks = {}, []
+        try:
+            # latest + ticks 一个 pipeline 事务（约 1 个往返）
+            with db.batch():
+                write_tops(pending, pending_ticks)
+        except Exception as e:
+            print(f"[writer] flush failed: {type(e).__name__}: {e} (retry next flush)", flush=True)
+            # 没写成的并回去（新数据优先）
+            for i, v in pending.items():
+                latest.setdefault(i, v)
+            ticks = pending_ticks + ticks
+            reconnect()
+            return
+        if bars is not None:
+            try:
+                db.flush_bars(bars, now=datetime.now(timezone.utc))
+            except Exception as e:
+                print(
+                    f"[writer] bar flush failed: {type(e).__name__}: {e} (retry next flush)",
+                    flush=True,
+                )
+                reconnect()
+
+    db.connect()
+    parent = os.getppid()
+    while True:
+        batch = ring.get_batch()
+        signals: List[Tuple[int, int, int, int, int]] = []
+        for rtype, code, i, a, b, as_of_ns, _ in batch:
+            if rtype == REC_TOP:
+                latest[i] = (a, b, as_of_ns)
+                if cfg.write_ticks:
+                    ticks.append((i, a, b, as_of_ns))
+                if bars is not None:
+                    m = meta[i]
+                    bars.on_top(
+                        m.asset_id,
+                        as_of=_ns_to_dt(as_of_ns),
+                        best_bid=_price(a),
+                        best_ask=_price(b),
+                        market_id=m.market_id,
+                        outcome=m.outcome,
+                        key=i,
+                    )
+            elif rtype == REC_BASKET:
+                if bars is not None:
+                    bars.on_basket(
+                        cfg.events[i][0],
+                        as_of=_ns_to_dt(as_of_ns),
+                        sum_yes_ask=_price(a),
+                        sum_no_ask=_price(b),
+                    )
+            elif rtype == REC_SIGNAL:
+                signals.append((i, code, a, b, as_of_ns))
+        if signals:
+            # 信号不等定时 flush：每批 ring 记录里的信号一个 pipeline 事务写完
+            try:
+                with db.batch():
+                    for i, code, a, b, as_of_ns in signals:
+                        event_id, tokens = cfg.events[i]
+                        db.insert_arb_signal(
+                            event_id=event_id,
+                            as_of=_ns_to_dt(as_of_ns),
+                            kind=SIGNAL_KINDS[code - 1],
+                            edge=Decimal(a) / PRICE_SCALE,
+                            detail={
+                                "total": str(Decimal(b) / PRICE_SCALE),
+                                "fee_rate": cfg.fee_rate,
+                                "markets": [t.market_id for t in tokens],
+                                "pipeline": True,
+                            },
+                        )
+            except Exception as e:
+                print(f"[writer] signal insert failed: {type(e).__name__}: {e}", flush=True)
+                reconnect()
+        now = time.monotonic()
+        if now - last_flush >= cfg.db_interval_s:
+            last_flush = now
+            flush()
+        if not batch:
+            if (upstream_done.is_set() or os.getppid() != parent) and len(ring) == 0:
+                if bars is not None:
+                    bars.close_all()
+                flush()
+                return
+            time.sleep(0.0005)
+
+
+# ---------------- supervisor ----------------
+
+
+def run(cfg: PipelineConfig) -> int:
+    """
+    Create the rings, start ingest × K + strategy (+ writer if database_url), and supervise.
+
+    Returns when interrupted or when any stage dies; the rings are unlinked on exit.
+    """
+    if cfg.ingest_procs < 1:
+        raise ValueError("ingest_procs must be >= 1")
+    # Linux 上用 fork：子进程不必重新 import 脚本、也不用 pickle 配置，秒级启动；其它平台 spawn
+    ctx = mp.get_context("fork" if sys.platform.startswith("linux") else "spawn")
+    rings = [
+        ShmRing.create(cfg.ingest_ring(k), capacity=cfg.ring_capacity)
+        for k in range(cfg.ingest_procs)
+    ]
+    if cfg.database_url:
+        # writer 写库时会停顿几百 ms：给它更大的 ring，避免反压到 strategy
+        rings.append(ShmRing.create(cfg.writer_ring, capacity=cfg.ring_capacity * 4))
+    stop = ctx.Event()
+    strategy_done = ctx.Event()
+    status_q = ctx.Queue(maxsize=4)
+    ingests = [
+        ctx.Process(target=ingest_main, args=(cfg, k), name=f"pm-ingest-{k}", daemon=True)
+        for k in range(cfg.ingest_procs)
+    ]
+    strategy = ctx.Process(
+        target=strategy_main, args=(cfg, stop, strategy_done, status_q), name="pm-strategy"
+    )
+    writer = (
+        ctx.Process(target=writer_main, args=(cfg, strategy_done), name="pm-writer")
+        if cfg.database_url
+        else None
+    )
+    procs = [p for p in [writer, strategy, *ingests] if p is not None]
+    n_assets = len(cfg.registry())
+    print(
+        f"[pipeline] events={len(cfg.events)} assets={n_assets} ingest_procs={cfg.ingest_procs} "
+        f"writer={'on' if writer is not None else 'off'} rings={cfg.ring_prefix}_*",
+        flush=True,
+    )
+    board = StatusBoard()
+    renderer = ConsoleRenderer(board)
+    server = (
+        StatusServer(board, host=cfg.status_host, port=cfg.status_port).start()
+        if cfg.status_port
+        else None
+    )
+    if server is not None:
+        print(f"[pipeline] status page {server.url} (JSON: {server.url}status.json)", flush=True)
+    rc = 0
+    try:
+        for p in procs:
+            p.start()
+        last_render = time.monotonic()
+        while all(p.is_alive() for p in procs):
+            try:
+                board.publish(status_q.get(timeout=0.2))
+            except queue.Empty:
+                if time.monotonic() - last_render < cfg.print_interval_s:
+                    continue
+            last_render = time.monotonic()
+            renderer.tick()
+        dead = [p.name for p in procs if not p.is_alive()]
+        print(f"[pipeline] stage exited: {','.join(dead)}; stopping", flush=True)
+        rc = 1
+    except KeyboardInterrupt:
+        rc = 130
+    finally:
+        # 顺序收尾：ingest 先停，strategy 读空 ring 后退出，writer 最后一次 flush 后退出；
+        # 收尾期间再来的 Ctrl-C（终端/timeout 会对整个进程组再发一次）不打断
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        started = [p for p in procs if p.pid is not None]
+        for p in ingests:
+            if p in started and p.is_alive():
+                p.terminate()
+        for p in ingests:
+            if p in started:
+                p.join(timeout=5)
+        stop.set()
+        for p in (strategy, writer):
+            if p is None or p not in started:
+                continue
+            p.join(timeout=30)
+            if p.is_alive():
+                p.terminate()
+                p.join(timeout=5)
+        for r in rings:
+            r.close()
+        if server is not None:
+            server.close()
+    return rc
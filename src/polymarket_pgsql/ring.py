@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+# 单生产者/单消费者（SPSC）共享内存环形队列，用于多进程流水线在进程间传固定大小的二进制记录
+# （不 pickle、不走管道）。
+#
+# 布局：
+#   header (64B): magic(8) capacity(u32) record_size(u32) pad(8)
+#                 tail(u64 @32)  -- 生产者写：已写入的记录总数
+#                 head(u64 @40)  -- 消费者写：已读走的记录总数
+#   records: capacity × record_size
+# 生产者先写记录再推进 tail，消费者先读记录再推进 head；tail/head 各只有一个写者，不需要锁。
+# 创建者负责 unlink；attach 只应发生在创建者启动的子进程里（它们共用同一个 resource_tracker）。
+#
+# 流水线统一用 Record：(type, code, index, a, b, c, d)
+#   REC_TOP:    index=asset 下标, a=best_bid tick, b=best_ask tick, c=as_of ns,
+#               d=源头时间 ns（延迟统计）
+#   REC_SIGNAL: index=event 下标, code=信号种类, a=edge（PRICE_SCALE 定点）, b=total,
+#               c=as_of ns, d=源头时间 ns
+#   REC_BASKET: index=event 下标, a=sum(YES ask) tick, b=sum(NO ask) tick（-1=缺腿）,
+#               c=as_of ns, d=源头时间 ns
+
+MAGIC = b"PMRING\x00\x01"
+_HEADER = struct.Struct("<8sII8x")
+_HEADER_SIZE = 64
+_TAIL_OFF = 32
+_HEAD_OFF = 40
+_U64 = struct.Struct("<Q")
+
+RECORD = struct.Struct("<BBHIqqqq")
+REC_TOP = 1
+REC_SIGNAL = 2
+REC_BASKET = 3
+
+Record = Tuple[int, int, int, int, int, int, int]  # (type, code, index, a, b, c, d)
+
+
+def ring_size(capacity: int, record_size: int = RECORD.size) -> int:
+    return _HEADER_SIZE + capacity * record_size
+
+
+class ShmRing:
+    """
+    SPSC ring of fixed-size records in shared memory; one process calls put*, one calls get*.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, *, owner: bool) -> None:
+        magic, capacity, record_size = _HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC or record_size != RECORD.size:
+            raise RuntimeError(f"shared memory {shm.name!r} is not a record ring")
+        self.shm = shm
+        self.buf = shm.buf
+        self.name = shm.name
+        self.capacity = capacity
+        self.owner = owner
+        # 本端缓存的对端位置：只有在看起来满/空时才重新读共享的 head/tail
+        self._tail = _U64.unpack_from(self.buf, _TAIL_OFF)[0]
+        self._head = _U64.unpack_from(self.buf, _HEAD_OFF)[0]
+        self.full_waits = 0
+
+    @classmethod
+    def create(cls, name: str, *, capacity: int = 65536) -> ShmRing:
+        shm = shared_memory.SharedMemory(name=name, create=True, size=ring_size(capacity))
+        _HEADER.pack_into(shm.buf, 0, MAGIC, capacity, RECORD.size)
+        _U64.pack_into(shm.buf, _TAIL_OFF, 0)
+        _U64.pack_into(shm.buf, _HEAD_OFF, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> ShmRing:
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)  # type: ignore[call-arg]
+        except TypeError:
+            # 3.13 之前：子进程与创建者共用 tracker，重复登记是 no-op，
+            # 不能 unregister（否则创建者 unlink 时报 KeyError）
+            shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, owner=False)
+
+    # ---- producer ----
+    def try_put(self, rtype: int, code: int, index: int, a: int, b: int, c: int, d: int) -> bool:
+        tail = self._tail
+        if tail - self._head >= self.capacity:
+            self._head = _U64.unpack_from(self.buf, _HEAD_OFF)[0]
+            if tail - self._head >= self.capacity:
+                return False
+        RECORD.pack_into(
+            self.buf,
+            _HEADER_SIZE + (tail % self.capacity) * RECORD.size,
+            rtype, code, 0, index, a, b, c, d,
+        )
+        self._tail = tail + 1
+        _U64.pack_into(self.buf, _TAIL_OFF, self._tail)
+        return True
+
+    def put(
+        self,
+        rtype: int,
+        code: int,
+        index: int,
+        a: int,
+        b: int,
+        c: int,
+        d: int,
+        *,
+        timeout_s: Optional[float] = None,
+    ) -> bool:
+        """
+        Blocking put (backpressure): waits while the ring is full; False on timeout.
+        """
+        if self.try_put(rtype, code, index, a, b, c, d):
+            return True
+        self.full_waits += 1
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        while not self.try_put(rtype, code, index, a, b, c, d):
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.0001)
+        return True
+
+    # ---- consumer ----
+    def get_batch(self, max_n: int = 4096) -> List[Record]:
+        head = self._head
+        if head >= self._tail:
+            self._tail = _U64.unpack_from(self.buf, _TAIL_OFF)[0]
+            if head >= self._tail:
+                return []
+        n = min(self._tail - head, max_n)
+        out: List[Record] = []
+        buf = self.buf
+        cap = self.capacity
+        size = RECORD.size
+        for i in range(head, head + n):
+            rtype, code, _, index, a, b, c, d = RECORD.unpack_from(
+                buf, _HEADER_SIZE + (i % cap) * size
+            )
+            out.append((rtype, code, index, a, b, c, d))
+        self._head = head + n
+        _U64.pack_into(buf, _HEAD_OFF, self._head)
+        return out
+
+    def __len__(self) -> int:
+        return _U64.unpack_from(self.buf, _TAIL_OFF)[0] - _U64.unpack_from(self.buf, _HEAD_OFF)[0]
+
+    def close(self) -> None:
+        self.buf = None  # type: ignore[assignment]
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
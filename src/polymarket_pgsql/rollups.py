@@ -0,0 +1,432 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import psycopg
+
+# 采集端内存滚动 K 线：每条更新顺手累加到每个 asset / 每个 event 篮子的当前 bar（默认 1s、1m），
+# bar 的区间结束后移入 completed，
+# 写库时一个事务批量 COPY + 合并进 asset_price_bars / event_basket_bars。
+# 研究/看板直接读 bar 表（千行级），不用再从 asset_price_ticks（百万行级）重新聚合。
+# - 只有区间内有更新才产生 bar（没有更新的区间由查询端前值填充）
+# - bucket = floor(as_of / interval) * interval（UTC 对齐）
+# - 迟到的更新（bucket 早于当前 bar）计入当前 bar，不回头改已完成的 bar
+# - 每条更新只动最小周期的 bar；更长周期由完成的小 bar 合并而来（OHLC/极值/计数可精确合并），
+#   所以长周期必须是最小周期的整数倍
+
+DEFAULT_INTERVALS = (1, 60)
+
+
+def _min(a: Optional[Decimal], b: Optional[Decimal]) -> Optional[Decimal]:
+    if a is None:
+        return b
+    if b is None or a <= b:
+        return a
+    return b
+
+
+def _max(a: Optional[Decimal], b: Optional[Decimal]) -> Optional[Decimal]:
+    if a is None:
+        return b
+    if b is None or a >= b:
+        return a
+    return b
+
+
+def _bucket_ts(bucket: int) -> datetime:
+    return datetime.fromtimestamp(bucket, tz=timezone.utc)
+
+
+@dataclass
+class AssetBar:
+    asset_id: str
+    interval_s: int
+    bucket: int  # unix seconds, start of the interval
+    market_id: Optional[int] = None
+    outcome: Optional[str] = None
+    bid_open: Optional[Decimal] = None
+    bid_high: Optional[Decimal] = None
+    bid_low: Optional[Decimal] = None
+    bid_close: Optional[Decimal] = None
+    ask_open: Optional[Decimal] = None
+    ask_high: Optional[Decimal] = None
+    ask_low: Optional[Decimal] = None
+    ask_close: Optional[Decimal] = None
+    spread_min: Optional[Decimal] = None
+    spread_max: Optional[Decimal] = None
+    n_updates: int = 0
+    key: Optional[int] = None  # asset_registry 的整数 key：有则按它索引打开的 bar（不写库）
+
+    def update(self, bid: Optional[Decimal], ask: Optional[Decimal]) -> None:
+        if self.bid_open is None:
+            self.bid_open = bid
+        if self.ask_open is None:
+            self.ask_open = ask
+        self.bid_high = _max(self.bid_high, bid)
+        self.bid_low = _min(self.bid_low, bid)
+        self.ask_high = _max(self.ask_high, ask)
+        self.ask_low = _min(self.ask_low, ask)
+        self.bid_close = bid
+        self.ask_close = ask
+        if bid is not None and ask is not None:
+            spread = ask - bid
+            self.spread_min = _min(self.spread_min, spread)
+            self.spread_max = _max(self.spread_max, spread)
+        self.n_updates += 1
+
+    def merge(self, later: AssetBar) -> None:
+        """
+        Fold a later bar of the same bucket into this one (same rule as the SQL upsert).
+        """
+        self.bid_open = self.bid_open if self.bid_open is not None else later.bid_open
+        self.ask_open = self.ask_open if self.ask_open is not None else later.ask_open
+        self.bid_high = _max(self.bid_high, later.bid_high)
+        self.bid_low = _min(self.bid_low, later.bid_low)
+        self.ask_high = _max(self.ask_high, later.ask_high)
+        self.ask_low = _min(self.ask_low, later.ask_low)
+        self.bid_close = later.bid_close
+        self.ask_close = later.ask_close
+        self.spread_min = _min(self.spread_min, later.spread_min)
+        self.spread_max = _max(self.spread_max, later.spread_max)
+        self.n_updates += later.n_updates
+
+    def row(self) -> Tuple[Any, ...]:
+        return (
+            self.asset_id,
+            self.interval_s,
+            _bucket_ts(self.bucket),
+            self.market_id,
+            self.outcome,
+            self.bid_open,
+            self.bid_high,
+            self.bid_low,
+            self.bid_close,
+            self.ask_open,
+            self.ask_high,
+            self.ask_low,
+            self.ask_close,
+            self.spread_min,
+            self.spread_max,
+            self.n_updates,
+        )
+
+
+@dataclass
+class BasketBar:
+    event_id: int
+    interval_s: int
+    bucket: int
+    sum_yes_ask_open: Optional[Decimal] = None
+    sum_yes_ask_min: Optional[Decimal] = None
+    sum_yes_ask_close: Optional[Decimal] = None
+    sum_no_ask_open: Optional[Decimal] = None
+    sum_no_ask_min: Optional[Decimal] = None
+    sum_no_ask_close: Optional[Decimal] = None
+    n_updates: int = 0
+
+    def update(self, sum_yes_ask: Optional[Decimal], sum_no_ask: Optional[Decimal]) -> None:
+        if self.sum_yes_ask_open is None:
+            self.sum_yes_ask_open = sum_yes_ask
+        if self.sum_no_ask_open is None:
+            self.sum_no_ask_open = sum_no_ask
+        self.sum_yes_ask_min = _min(self.sum_yes_ask_min, sum_yes_ask)
+        self.sum_no_ask_min = _min(self.sum_no_ask_min, sum_no_ask)
+        self.sum_yes_ask_close = sum_yes_ask
+        self.sum_no_ask_close = sum_no_ask
+        self.n_updates += 1
+
+    def merge(self, later: BasketBar) -> None:
+        if self.sum_yes_ask_open is None:
+            self.sum_yes_ask_open = later.sum_yes_ask_open
+        if self.sum_no_ask_open is None:
+            self.sum_no_ask_open = later.sum_no_ask_open
+        self.sum_yes_ask_min = _min(self.sum_yes_ask_min, later.sum_yes_ask_min)
+        self.sum_no_ask_min = _min(self.sum_no_ask_min, later.sum_no_ask_min)
+        self.sum_yes_ask_close = later.sum_yes_ask_close
+        self.sum_no_ask_close = later.sum_no_ask_close
+        self.n_updates += later.n_updates
+
+    def row(self) -> Tuple[Any, ...]:
+        return (
+            self.event_id,
+            self.interval_s,
+            _bucket_ts(self.bucket),
+            self.sum_yes_ask_open,
+            self.sum_yes_ask_min,
+            self.sum_yes_ask_close,
+            self.sum_no_ask_open,
+            self.sum_no_ask_min,
+            self.sum_no_ask_close,
+            self.n_updates,
+        )
+
+
+_ASSET_COLS = (
+    "asset_id, interval_s, bucket, market_id, outcome, bid_open, bid_high, bid_low, bid_close, "
+    "ask_open, ask_high, ask_low, ask_close, spread_min, spread_max, n_updates"
+)
+_BASKET_COLS = (
+    "event_id, interval_s, bucket, sum_yes_ask_open, sum_yes_ask_min, sum_yes_ask_close, "
+    "sum_no_ask_open, sum_no_ask_min, sum_no_ask_close, n_updates"
+)
+
+
+def write_bars(
+    conn: psycopg.Connection[Any],
+    asset_bars: Sequence[AssetBar],
+    basket_bars: Sequence[BasketBar],
+) -> int:
+    """
+    COPY completed bars into temp tables and merge them into the bar tables in one transaction.
+
+    A bar already in the table (e.g. the first half written before a restart) is merged, not
+    replaced.
+    """
+    if not asset_bars and not basket_bars:
+        return 0
+    with conn.transaction():
+        with conn.cursor() as cur:
+            if asset_bars:
+                cur.execute(
+                    "create temp table _asset_bars_in (like asset_price_bars) on commit drop"
+                )
+                with cur.copy(f"copy _asset_bars_in ({_ASSET_COLS}) from stdin") as cp:
+                    for b in asset_bars:
+                        cp.write_row(b.row())
+                cur.execute(
+                    f"""
+                    insert into asset_price_bars as b ({_ASSET_COLS})
+                    select {_ASSET_COLS} from _asset_bars_in
+                    on conflict (asset_id, interval_s, bucket) do update set
+                      market_id = coalesce(excluded.market_id, b.market_id),
+                      outcome = coalesce(excluded.outcome, b.outcome),
+                      bid_open = coalesce(b.bid_open, excluded.bid_open),
+                      bid_high = greatest(b.bid_high, excluded.bid_high),
+                      bid_low = least(b.bid_low, excluded.bid_low),
+                      bid_close = excluded.bid_close,
+                      ask_open = coalesce(b.ask_open, excluded.ask_open),
+                      ask_high = greatest(b.ask_high, excluded.ask_high),
+                      ask_low = least(b.ask_low, excluded.ask_low),
+                      ask_close = excluded.ask_close,
+                      spread_min = least(b.spread_min, excluded.spread_min),
+                      spread_max = greatest(b.spread_max, excluded.spread_max),
+                      n_updates = b.n_updates + excluded.n_updates
+                    """
+                )
+            if basket_bars:
+                cur.execute(
+                    "create temp table _basket_bars_in (like event_basket_bars) on commit drop"
+                )
+                with cur.copy(f"copy _basket_bars_in ({_BASKET_COLS}) from stdin") as cp:
+                    for b in basket_bars:
+                        cp.write_row(b.row())
+                cur.execute(
+                    f"""
+                    insert into event_basket_bars as b ({_BASKET_COLS})
+                    select {_BASKET_COLS} from _basket_bars_in
+                    on conflict (event_id, interval_s, bucket) do update set
+                      sum_yes_ask_open = coalesce(b.sum_yes_ask_open, excluded.sum_yes_ask_open),
+                      sum_yes_ask_min = least(b.sum_yes_ask_min, excluded.sum_yes_ask_min),
+                      sum_yes_ask_close = excluded.sum_yes_ask_close,
+                      sum_no_ask_open = coalesce(b.sum_no_ask_open, excluded.sum_no_ask_open),
+                      sum_no_ask_min = least(b.sum_no_ask_min, excluded.sum_no_ask_min),
+                      sum_no_ask_close = excluded.sum_no_ask_close,
+                      n_updates = b.n_updates + excluded.n_updates
+                    """
+                )
+    return len(asset_bars) + len(basket_bars)
+
+
+class BarRoller:
+    """
+    Open bars per (asset, interval) and (event, interval); completed bars queue up until flush().
+    """
+
+    def __init__(self, intervals: Iterable[int] = DEFAULT_INTERVALS) -> None:
+        self.intervals = tuple(sorted({int(i) for i in intervals if int(i) > 0}))
+        if not self.intervals:
+            raise ValueError("at least one bar interval is required")
+        self.base = self.intervals[0]
+        for iv in self.intervals[1:]:
+            if iv % self.base:
+                raise ValueError(
+                    f"bar interval {iv}s is not a multiple of the base interval {self.base}s"
+                )
+        self._higher = self.intervals[1:]
+        # (registry key 或 asset_id, interval)
+        self._asset_open: Dict[Tuple[Any, int], AssetBar] = {}
+        self._basket_open: Dict[Tuple[int, int], BasketBar] = {}
+        self._asset_done: List[AssetBar] = []
+        self._basket_done: List[BasketBar] = []
+        self.bars_written = 0
+
+    # ---- completion: base bars fold into the longer intervals ----
+    def _done_asset(self, bar: AssetBar) -> None:
+        self._asset_done.append(bar)
+        if bar.interval_s != self.base:
+            return
+        for iv in self._higher:
+            bucket = bar.bucket // iv * iv
+            key = (bar.asset_id if bar.key is None else bar.key, iv)
+            up = self._asset_open.get(key)
+            if up is None or bucket > up.bucket:
+                if up is not None:
+                    self._asset_done.append(up)
+                up = self._asset_open[key] = AssetBar(
+                    asset_id=bar.asset_id,
+                    interval_s=iv,
+                    bucket=bucket,
+                    market_id=bar.market_id,
+                    outcome=bar.outcome,
+                    key=bar.key,
+                )
+            up.merge(bar)
+
+    def _done_basket(self, bar: BasketBar) -> None:
+        self._basket_done.append(bar)
+        if bar.interval_s != self.base:
+            return
+        for iv in self._higher:
+            bucket = bar.bucket // iv * iv
+            key = (bar.event_id, iv)
+            up = self._basket_open.get(key)
+            if up is None or bucket > up.bucket:
+                if up is not None:
+                    self._basket_done.append(up)
+                up = self._basket_open[key] = BasketBar(
+                    event_id=bar.event_id, interval_s=iv, bucket=bucket
+                )
+            up.merge(bar)
+
+    # ---- updates ----
+    def on_top(
+        self,
+        asset_id: str,
+        *,
+        as_of: datetime,
+        best_bid: Optional[Decimal],
+        best_ask: Optional[Decimal],
+        market_id: Optional[int] = None,
+        outcome: Optional[str] = None,
+        key: Optional[int] = None,
+    ) -> None:
+        """
+        Fold one top update into the asset's open base bar.
+
+        key (asset_registry) indexes it instead of asset_id.
+        """
+        iv = self.base
+        bucket = int(as_of.timestamp() // iv) * iv
+        open_key = (asset_id if key is None else key, iv)
+        bar = self._asset_open.get(open_key)
+        if bar is None or bucket > bar.bucket:
+            if bar is not None:
+                self._done_asset(bar)
+            bar = self._asset_open[open_key] = AssetBar(
+                asset_id=asset_id,
+                interval_s=iv,
+                bucket=bucket,
+                market_id=market_id,
+                outcome=outcome,
+                key=key,
+            )
+        bar.update(best_bid, best_ask)
+
+    def on_basket(
+        self,
+        event_id: int,
+        *,
+        as_of: datetime,
+        sum_yes_ask: Optional[Decimal],
+        sum_no_ask: Optional[Decimal],
+    ) -> None:
+        iv = self.base
+        bucket = int(as_of.timestamp() // iv) * iv
+        key = (event_id, iv)
+        bar = self._basket_open.get(key)
+        if bar is None or bucket > bar.bucket:
+            if bar is not None:
+                self._done_basket(bar)
+            bar = self._basket_open[key] = BasketBar(
+                event_id=event_id, interval_s=iv, bucket=bucket
+            )
+        bar.update(sum_yes_ask, sum_no_ask)
+
+    def close_due(self, now: datetime) -> int:
+        """
+        Complete open bars whose interval has ended (quiet assets would otherwise never roll).
+        """
+        ts = now.timestamp()
+        n = 0
+        # 先关最小周期（会并入长周期的当前 bar），再按周期从短到长关
+        for iv in self.intervals:
+            for key, bar in list(self._asset_open.items()):
+                if key[1] == iv and bar.bucket + iv <= ts:
+                    del self._asset_open[key]
+                    self._done_asset(bar)
+                    n += 1
+            for key, bb in list(self._basket_open.items()):
+                if key[1] == iv and bb.bucket + iv <= ts:
+                    del self._basket_open[key]
+                    self._done_basket(bb)
+                    n += 1
+        return n
+
+    def close_all(self) -> int:
+        """
+        Complete every open bar (shutdown); the partial bar is merged if the bucket is written
+        again.
+        """
+        n = 0
+        for iv in self.intervals:
+            for key in [k for k in self._asset_open if k[1] == iv]:
+                self._done_asset(self._asset_open.pop(key))
+                n += 1
+            for key in [k for k in self._basket_open if k[1] == iv]:
+                self._done_basket(self._basket_open.pop(key))
+                n += 1
+        return n
+
+    @property
+    def pending(self) -> int:
+        return len(self._asset_done) + len(self._basket_done)
+
+    def _drain(self) -> Tuple[List[AssetBar], List[BasketBar]]:
+        # 同一 bucket 可能被 close_due 关掉后又因迟到更新重开：
+        # 写库前先合并，避免一条语句两次更新同一行
+        assets: Dict[Tuple[str, int, int], AssetBar] = {}
+        for b in self._asset_done:
+            k = (b.asset_id, b.interval_s, b.bucket)
+            if k in assets:
+                assets[k].merge(b)
+            else:
+                assets[k] = b
+        baskets: Dict[Tuple[int, int, int], BasketBar] = {}
+        for bb in self._basket_done:
+            kb = (bb.event_id, bb.interval_s, bb.bucket)
+            if kb in baskets:
+                baskets[kb].merge(bb)
+            else:
+                baskets[kb] = bb
+        self._asset_done = []
+        self._basket_done = []
+        return list(assets.values()), list(baskets.values())
+
+    def flush(self, conn: psycopg.Connection[Any], *, now: Optional[datetime] = None) -> int:
+        """
+        Close due bars and write all completed ones; on error they stay queued for the next flush.
+        """
+        if now is not None:
+            self.close_due(now)
+        asset_bars, basket_bars = self._drain()
+        try:
+            n = write_bars(conn, asset_bars, basket_bars)
+        except Exception:
+            self._asset_done = asset_bars + self._asset_done
+            self._basket_done = basket_bars + self._basket_done
+            raise
+        self.bars_written += n
+        return n
@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import os
+import struct
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, Optional
+
+from polymarket_pgsql.fixedpoint import decimal_to_units, to_decimal
+
+# 共享内存 top-of-book 表：采集进程解码一次，同机的看板/导出/次级策略直接读，不再各开 WS 或轮询 PG。
+#
+# 布局（小端，固定大小）：
+#   header (64B): magic(8) version(u32) capacity(u32) slot_size(u32) n_slots(u32)
+#                 writer_pid(u32) pad(u32)
+#                 publishes(u64)  -- 全局发布计数，读端可据此判断“有没有新数据”
+#   slot × capacity (64B each，一个 cache line)：
+#     seq(u64)        seqlock：写前 +1（奇数=写入中），写完再 +1（偶数=一致）
+#     updates(u64)    该 asset 的更新序号
+#     best_bid(i64)   整数 tick（PRICE_SCALE），-1 表示无
+#     best_ask(i64)
+#     as_of_ns(i64)   行情时间（unix ns）
+#     market_id(i64)
+#   id directory × capacity (96B each): id_len(u32) pad(u32) asset_id(88B, ASCII)
+#     slot 一经分配不再改；n_slots 在 id 写好之后才递增
+#
+# 单写者、多读者。读者不加锁：读 seq → 读字段 → 再读 seq，两次相等且为偶数才算一致，否则重试。
+
+MAGIC = b"PMTOB\x00\x00\x01"
+VERSION = 1
+SLOT_SIZE = 64
+ID_SIZE = 96
+MAX_ASSET_ID_LEN = ID_SIZE - 8  # token id 是最长 78 位的十进制 uint256
+
+_HEADER = struct.Struct("<8sIIIIII Q")
+_HEADER_SIZE = 64
+_N_SLOTS_OFF = 8 + 4 + 4 + 4  # magic, version, capacity, slot_size
+_PUBLISHES_OFF = _HEADER.size - 8
+_SEQ = struct.Struct("<Q")
+_BODY = struct.Struct("<Qqqqq")  # updates, best_bid, best_ask, as_of_ns, market_id
+_BODY_OFF = 8
+_ID = struct.Struct(f"<II{MAX_ASSET_ID_LEN}s")
+
+NO_PRICE = -1
+
+
+@dataclass(frozen=True)
+class TopQuote:
+    asset_id: str
+    market_id: int
+    best_bid_ticks: int  # NO_PRICE if absent
+    best_ask_ticks: int
+    as_of_ns: int
+    updates: int
+
+    @property
+    def best_bid(self) -> Optional[Decimal]:
+        return None if self.best_bid_ticks == NO_PRICE else to_decimal(self.best_bid_ticks)
+
+    @property
+    def best_ask(self) -> Optional[Decimal]:
+        return None if self.best_ask_ticks == NO_PRICE else to_decimal(self.best_ask_ticks)
+
+    @property
+    def as_of(self) -> datetime:
+        return datetime.fromtimestamp(self.as_of_ns / 1e9, tz=timezone.utc)
+
+
+def segment_size(capacity: int) -> int:
+    return _HEADER_SIZE + capacity * (SLOT_SIZE + ID_SIZE)
+
+
+def _id_off(capacity: int, slot: int) -> int:
+    return _HEADER_SIZE + capacity * SLOT_SIZE + slot * ID_SIZE
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # 读端不应在退出时 unlink 段（3.13 之前 resource_tracker 会这么做）
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # type: ignore[call-arg]
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+        except Exception:
+            pass
+        return shm
+
+
+def _ticks(x: Optional[Decimal]) -> int:
+    return NO_PRICE if x is None else decimal_to_units(x)
+
+
+class TopOfBookWriter:
+    """
+    Single writer of the shared top-of-book table (the collector).
+    """
+
+    def __init__(self, name: str, *, capacity: int = 4096, create: bool = True) -> None:
+        if create:
+            try:
+                self.shm = shared_memory.SharedMemory(
+                    name=name, create=True, size=segment_size(capacity)
+                )
+            except FileExistsError:
+                # 上次异常退出留下的段：布局兼容且容量够就复用（slot 目录重建），否则报错。
+                # 沿用段头里原来的 capacity：仍挂着旧段的读者按它计算 id 目录的偏移
+                self.shm = _attach(name)
+                magic, version, old_capacity, slot_size = _HEADER.unpack_from(self.shm.buf, 0)[:4]
+                if (
+                    magic != MAGIC
+                    or version != VERSION
+                    or slot_size != SLOT_SIZE
+                    or old_capacity < capacity
+                    or self.shm.size < segment_size(old_capacity)
+                ):
+                    raise
+                capacity = old_capacity
+            self.capacity = capacity
+            _HEADER.pack_into(
+                self.shm.buf, 0, MAGIC, VERSION, capacity, SLOT_SIZE, 0, os.getpid(), 0, 0
+            )
+        else:
+            self.shm = _attach(name)
+            magic, version, self.capacity, slot_size = _HEADER.unpack_from(self.shm.buf, 0)[:4]
+            if magic != MAGIC or version != VERSION or slot_size != SLOT_SIZE:
+                raise RuntimeError(
+                    f"shared memory {name!r} is not a top-of-book table (v{VERSION})"
+                )
+            struct.pack_into("<I", self.shm.buf, _N_SLOTS_OFF + 4, os.getpid())
+        self.name = name
+        self.buf = self.shm.buf
+        self.slots: Dict[str, int] = {}
+        self._publishes = struct.unpack_from("<Q", self.buf, _PUBLISHES_OFF)[0]
+        n = struct.unpack_from("<I", self.buf, _N_SLOTS_OFF)[0]
+        for i in range(n):
+            self.slots[_read_id(self.buf, self.capacity, i)] = i
+
+    def slot_for(self, asset_id: str, *, market_id: int = 0) -> int:
+        slot = self.slots.get(asset_id)
+        if slot is not None:
+            return slot
+        raw = asset_id.encode("ascii")
+        if len(raw) > MAX_ASSET_ID_LEN:
+            raise ValueError(f"asset id longer than {MAX_ASSET_ID_LEN} bytes: {asset_id!r}")
+        slot = len(self.slots)
+        if slot >= self.capacity:
+            raise RuntimeError(f"top-of-book table {self.name!r} is full ({self.capacity} slots)")
+        off = _HEADER_SIZE + slot * SLOT_SIZE
+        _SEQ.pack_into(self.buf, off, 0)
+        _BODY.pack_into(self.buf, off + _BODY_OFF, 0, NO_PRICE, NO_PRICE, 0, market_id)
+        _ID.pack_into(self.buf, _id_off(self.capacity, slot), len(raw), 0, raw)
+        self.slots[asset_id] = slot
+        struct.pack_into("<I", self.buf, _N_SLOTS_OFF, slot + 1)  # 最后才发布 slot
+        return slot
+
+    def publish(
+        self,
+        asset_id: str,
+        *,
+        best_bid: Optional[Decimal],
+        best_ask: Optional[Decimal],
+        as_of: Optional[datetime] = None,
+        market_id: Optional[int] = None,
+    ) -> None:
+        slot = self.slots.get(asset_id)
+        if slot is None:
+            slot = self.slot_for(asset_id, market_id=market_id or 0)
+        self.publish_ticks(
+            slot,
+            best_bid_ticks=_ticks(best_bid),
+            best_ask_ticks=_ticks(best_ask),
+            as_of_ns=int(as_of.timestamp() * 1e9) if as_of is not None else time.time_ns(),
+            market_id=market_id,
+        )
+
+    def publish_ticks(
+        self,
+        slot: int,
+        *,
+        best_bid_ticks: int,
+        best_ask_ticks: int,
+        as_of_ns: int,
+        market_id: Optional[int] = None,
+    ) -> None:
+        buf = self.buf
+        off = _HEADER_SIZE + slot * SLOT_SIZE
+        seq = _SEQ.unpack_from(buf, off)[0]
+        updates, _, _, _, old_market = _BODY.unpack_from(buf, off + _BODY_OFF)
+        _SEQ.pack_into(buf, off, seq + 1)  # odd: write in progress
+        _BODY.pack_into(
+            buf,
+            off + _BODY_OFF,
+            updates + 1,
+            best_bid_ticks,
+            best_ask_ticks,
+            as_of_ns,
+            old_market if market_id is None else market_id,
+        )
+        _SEQ.pack_into(buf, off, seq + 2)
+        self._publishes += 1
+        struct.pack_into("<Q", buf, _PUBLISHES_OFF, self._publishes)
+
+    def close(self, *, unlink: bool = False) -> None:
+        self.buf = None  # type: ignore[assignment]
+        self.shm.close()
+        if unlink:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _read_id(buf: memoryview, capacity: int, slot: int) -> str:
+    n, _, raw = _ID.unpack_from(buf, _id_off(capacity, slot))
+    return raw[:n].decode("ascii")
+
+
+class TopOfBookReader:
+    """
+    Lock-free reader of a table published by TopOfBookWriter (any number of processes).
+    """
+
+    def __init__(self, name: str, *, timeout_s: float = 0.5) -> None:
+        self.shm = _attach(name)
+        self.buf = self.shm.buf
+        magic, version, self.capacity, slot_size, _, _, _, _ = _HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION or slot_size != SLOT_SIZE:
+            raise RuntimeError(f"shared memory {name!r} is not a top-of-book table (v{VERSION})")
+        self.name = name
+        self.timeout_s = timeout_s
+        self.slots: Dict[str, int] = {}
+        self.refresh()
+
+    @property
+    def writer_pid(self) -> int:
+        return struct.unpack_from("<I", self.buf, _N_SLOTS_OFF + 4)[0]
+
+    @property
+    def publishes(self) -> int:
+        """
+        Total publishes so far; poll this to skip reads when nothing changed.
+        """
+        return struct.unpack_from("<Q", self.buf, _PUBLISHES_OFF)[0]
+
+    def refresh(self) -> int:
+        """
+        Pick up slots the writer added since the last call; returns the number of known assets.
+        """
+        n = struct.unpack_from("<I", self.buf, _N_SLOTS_OFF)[0]
+        for i in range(len(self.slots), n):
+            self.slots[_read_id(self.buf, self.capacity, i)] = i
+        return len(self.slots)
+
+    def read_slot(self, slot: int) -> TopQuote:
+        buf = self.buf
+        off = _HEADER_SIZE + slot * SLOT_SIZE
+        tries = 0
+        deadline: Optional[float] = None
+        while True:
+            s1 = _SEQ.unpack_from(buf, off)[0]
+            if not s1 & 1:
+                updates, bid, ask, as_of_ns, market_id = _BODY.unpack_from(buf, off + _BODY_OFF)
+                if _SEQ.unpack_from(buf, off)[0] == s1:
+                    return TopQuote(
+                        asset_id=_read_id(buf, self.capacity, slot),
+                        market_id=market_id,
+                        best_bid_ticks=bid,
+                        best_ask_ticks=ask,
+                        as_of_ns=as_of_ns,
+                        updates=updates,
+                    )
+            # 写者可能在写到一半时被调度走：先自旋，再让出 CPU；写者崩在半途则超时报错
+            tries += 1
+            if tries % 64 == 0:
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + self.timeout_s
+                elif now > deadline:
+                    raise RuntimeError(
+                        f"slot {slot} of {self.name!r}: "
+                        f"no consistent read within {self.timeout_s}s"
+                    )
+                os.sched_yield()
+
+    def get(self, asset_id: str) -> Optional[TopQuote]:
+        slot = self.slots.get(asset_id)
+        if slot is None:
+            self.refresh()
+            slot = self.slots.get(asset_id)
+            if slot is None:
+                return None
+        return self.read_slot(slot)
+
+    def read_many(self, asset_ids: List[str]) -> Dict[str, Optional[TopQuote]]:
+        return {aid: self.get(aid) for aid in asset_ids}
+
+    def __iter__(self) -> Iterator[TopQuote]:
+        self.refresh()
+        for slot in range(len(self.slots)):
+            yield self.read_slot(slot)
+
+    def close(self) -> None:
+        self.buf = None  # type: ignore[assignment]
+        self.shm.close()
+
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import errno
+import os
+import select
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import psycopg
+
+# 信号总线：新信号不必再靠下游轮询 arb_signals。
+# - PG：PgWriter.insert_arb_signal 在同一条语句里 insert + pg_notify，按 kind 分 channel
+#   （arb_signal_buy_yes_all / ...）；NOTIFY 随插入所在的事务提交才送达，回滚则不发。
+#   LISTEN 端用 listen_signals()，阻塞在 socket 上等通知，不查表
+# - 本机：SignalPublisher 在 Unix socket 上做 pub-sub（引擎是唯一发布者，任意多个订阅者连上来收），
+#   不经过 PG；发布不阻塞引擎：每个订阅者的未发送数据超过 max_pending 就断开它
+# 两路用同一种紧凑的一行文本：
+#   NOTIFY payload："<event_id> <edge> <as_of 微秒> <signal_id>"（kind 由 channel 给出）
+#   socket 行："<kind> <event_id> <edge> <as_of 微秒> <signal_id>\n"（signal_id 未入库时为 -）
+
+CHANNEL_PREFIX = "arb_signal_"
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+
+
+def channel_for(kind: str) -> str:
+    """
+    LISTEN/NOTIFY channel of one signal kind (e.g. BUY_YES_ALL -> arb_signal_buy_yes_all).
+    """
+    return CHANNEL_PREFIX + kind.lower()
+
+
+def _us(ts: datetime) -> int:
+    return (ts - _EPOCH) // _US
+
+
+@dataclass(frozen=True)
+class SignalMessage:
+    kind: str
+    event_id: int
+    edge: Decimal
+    as_of: datetime
+    signal_id: Optional[int] = None
+
+    def payload(self) -> str:
+        """
+        NOTIFY payload (the kind is the channel).
+        """
+        sid = "-" if self.signal_id is None else str(self.signal_id)
+        return f"{self.event_id} {self.edge} {_us(self.as_of)} {sid}"
+
+    def line(self) -> bytes:
+        return f"{self.kind} {self.payload()}\n".encode("ascii")
+
+    @classmethod
+    def from_payload(cls, kind: str, payload: str) -> SignalMessage:
+        event_id, edge, as_of_us, sid = payload.split()
+        return cls(
+            kind=kind,
+            event_id=int(event_id),
+            edge=Decimal(edge),
+            as_of=_EPOCH + int(as_of_us) * _US,
+            signal_id=None if sid == "-" else int(sid),
+        )
+
+    @classmethod
+    def from_line(cls, line: str) -> SignalMessage:
+        kind, payload = line.strip().split(" ", 1)
+        return cls.from_payload(kind, payload)
+
+    @property
+    def age_ms(self) -> float:
+        return (datetime.now(timezone.utc) - self.as_of).total_seconds() * 1e3
+
+
+# ---------------- PG LISTEN ----------------
+
+
+def listen_signals(
+    conn: psycopg.Connection[Any], kinds: Iterable[str], *, timeout: Optional[float] = None
+) -> Iterator[SignalMessage]:
+    """
+    LISTEN on the channels of kinds and yield signals as NOTIFYs arrive (conn must be autocommit).
+
+    timeout: stop after this many seconds without a notification (None = forever).
+    """
+    by_channel = {channel_for(k): k for k in kinds}
+    for ch in by_channel:
+        conn.execute(f'listen "{ch}"')
+    if timeout is None:
+        notifies = conn.notifies()
+    else:
+        notifies = _idle_notifies(conn, timeout)
+    for n in notifies:
+        kind = by_channel.get(n.channel)
+        if kind is not None:
+            yield SignalMessage.from_payload(kind, n.payload)
+
+
+def _idle_notifies(conn: psycopg.Connection[Any], timeout: float) -> Iterator[psycopg.Notify]:
+    # notifies(timeout=) 是总时长；每次只等一条，
+    # timeout 就成了“距上一条”的空闲超时（与 socket 端一致）
+    while True:
+        got = False
+        for n in conn.notifies(timeout=timeout, stop_after=1):
+            got = True
+            yield n
+        if not got:
+            return
+
+
+# ---------------- Unix socket pub-sub ----------------
+
+
+class SignalPublisher:
+    """
+    Non-blocking Unix-socket publisher: every connected subscriber gets every signal line.
+
+    Call publish() from the engine loop; pending connections are accepted there too, so no thread
+    is needed. A subscriber that falls max_pending bytes behind is dropped.
+    """
+
+    def __init__(self, path: str, *, max_pending: int = 1 << 16) -> None:
+        self.path = path
+        self.max_pending = max_pending
+        if os.path.exists(path):
+            os.unlink(path)  # 上次异常退出留下的 socket 文件
+        self._srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._srv.bind(path)
+        self._srv.listen(64)
+        self._srv.setblocking(False)
+        self._subs: Dict[socket.socket, bytearray] = {}  # 订阅者 -> 还没发出去的字节
+        self.published = 0
+        self.dropped = 0
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn, _ = self._srv.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            conn.setblocking(False)
+            self._subs[conn] = bytearray()
+
+    def _drop(self, conn: socket.socket) -> None:
+        self._subs.pop(conn, None)
+        self.dropped += 1
+        try:
+            conn.close()
+        except OSError:
+            pass
+
+    def _send(self, conn: socket.socket, pending: bytearray) -> None:
+        try:
+            n = conn.send(pending)
+        except (BlockingIOError, InterruptedError):
+            n = 0
+        except OSError:
+            self._drop(conn)  # 订阅者已断开
+            return
+        del pending[:n]
+        if len(pending) > self.max_pending:
+            self._drop(conn)
+
+    def publish(self, msg: SignalMessage) -> int:
+        """
+        Queue msg for every subscriber and send as much as the sockets take.
+
+        Returns the subscriber count.
+        """
+        self._accept()
+        data = msg.line()
+        for conn, pending in list(self._subs.items()):
+            pending += data
+            self._send(conn, pending)
+        self.published += 1
+        return len(self._subs)
+
+    def flush(self) -> None:
+        """
+        Retry sending backlogged data (e.g. on an idle tick) and accept new subscribers.
+        """
+        self._accept()
+        for conn, pending in list(self._subs.items()):
+            if pending:
+                self._send(conn, pending)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subs)
+
+    def close(self) -> None:
+        for conn in list(self._subs):
+            try:
+                conn.close()
+            except OSError:
+                pass
+        self._subs.clear()
+        self._srv.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class SignalSubscriber:
+    """
+    Client of a SignalPublisher socket.
+
+    Iterating yields SignalMessages (optionally only some kinds).
+    """
+
+    def __init__(
+        self, path: str, *, kinds: Optional[Iterable[str]] = None, connect_timeout_s: float = 5.0
+    ) -> None:
+        self.path = path
+        self.kinds = {k.upper() for k in kinds} if kinds else None
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        deadline = time.monotonic() + connect_timeout_s
+        while True:
+            try:
+                self.sock.connect(path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.1)  # 发布者还没起来
+
+    def messages(self, *, timeout: Optional[float] = None) -> Iterator[SignalMessage]:
+        """
+        Yield signals until the publisher closes (or timeout seconds pass without data).
+        """
+        buf = b""
+        while True:
+            if timeout is not None and not select.select([self.sock], [], [], timeout)[0]:
+                return
+            try:
+                chunk = self.sock.recv(1 << 16)
+            except OSError as e:
+                if e.errno in (errno.ECONNRESET, errno.EPIPE):
+                    return
+                raise
+            if not chunk:
+                return
+            buf += chunk
+            lines: List[bytes] = buf.split(b"\n")
+            buf = lines.pop()
+            for raw in lines:
+                if not raw:
+                    continue
+                msg = SignalMessage.from_line(raw.decode("ascii"))
+                if self.kinds is None or msg.kind in self.kinds:
+                    yield msg
+
+    def __iter__(self) -> Iterator[SignalMessage]:
+        return self.messages()
+
+    def close(self) -> None:
+        self.sock.close()
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from polymarket_pgsql.gmp import BasketSizing
+
+# 状态展示与引擎解耦：
+# - 引擎每 print_interval_s 往 StatusBoard 发布一个不可变快照
+#   （frozen dataclass + tuple，只拷数值，不格式化）；发布就是一次引用替换，读方无需加锁
+# - 渲染（控制台 / 本地 HTTP 页）在消息处理之外读最新快照：单进程脚本是独立的 asyncio 任务，
+#   多进程模式在主进程（strategy 经队列把快照送过来）
+# - 快照只带按 edge 排序的前 top_n 个 event（腿明细只在单 event 时带），
+#   渲染开销与订阅的 asset 数无关
+
+_NO_EDGE = float("-inf")
+
+
+@dataclass(frozen=True)
+class LegStatus:
+    market_id: int
+    yes_bid: Optional[Decimal]
+    yes_ask: Optional[Decimal]
+    no_bid: Optional[Decimal]
+    no_ask: Optional[Decimal]
+    label: str = ""
+
+
+@dataclass(frozen=True)
+class EventStatus:
+    """
+    One event's basket at publish time.
+
+    edge: best BUY edge over the YES/NO baskets, (payout - sum_ask * (1 + fee)) / payout; positive
+    means the basket is cheaper than its payout (ranking key; None while a leg has no ask).
+    """
+
+    event_id: int
+    sum_yes_ask: Optional[Decimal]
+    sum_no_ask: Optional[Decimal]
+    yes_limit: Decimal
+    no_limit: Decimal
+    edge: Optional[float]
+    signals: Tuple[str, ...] = ()
+    legs: Tuple[LegStatus, ...] = ()
+    # (outcome, sizing)，只在 depth 模式信号出现时有
+    capacity: Tuple[Tuple[str, BasketSizing], ...] = ()
+
+
+@dataclass(frozen=True)
+class PositionStatus:
+    outcome: str
+    qty_per_leg: Decimal
+    opened_at: datetime
+
+
+@dataclass(frozen=True)
+class StatusSnapshot:
+    """
+    Immutable view of the engine for renderers; feed holds (name, value) pairs in display order.
+    """
+
+    as_of: datetime
+    events: Tuple[EventStatus, ...]
+    n_events: int
+    feed: Tuple[Tuple[str, Any], ...] = ()
+    positions: Optional[Tuple[PositionStatus, ...]] = None  # None：没有 paper trading（多进程模式）
+    realized_pnl: Optional[Decimal] = None
+    unrealized_pnl: Optional[Decimal] = None
+    fills: int = 0
+
+
+def basket_edge(basket: Any, fee_rate: Decimal) -> Optional[float]:
+    """
+    Best BUY edge of a BasketState / FixedBasketState (see EventStatus.edge).
+    """
+    fee = float(fee_rate) if fee_rate > 0 else 0.0
+    best: Optional[float] = None
+    for outcome, total in (("YES", basket.sum_yes_ask), ("NO", basket.sum_no_ask)):
+        payout = float(basket.payout(outcome))
+        if total is None or payout <= 0:
+            continue
+        e = (payout - float(total) * (1.0 + fee)) / payout
+        if best is None or e > best:
+            best = e
+    return best
+
+
+def top_by_edge(edges: Sequence[Optional[float]], n: int) -> List[int]:
+    """
+    Indices of the n largest edges (None counts as lowest); O(len(edges) * log n).
+    """
+    return heapq.nlargest(
+        max(0, n), range(len(edges)), key=lambda i: _NO_EDGE if edges[i] is None else edges[i]
+    )
+
+
+def _print(text: str) -> None:
+    print(text, flush=True)
+
+
+class StatusBoard:
+    """
+    Latest published StatusSnapshot; publish() is a reference swap, readers never block the engine.
+    """
+
+    def __init__(self) -> None:
+        self._snap: Optional[StatusSnapshot] = None
+        self.seq = 0
+
+    def publish(self, snap: StatusSnapshot) -> None:
+        self._snap = snap
+        self.seq += 1
+
+    def latest(self) -> Optional[StatusSnapshot]:
+        return self._snap
+
+
+# ---------------- rendering ----------------
+
+
+def _fmt(x: Any, digits: int = 6) -> str:
+    if x is None:
+        return "NA"
+    if isinstance(x, Decimal):
+        return str(x.quantize(Decimal(1).scaleb(-digits)))
+    if isinstance(x, float):
+        return f"{x:.2f}"
+    if isinstance(x, tuple):
+        return "/".join(_fmt(v, digits) for v in x)
+    return str(x)
+
+
+def _fmt_edge(e: Optional[float]) -> str:
+    return "NA" if e is None else f"{e * 100:+.2f}%"
+
+
+def render_text(snap: StatusSnapshot, *, now: Optional[datetime] = None) -> str:
+    """
+    Plain-text status (console and GET / of the status page).
+    """
+    now = now or datetime.now(timezone.utc)
+    age = (now - snap.as_of).total_seconds()
+    head = f"[{snap.as_of.strftime('%Y-%m-%d %H:%M:%S UTC')}] events={snap.n_events}"
+    if snap.positions is not None:
+        pos_s = ",".join(f"{p.outcome}x{_fmt(p.qty_per_leg, 2)}" for p in snap.positions) or "FLAT"
+        head += (
+            f" | pos={pos_s} | realized={_fmt(snap.realized_pnl)}"
+            f" | unrealized={_fmt(snap.unrealized_pnl)} | fills={snap.fills}"
+        )
+    if age >= 2.0:
+        head += f" | snapshot_age={age:.0f}s"
+    lines: List[str] = [head]
+    if snap.feed:
+        lines.append("  feed: " + " ".join(f"{k}={_fmt(v)}" for k, v in snap.feed))
+    if len(snap.events) < snap.n_events:
+        lines.append(f"  top {len(snap.events)} events by edge:")
+    for ev in snap.events:
+        yes_s = (
+            "WAIT" if ev.sum_yes_ask is None else ("YES" if "BUY_YES_ALL" in ev.signals else "NO")
+        )
+        no_s = "WAIT" if ev.sum_no_ask is None else ("YES" if "BUY_NO_ALL" in ev.signals else "NO")
+        lines.append(
+            f"  event {ev.event_id}: "
+            f"sum_yes_ask={_fmt(ev.sum_yes_ask)} < {_fmt(ev.yes_limit)} ? {yes_s} "
+            f"| sum_no_ask={_fmt(ev.sum_no_ask)} < {_fmt(ev.no_limit)} ? {no_s} "
+            f"| edge={_fmt_edge(ev.edge)} | signals={','.join(ev.signals) or '-'}"
+        )
+        for outcome, sizing in ev.capacity:
+            lines.append(
+                f"    {outcome} capacity={_fmt(sizing.size, 2)} cost={_fmt(sizing.cost)} "
+                f"profit={_fmt(sizing.profit)} (limit={sizing.limit})"
+            )
+        for leg in ev.legs:
+            lines.append(
+                f"    m{leg.market_id} YES(bid/ask)={_fmt(leg.yes_bid)}/{_fmt(leg.yes_ask)} "
+                f"NO(bid/ask)={_fmt(leg.no_bid)}/{_fmt(leg.no_ask)} | {leg.label}"
+            )
+    return "\n".join(lines)
+
+
+def snapshot_json(snap: StatusSnapshot) -> str:
+    """
+    JSON for GET /status.json (Decimal/datetime as strings).
+    """
+    obj = asdict(snap)
+    obj["feed"] = {k: v for k, v in snap.feed}
+    obj["age_s"] = (datetime.now(timezone.utc) - snap.as_of).total_seconds()
+    return json.dumps(obj, default=str, ensure_ascii=False)
+
+
+class ConsoleRenderer:
+    """
+    Prints each newly published snapshot.
+
+    If nothing new arrives for stale_after_s, says so once per interval.
+
+    Call tick() from a timer outside message processing (an asyncio task, or a supervisor loop).
+    """
+
+    def __init__(
+        self,
+        board: StatusBoard,
+        *,
+        stale_after_s: float = 30.0,
+        out: Callable[[str], None] = _print,
+    ) -> None:
+        self.board = board
+        self.stale_after_s = stale_after_s
+        self.out = out
+        self._seen = 0
+
+    def tick(self) -> None:
+        snap = self.board.latest()
+        if snap is None:
+            return
+        if self.board.seq != self._seen:
+            self._seen = self.board.seq
+            self.out(render_text(snap))
+            return
+        age = (datetime.now(timezone.utc) - snap.as_of).total_seconds()
+        if age >= self.stale_after_s:
+            self.out(f"[status] no new market data for {age:.0f}s")
+
+    async def run(self, interval_s: float) -> None:
+        while True:
+            await asyncio.sleep(interval_s)
+            self.tick()
+
+
+class StatusServer:
+    """
+    Local HTTP status page on a daemon thread: GET / (text) and GET /status.json.
+
+    Handlers only read the board's latest snapshot, so a slow client never touches the engine.
+    """
+
+    def __init__(self, board: StatusBoard, *, host: str = "127.0.0.1", port: int = 0) -> None:
+        board_ = board
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                snap = board_.latest()
+                path = self.path.split("?", 1)[0]
+                if path not in ("/", "/status.json"):
+                    self.send_error(404)
+                    return
+                if path == "/status.json":
+                    body = b"null" if snap is None else snapshot_json(snap).encode()
+                    ctype = "application/json"
+                else:
+                    text = "(no snapshot yet)" if snap is None else render_text(snap)
+                    body = text.encode() + b"\n"
+                    ctype = "text/plain; charset=utf-8"
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.host, self.port = self._httpd.server_address[:2]
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="status-http", daemon=True
+        )
+
+    def start(self) -> StatusServer:
+        self._thread.start()
+        return self
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/"
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set
+
+from polymarket_pgsql.clob_ws import OrderBookTop
+from polymarket_pgsql.gmp import BasketState, MarketTokens
+from polymarket_pgsql.strategy_host import HostSignal, Strategy
+
+# 可挂到 StrategyHost 上的内置策略。
+
+
+class GmpBasketStrategy(Strategy):
+    """
+    GMP basket signals for one side (YES or NO) of one event: BUY_<O>_ALL and SELL_<O>_ALL.
+
+    Emits a HostSignal when a condition starts to hold (rising edge), like the single-process
+    script.
+    """
+
+    def __init__(
+        self,
+        *,
+        event_id: int,
+        tokens: List[MarketTokens],
+        outcome: str = "YES",
+        fee_rate: Decimal = Decimal("0"),
+        threshold: Optional[Decimal] = None,
+        name: Optional[str] = None,
+        print_interval_s: Optional[float] = None,
+    ) -> None:
+        self.event_id = event_id
+        self.tokens = list(tokens)
+        self.outcome = outcome.upper()
+        self.fee_rate = fee_rate
+        self.threshold = threshold
+        self.name = name or f"gmp_{self.outcome.lower()}:{event_id}"
+        self.timer_interval_s = print_interval_s
+        self.basket = BasketState(self.tokens)
+        self.active: Set[str] = set()
+        self._kinds = {f"BUY_{self.outcome}_ALL", f"SELL_{self.outcome}_ALL"}
+
+    def assets(self) -> Iterable[str]:
+        return [t.asset_for(self.outcome) for t in self.tokens]
+
+    def on_book_update(self, asset_id: str, top: OrderBookTop) -> None:
+        self.basket.update(asset_id, top)
+        key = "yes_threshold" if self.outcome == "YES" else "no_threshold"
+        held = self.basket.evaluate(fee_rate=self.fee_rate, **{key: self.threshold})
+        signals = [s for s in held if s.kind in self._kinds]
+        kinds = {s.kind for s in signals}
+        for sig in signals:
+            if sig.kind in self.active:
+                continue
+            self.host.emit(
+                HostSignal(
+                    strategy=self.name,
+                    kind=sig.kind,
+                    as_of=top.as_of,
+                    edge=sig.edge,
+                    event_id=self.event_id,
+                    detail={
+                        "total": str(sig.total),
+                        "payout": str(sig.payout),
+                        "fee_rate": str(self.fee_rate),
+                        "markets": [t.market_id for t in self.tokens],
+                    },
+                )
+            )
+        self.active = kinds
+
+    def on_timer(self, now: datetime) -> None:
+        field = f"{self.outcome.lower()}_ask"
+        total = self.basket.total(field)
+        ts = now.strftime("%Y-%m-%d %H:%M:%S UTC")
+        print(
+            f"[{ts}] {self.name} sum_{field}={'NA' if total is None else f'{total:.6f}'} "
+            f"payout={self.basket.payout(self.outcome)} "
+            f"signals={','.join(sorted(self.active)) or '-'}",
+            flush=True,
+        )
+
+
+class SpreadMonitor(Strategy):
+    """
+    Flags assets whose bid/ask spread is wider than max_spread (WIDE_SPREAD on the rising edge).
+    """
+
+    def __init__(
+        self,
+        asset_ids: Iterable[str],
+        *,
+        max_spread: Decimal,
+        name: str = "spread_monitor",
+        labels: Optional[Dict[str, str]] = None,
+        print_interval_s: Optional[float] = 10.0,
+    ) -> None:
+        self._assets = list(asset_ids)
+        self.max_spread = max_spread
+        self.name = name
+        self.labels = labels or {}
+        self.timer_interval_s = print_interval_s
+        self.spreads: Dict[str, Decimal] = {}
+        self.wide: Set[str] = set()
+
+    def assets(self) -> Iterable[str]:
+        return self._assets
+
+    def on_book_update(self, asset_id: str, top: OrderBookTop) -> None:
+        if top.best_bid is None or top.best_ask is None:
+            self.spreads.pop(asset_id, None)
+            self.wide.discard(asset_id)
+            return
+        spread = top.best_ask - top.best_bid
+        self.spreads[asset_id] = spread
+        if spread > self.max_spread:
+            if asset_id not in self.wide:
+                self.wide.add(asset_id)
+                self.host.emit(
+                    HostSignal(
+                        strategy=self.name,
+                        kind="WIDE_SPREAD",
+                        as_of=top.as_of,
+                        detail={
+                            "asset_id": asset_id,
+                            "label": self.labels.get(asset_id),
+                            "spread": str(spread),
+                            "max_spread": str(self.max_spread),
+                        },
+                    )
+                )
+        else:
+            self.wide.discard(asset_id)
+
+    def on_timer(self, now: datetime) -> None:
+        ts = now.strftime("%Y-%m-%d %H:%M:%S UTC")
+        widest = max(self.spreads.items(), key=lambda kv: kv[1], default=None)
+        if widest is None:
+            w = "-"
+        else:
+            w = f"{self.labels.get(widest[0], '…' + widest[0][-8:])}={widest[1]:.4f}"
+        print(
+            f"[{ts}] {self.name} quoted={len(self.spreads)}/{len(self._assets)} "
+            f"wide={len(self.wide)} widest={w}",
+            flush=True,
+        )
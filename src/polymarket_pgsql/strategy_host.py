@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from polymarket_pgsql.clob_ws import (
+    DEFAULT_RAW_RETENTION,
+    OrderBookState,
+    OrderBookTop,
+    apply_market_event,
+    market_channel_stream,
+)
+
+# 策略宿主：一条 WS、一套共享的 OrderBookState，多个策略挂在上面。
+# - register(strategy)：策略声明关心的 asset（strategy.assets()），宿主只把这些 asset 的更新派发给它
+# - 回调：on_start(host) / on_book_update(asset_id, top) / on_timer(now) / on_stop()
+# - 每个策略的调用次数、耗时（总计/最大）、异常数单独统计，report() 打印用于 profiling
+# - 策略通过 host.emit(...) 发信号，由宿主交给注册的 sink（打印 / 写 PG 等）
+# 新想法写成一个 Strategy 子类注册进来即可，不必再复制整个实时脚本、另开 WS。
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass(frozen=True)
+class HostSignal:
+    strategy: str
+    kind: str
+    as_of: datetime
+    edge: Optional[Decimal] = None
+    event_id: Optional[int] = None
+    detail: Dict[str, Any] = field(default_factory=dict)
+
+
+SignalSink = Callable[[HostSignal], None]
+
+
+class Strategy:
+    """
+    Base class for hosted strategies; override only the callbacks you need.
+
+    Callbacks run on the host's event loop thread and must not block.
+    """
+
+    name: str = "strategy"
+    timer_interval_s: Optional[float] = None  # None: on_timer is never called
+
+    host: StrategyHost
+
+    def assets(self) -> Iterable[str]:
+        return ()
+
+    def on_start(self, host: StrategyHost) -> None:
+        pass
+
+    def on_book_update(self, asset_id: str, top: OrderBookTop) -> None:
+        pass
+
+    def on_timer(self, now: datetime) -> None:
+        pass
+
+    def on_stop(self) -> None:
+        pass
+
+
+@dataclass
+class StrategyStats:
+    name: str
+    book_calls: int = 0
+    timer_calls: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
+    errors: int = 0
+
+    @property
+    def calls(self) -> int:
+        return self.book_calls + self.timer_calls
+
+    @property
+    def avg_us(self) -> float:
+        return self.total_ns / self.calls / 1e3 if self.calls else 0.0
+
+
+@dataclass
+class _Entry:
+    strategy: Strategy
+    stats: StrategyStats
+    next_timer: Optional[float] = None  # monotonic
+
+
+class StrategyHost:
+    """
+    Owns the shared books and dispatches each update to the strategies subscribed to that asset.
+    """
+
+    def __init__(
+        self, *, max_error_prints: int = 5, raw_retention: str = DEFAULT_RAW_RETENTION
+    ) -> None:
+        self.books: Dict[str, OrderBookState] = {}
+        # 共享 book 的 top.raw 留存策略（见 clob_ws.RAW_RETENTION_MODES）
+        self.raw_retention = raw_retention
+        self._entries: Dict[str, _Entry] = {}
+        self._subs: Dict[str, List[_Entry]] = {}
+        self._sinks: List[SignalSink] = []
+        self.max_error_prints = max_error_prints
+        self.messages = 0
+        self.started = False
+
+    # ---- registration ----
+    def register(self, strategy: Strategy) -> Strategy:
+        if strategy.name in self._entries:
+            raise ValueError(f"strategy {strategy.name!r} already registered")
+        e = _Entry(strategy=strategy, stats=StrategyStats(name=strategy.name))
+        strategy.host = self
+        self._entries[strategy.name] = e
+        for aid in strategy.assets():
+            self._subs.setdefault(aid, []).append(e)
+        if self.started:
+            self._start(e)
+        return strategy
+
+    def unregister(self, name: str) -> Optional[Strategy]:
+        e = self._entries.pop(name, None)
+        if e is None:
+            return None
+        for aid in list(self._subs):
+            subs = [x for x in self._subs[aid] if x is not e]
+            if subs:
+                self._subs[aid] = subs
+            else:
+                del self._subs[aid]
+        self._call(e, e.strategy.on_stop)
+        return e.strategy
+
+    def add_sink(self, sink: SignalSink) -> None:
+        self._sinks.append(sink)
+
+    @property
+    def strategies(self) -> List[Strategy]:
+        return [e.strategy for e in self._entries.values()]
+
+    @property
+    def asset_ids(self) -> List[str]:
+        """
+        Union of all subscriptions (what the WS must subscribe to).
+        """
+        return list(self._subs)
+
+    def book(self, asset_id: str) -> OrderBookState:
+        st = self.books.get(asset_id)
+        if st is None:
+            st = self.books[asset_id] = OrderBookState(raw_retention=self.raw_retention)
+        return st
+
+    # ---- dispatch ----
+    def _call(self, e: _Entry, fn: Callable[..., None], *args: Any) -> None:
+        t0 = time.perf_counter_ns()
+        try:
+            fn(*args)
+        except Exception as exc:
+            e.stats.errors += 1
+            # 策略出错不影响宿主和其它策略；只打印前几次，之后看 report() 的 errors
+            if e.stats.errors <= self.max_error_prints:
+                print(
+                    f"[host] strategy {e.strategy.name!r} {fn.__name__} error: "
+                    f"{type(exc).__name__}: {exc}",
+                    flush=True,
+                )
+        dt = time.perf_counter_ns() - t0
+        e.stats.total_ns += dt
+        if dt > e.stats.max_ns:
+            e.stats.max_ns = dt
+
+    def _start(self, e: _Entry) -> None:
+        self._call(e, e.strategy.on_start, self)
+        if e.strategy.timer_interval_s is not None:
+            e.next_timer = time.monotonic() + e.strategy.timer_interval_s
+
+    def start(self) -> None:
+        self.started = True
+        for e in list(self._entries.values()):
+            self._start(e)
+
+    def stop(self) -> None:
+        for e in list(self._entries.values()):
+            self._call(e, e.strategy.on_stop)
+        self.started = False
+
+    def on_event(self, as_of: datetime, asset_id: str, ev: Dict[str, Any]) -> None:
+        """
+        Apply one normalized market event to the shared book and notify its subscribers.
+        """
+        subs = self._subs.get(asset_id)
+        if subs is None:
+            return
+        st = self.book(asset_id)
+        apply_market_event(st, ev, as_of=as_of)
+        self.messages += 1
+        top = st.top
+        for e in subs:
+            e.stats.book_calls += 1
+            self._call(e, e.strategy.on_book_update, asset_id, top)
+
+    def tick(self, now: Optional[datetime] = None) -> None:
+        """
+        Fire due timers (cheap to call after every message).
+        """
+        mono = time.monotonic()
+        wall: Optional[datetime] = now
+        for e in self._entries.values():
+            if e.next_timer is None or mono < e.next_timer:
+                continue
+            interval = e.strategy.timer_interval_s or 0.0
+            e.next_timer = mono + interval
+            wall = wall or utc_now()
+            e.stats.timer_calls += 1
+            self._call(e, e.strategy.on_timer, wall)
+
+    def emit(self, sig: HostSignal) -> None:
+        for sink in self._sinks:
+            try:
+                sink(sig)
+            except Exception as exc:
+                print(f"[host] signal sink error: {type(exc).__name__}: {exc}", flush=True)
+
+    # ---- profiling ----
+    def stats(self) -> List[StrategyStats]:
+        return [e.stats for e in self._entries.values()]
+
+    def report(self) -> str:
+        lines = [
+            f"[host] messages={self.messages} assets={len(self._subs)} "
+            f"strategies={len(self._entries)}"
+        ]
+        for s in sorted(self.stats(), key=lambda x: -x.total_ns):
+            lines.append(
+                f"  {s.name:<24} book={s.book_calls} timer={s.timer_calls} "
+                f"total={s.total_ns / 1e6:.1f}ms "
+                f"avg={s.avg_us:.1f}us max={s.max_ns / 1e3:.0f}us errors={s.errors}"
+            )
+        return "\n".join(lines)
+
+    # ---- feed ----
+    async def run(
+        self,
+        *,
+        ws_url: str,
+        auth: Optional[Dict[str, str]] = None,
+        ping_interval_s: float = 5.0,
+        reconnect_delay_s: float = 3.0,
+        timer_poll_s: float = 0.5,
+    ) -> None:
+        """
+        Feed the shared books from one market channel connection (reconnects forever).
+        """
+        if not self.started:
+            self.start()
+
+        async def _timers() -> None:
+            # 行情安静时也要按时触发 on_timer
+            while True:
+                await asyncio.sleep(timer_poll_s)
+                self.tick()
+
+        timers = asyncio.create_task(_timers())
+        try:
+            while True:
+                try:
+                    async for as_of, asset_id, ev in market_channel_stream(
+                        ws_url=ws_url,
+                        asset_ids=self.asset_ids,
+                        auth=auth,
+                        ping_interval_s=ping_interval_s,
+                        recv_timeout_s=max(10.0, ping_interval_s * 6),
+                    ):
+                        self.on_event(as_of, asset_id, ev)
+                        self.tick()
+                except Exception as e:
+                    ts = utc_now().strftime("%Y-%m-%d %H:%M:%S UTC")
+                    print(f"[{ts}] WS error: {type(e).__name__}: {e} (reconnect...)", flush=True)
+                    await asyncio.sleep(reconnect_delay_s)
+        finally:
+            timers.cancel()
+            self.stop()
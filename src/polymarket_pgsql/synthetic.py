@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from polymarket_pgsql.gmp import MarketTokens
+
+# 合成 market channel 流量（benchmark / 本地压测用）：
+# - N 个 event × 每个 event M 个二元 market（YES/NO 两个 asset），同一 event 的 YES mid 之和≈1
+# - 消息形态与线上一致：book 快照、price_change 批量（每条带 best_bid/best_ask）、
+#   best_bid_ask、last_trade_price
+# - 内部价格用整数 tick（1 tick = 0.001），输出成线上一样的字符串价格
+# 同一 seed 生成的序列完全一致，便于对比不同版本的结果。
+
+TICKS_PER_UNIT = 1000
+
+
+def _px(t: int) -> str:
+    return f"{t / TICKS_PER_UNIT:.3f}"
+
+
+@dataclass
+class _Book:
+    bids: Dict[int, int] = field(default_factory=dict)  # tick -> size
+    asks: Dict[int, int] = field(default_factory=dict)
+
+    def best_bid(self) -> Optional[int]:
+        return max(self.bids) if self.bids else None
+
+    def best_ask(self) -> Optional[int]:
+        return min(self.asks) if self.asks else None
+
+
+@dataclass
+class SyntheticMarketFeed:
+    """
+    Deterministic generator of market channel payloads for n_events × markets_per_event.
+
+    Message mix (per next_message call) is controlled by snapshot_ratio / top_ratio /
+    trade_ratio; the rest are price_change messages carrying `batch_size` changes.
+
+    If `subscribed_ids` is given (e.g. the ids a client subscribed to), they are used in order as
+    YES/NO pairs, markets_per_event markets per event, instead of random ids.
+    """
+
+    n_events: int = 10
+    markets_per_event: int = 4
+    depth: int = 10
+    batch_size: int = 3
+    snapshot_ratio: float = 0.02
+    top_ratio: float = 0.10
+    trade_ratio: float = 0.05
+    seed: int = 0
+    subscribed_ids: Optional[List[str]] = None
+
+    events: List[List[MarketTokens]] = field(init=False, default_factory=list)
+    # market_id -> condition id
+    condition_ids: Dict[int, str] = field(init=False, default_factory=dict)
+    asset_market: Dict[str, int] = field(init=False, default_factory=dict)
+    _books: Dict[str, _Book] = field(init=False, default_factory=dict)
+    _assets: List[str] = field(init=False, default_factory=list)
+    _rng: random.Random = field(init=False)
+    _ts_ms: int = field(init=False, default=1_765_555_207_000)
+
+    def __post_init__(self) -> None:
+        self._rng = random.Random(self.seed)
+        market_id = 600_000
+        given = list(self.subscribed_ids or [])
+        if given:
+            if len(given) % 2:
+                given.append(str(self._rng.getrandbits(255)))  # 奇数个：补一个不会被订阅的 NO
+            n_markets = len(given) // 2
+            self.n_events = -(-n_markets // self.markets_per_event)
+        for _ in range(self.n_events):
+            n_legs = self.markets_per_event
+            if given:
+                n_legs = min(n_legs, len(given) // 2)
+            weights = [self._rng.random() + 0.05 for _ in range(n_legs)]
+            total = sum(weights)
+            legs: List[MarketTokens] = []
+            for w in weights:
+                market_id += 1
+                if given:
+                    yes_id, no_id = given.pop(0), given.pop(0)
+                else:
+                    yes_id = str(self._rng.getrandbits(255))
+                    no_id = str(self._rng.getrandbits(255))
+                legs.append(
+                    MarketTokens(
+                        market_id=market_id,
+                        question=f"synthetic {market_id}",
+                        yes_asset_id=yes_id,
+                        no_asset_id=no_id,
+                    )
+                )
+                self.condition_ids[market_id] = f"0x{self._rng.getrandbits(256):064x}"
+                yes_mid = min(max(int(TICKS_PER_UNIT * w / total), 3), TICKS_PER_UNIT - 3)
+                for aid, mid in ((yes_id, yes_mid), (no_id, TICKS_PER_UNIT - yes_mid)):
+                    self.asset_market[aid] = market_id
+                    self._books[aid] = self._seed_book(mid)
+                    self._assets.append(aid)
+            self.events.append(legs)
+
+    # ---- public API ----
+    def asset_ids(self) -> List[str]:
+        return list(self._assets)
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        return [self._book_msg(aid) for aid in self._assets]
+
+    def book_snapshot(self, asset_id: str) -> Dict[str, Any]:
+        """
+        Current book of one asset as a snapshot message (also the CLOB REST /book shape).
+
+        Does not advance the generator: the hash is a digest of the book, not a random draw.
+        """
+        msg = self._book_msg(asset_id, hash_="")
+        msg["hash"] = "0x" + hashlib.sha1(json.dumps(msg, sort_keys=True).encode()).hexdigest()
+        return msg
+
+    def next_message(self) -> Dict[str, Any]:
+        self._ts_ms += self._rng.randint(1, 50)
+        r = self._rng.random()
+        if r < self.snapshot_ratio:
+            return self._book_msg(self._rng.choice(self._assets))
+        r -= self.snapshot_ratio
+        if r < self.top_ratio:
+            # best_bid_ask 只回显当前最优价：深度变化都经 price_change 下发，
+            # 客户端的盘口才能与服务端一致
+            return self._top_msg(self._rng.choice(self._assets))
+        r -= self.top_ratio
+        if r < self.trade_ratio:
+            return self._trade_msg(self._rng.choice(self._assets))
+        return self._price_change_msg()
+
+    def messages(self, n: int) -> List[Dict[str, Any]]:
+        return [self.next_message() for _ in range(n)]
+
+    def frames(self, n: int) -> List[str]:
+        """
+        n JSON text frames as the server would send them (snapshots go first, as one list frame).
+        """
+        return [json.dumps(self.snapshots())] + [json.dumps(m) for m in self.messages(n)]
+
+    # ---- internals ----
+    def _seed_book(self, mid: int) -> _Book:
+        b = _Book()
+        for i in range(self.depth):
+            bid = mid - 1 - i
+            ask = mid + 1 + i
+            if bid >= 1:
+                b.bids[bid] = self._size()
+            if ask <= TICKS_PER_UNIT - 1:
+                b.asks[ask] = self._size()
+        return b
+
+    def _size(self) -> int:
+        return self._rng.choice((5, 10, 25, 50, 100, 250, 1000))
+
+    def _mutate(self, aid: str) -> Dict[str, Any]:
+        """
+        One level change near the top of the book; returns the change entry (price/size/side).
+        """
+        b = self._books[aid]
+        buy = self._rng.random() < 0.5
+        levels = b.bids if buy else b.asks
+        best_bid = b.best_bid() or 1
+        best_ask = b.best_ask() or TICKS_PER_UNIT - 1
+        if buy:
+            tick = best_bid + self._rng.randint(-3, 1)
+            tick = min(max(tick, 1), best_ask - 1)
+        else:
+            tick = best_ask + self._rng.randint(-1, 3)
+            tick = max(min(tick, TICKS_PER_UNIT - 1), best_bid + 1)
+        remove = tick in levels and self._rng.random() < 0.3 and len(levels) > 2
+        size = 0 if remove else self._size()
+        if size == 0:
+            levels.pop(tick, None)
+        else:
+            levels[tick] = size
+        return {"price": _px(tick), "size": str(size), "side": "BUY" if buy else "SELL"}
+
+    def _top_fields(self, aid: str) -> Dict[str, str]:
+        b = self._books[aid]
+        bb, ba = b.best_bid(), b.best_ask()
+        return {
+            "best_bid": _px(bb) if bb is not None else "0",
+            "best_ask": _px(ba) if ba is not None else "1",
+        }
+
+    def _hash(self) -> str:
+        return f"0x{self._rng.getrandbits(160):040x}"
+
+    def _book_msg(self, aid: str, *, hash_: Optional[str] = None) -> Dict[str, Any]:
+        b = self._books[aid]
+        return {
+            "event_type": "book",
+            "asset_id": aid,
+            "market": self.condition_ids[self.asset_market[aid]],
+            "bids": [{"price": _px(p), "size": str(s)} for p, s in sorted(b.bids.items())],
+            "asks": [
+                {"price": _px(p), "size": str(s)} for p, s in sorted(b.asks.items(), reverse=True)
+            ],
+            "timestamp": str(self._ts_ms),
+            "hash": self._hash() if hash_ is None else hash_,
+        }
+
+    def _top_msg(self, aid: str) -> Dict[str, Any]:
+        return {
+            "event_type": "best_bid_ask",
+            "asset_id": aid,
+            "market": self.condition_ids[self.asset_market[aid]],
+            **self._top_fields(aid),
+            "timestamp": str(self._ts_ms),
+        }
+
+    def _trade_msg(self, aid: str) -> Dict[str, Any]:
+        b = self._books[aid]
+        buy = self._rng.random() < 0.5
+        tick = (b.best_ask() if buy else b.best_bid()) or TICKS_PER_UNIT // 2
+        return {
+            "event_type": "last_trade_price",
+            "asset_id": aid,
+            "market": self.condition_ids[self.asset_market[aid]],
+            "price": _px(tick),
+            "size": str(self._size()),
+            "side": "BUY" if buy else "SELL",
+            "fee_rate_bps": "0",
+            "timestamp": str(self._ts_ms),
+        }
+
+    def _price_change_msg(self) -> Dict[str, Any]:
+        # 线上 price_change 按 market（condition）聚合：同一 market 的 YES/NO 变化放在一条消息里
+        legs = self._rng.choice(self.events)
+        t = self._rng.choice(legs)
+        changes = []
+        for _ in range(self.batch_size):
+            aid = t.yes_asset_id if self._rng.random() < 0.5 else t.no_asset_id
+            ch = self._mutate(aid)
+            changes.append({"asset_id": aid, **ch, "hash": self._hash(), **self._top_fields(aid)})
+        return {
+            "event_type": "price_change",
+            "market": self.condition_ids[t.market_id],
+            "price_changes": changes,
+            "timestamp": str(self._ts_ms),
+        }
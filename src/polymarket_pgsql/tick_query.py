@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import psycopg
+
+from polymarket_pgsql.fixedpoint import PRICE_SCALE
+
+# 研究用 tick 查询：直接从 PG 流式读进 NumPy 数组，不再经 CSV 导出再逐行解析文本。
+# - 一个命名（服务端）游标、二进制结果：按传入的 asset 顺序逐个走主键 (asset_id, as_of)（lateral），
+#   每次取 chunk_rows 行，客户端内存里只有一批
+# - 每行在服务端拼成一条定长大端二进制记录（int4send / timestamptz_send 等拼接成一个 bytea），
+#   客户端整批 b"".join 后用 np.frombuffer 按结构化 dtype 解开，再拷进按行数预分配好的列数组：
+#   Python 侧每行只有一个 bytes 对象，不逐格构造 int/Decimal/datetime
+# - 先 count 一次分配好全部数组；跨 asset 按时间排序在客户端用 np.argsort 做，
+#   服务端不对整月 ticks 外排
+# - 价格与 tick_store 一致，存整数 tick（PRICE_SCALE，1e-6），缺失为 NO_PRICE；
+#   as_of 为 datetime64[us]（UTC）
+# - asset 列是 TickArrays.asset_ids 里的下标（int32），一个月的 ticks 不必每行带一个字符串
+
+NO_PRICE = -1
+DEFAULT_COLUMNS = ("as_of", "asset", "best_bid", "best_ask")
+
+# name -> (行记录里的 SQL 表达式, 线上的大端类型)
+_WIRE: Dict[str, Tuple[str, str]] = {
+    "as_of": ("timestamptz_send(t.as_of)", ">i8"),  # 二进制 timestamptz：2000-01-01 起的微秒数
+    "asset": ("int4send((a.k - 1)::int4)", ">i4"),
+    "market_id": ("int8send(coalesce(t.market_id, -1))", ">i8"),
+    "best_bid": (f"int4send(coalesce((t.best_bid * {PRICE_SCALE})::int4, {NO_PRICE}))", ">i4"),
+    "best_ask": (f"int4send(coalesce((t.best_ask * {PRICE_SCALE})::int4, {NO_PRICE}))", ">i4"),
+    "mid": (f"int4send(coalesce((t.mid * {PRICE_SCALE})::int4, {NO_PRICE}))", ">i4"),
+}
+# 结果数组的 dtype
+_DTYPES = {
+    "as_of": "datetime64[us]",
+    "asset": "int32",
+    "market_id": "int64",
+    "best_bid": "int32",
+    "best_ask": "int32",
+    "mid": "int32",
+}
+TICK_COLUMNS = tuple(_DTYPES)
+_PG_EPOCH_US = 946_684_800_000_000  # 2000-01-01 - 1970-01-01
+
+_cursor_ids = itertools.count()
+
+
+def _np() -> Any:
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError("tick 查询解码为数组需要 numpy：pip install numpy") from e
+    return numpy
+
+
+@dataclass
+class TickArrays:
+    """
+    Ticks as column arrays (one row per tick, ordered by as_of unless loaded with order="asset").
+
+    columns["asset"] indexes into asset_ids; price columns are integer ticks (see price()).
+    """
+
+    asset_ids: List[str]
+    columns: Dict[str, Any]
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, name: str) -> Any:
+        return self.columns[name]
+
+    def price(self, name: str) -> Any:
+        """
+        A price column as float64, NaN where the quote was missing.
+        """
+        np = _np()
+        ticks = self.columns[name]
+        out = ticks.astype(np.float64) / PRICE_SCALE
+        out[ticks == NO_PRICE] = np.nan
+        return out
+
+    def for_asset(self, asset_id: str) -> TickArrays:
+        """
+        Rows of one asset (needs the "asset" column).
+        """
+        mask = self.columns["asset"] == self.asset_ids.index(asset_id)
+        return TickArrays(
+            asset_ids=[asset_id],
+            columns={k: v[mask] for k, v in self.columns.items() if k != "asset"},
+        )
+
+
+def event_asset_ids(conn: psycopg.Connection[Any], event_id: int) -> List[str]:
+    """
+    Asset ids of an event's markets.
+
+    Assets seen in asset_price_latest plus the tokens in staging_markets.
+    """
+    rows = conn.execute(
+        """
+        with m as (
+          select market_id, clob_token_ids from staging_markets where event_id = %(e)s
+          union all
+          select market_id, null::jsonb from watch_markets where event_id = %(e)s
+        )
+        select asset_id from asset_price_latest where market_id in (select market_id from m)
+        union
+        select jsonb_array_elements_text(
+                 case jsonb_typeof(clob_token_ids)
+                   when 'array' then clob_token_ids
+                   when 'string' then (clob_token_ids #>> '{}')::jsonb
+                 end)
+        from m
+        where jsonb_typeof(clob_token_ids) in ('array', 'string')
+        order by 1
+        """,
+        {"e": event_id},
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def _check(columns: Sequence[str], order: str) -> None:
+    unknown = [c for c in columns if c not in TICK_COLUMNS]
+    if unknown or not columns:
+        raise ValueError(f"unknown tick columns {unknown}; available: {', '.join(TICK_COLUMNS)}")
+    if order not in ("time", "asset"):
+        raise ValueError("order must be 'time' or 'asset'")
+
+
+def iter_tick_chunks(
+    conn: psycopg.Connection[Any],
+    asset_ids: Sequence[str],
+    start: datetime,
+    end: datetime,
+    columns: Sequence[str] = DEFAULT_COLUMNS,
+    *,
+    chunk_rows: int = 100_000,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream ticks in [start, end) as {column: array} chunks of up to chunk_rows rows.
+
+    Rows come asset by asset (in asset_ids order), each asset in as_of order. Runs inside its own
+    transaction block (a savepoint if one is already open): the server-side cursor lives only as
+    long as the transaction.
+    """
+    np = _np()
+    _check(columns, "asset")
+    dtype = np.dtype([(c, _WIRE[c][1]) for c in columns])
+    sql = f"""
+        select x.rec
+        from unnest(%(aids)s::text[]) with ordinality as a(asset_id, k)
+        cross join lateral (
+          select {" || ".join(_WIRE[c][0] for c in columns)} as rec
+          from asset_price_ticks t
+          where t.asset_id = a.asset_id and t.as_of >= %(start)s and t.as_of < %(end)s
+          order by t.as_of
+        ) x
+    """
+    with conn.transaction():
+        with conn.cursor(name=f"pm_ticks_{next(_cursor_ids)}", binary=True) as cur:
+            cur.itersize = chunk_rows
+            cur.execute(sql, {"aids": list(asset_ids), "start": start, "end": end})
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                rec = np.frombuffer(b"".join([r[0] for r in rows]), dtype=dtype)
+                yield {
+                    c: (
+                        (rec[c] + _PG_EPOCH_US).view("datetime64[us]")
+                        if c == "as_of"
+                        else rec[c].astype(_DTYPES[c])
+                    )
+                    for c in columns
+                }
+
+
+def count_ticks(
+    conn: psycopg.Connection[Any], asset_ids: Sequence[str], start: datetime, end: datetime
+) -> int:
+    row = conn.execute(
+        """
+        select count(*)
+        from asset_price_ticks
+        where asset_id = any(%(aids)s) and as_of >= %(start)s and as_of < %(end)s
+        """,
+        {"aids": list(asset_ids), "start": start, "end": end},
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
+def load_ticks(
+    conn: psycopg.Connection[Any],
+    assets: Sequence[str] | int,
+    start: datetime,
+    end: datetime,
+    columns: Optional[Sequence[str]] = None,
+    *,
+    chunk_rows: int = 100_000,
+    order: str = "time",
+) -> TickArrays:
+    """
+    Ticks of some assets in [start, end).
+
+    When `assets` is an event id, the ticks of every asset of that event.
+
+    Counts the rows first, allocates one native array per column, then fills them chunk by chunk
+    from iter_tick_chunks(); peak memory is the arrays plus one chunk (plus one column copy while
+    reordering for order="time"; order="asset" keeps the server's asset-then-time order).
+    """
+    np = _np()
+    asset_ids = (
+        event_asset_ids(conn, assets) if isinstance(assets, int) else list(dict.fromkeys(assets))
+    )
+    cols = list(columns) if columns is not None else list(DEFAULT_COLUMNS)
+    _check(cols, order)
+    fetch = cols if order == "asset" or "as_of" in cols else ["as_of", *cols]
+    n = count_ticks(conn, asset_ids, start, end) if asset_ids else 0
+    arrays = {c: np.empty(n, dtype=_DTYPES[c]) for c in fetch}
+    pos = 0
+    if n:
+        for chunk in iter_tick_chunks(conn, asset_ids, start, end, fetch, chunk_rows=chunk_rows):
+            m = len(chunk[fetch[0]])
+            if pos + m > n:  # 计数之后又写进来的行（end 在未来时）：扩容
+                n = max(pos + m, 2 * n)
+                arrays = {c: np.resize(a, n) for c, a in arrays.items()}
+            for c in fetch:
+                arrays[c][pos : pos + m] = chunk[c]
+            pos += m
+    out = {c: a[:pos] for c, a in arrays.items()}
+    if order == "time" and pos:
+        idx = np.argsort(out["as_of"], kind="stable")
+        for c in fetch:
+            out[c] = out[c][idx]
+    return TickArrays(asset_ids=asset_ids, columns={c: out[c] for c in cols})
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from polymarket_pgsql.fixedpoint import decimal_to_units, to_decimal
+
+# 本地列式 tick 存储（Parquet）：
+#   <root>/day=YYYY-MM-DD/market_id=<id>/ticks.parquet
+# - 每天 × 每个 market（YES/NO 两个 asset 为一组）一个文件，hive 分区便于按天/market 裁剪
+# - asset_id/outcome/source 字典编码；价格存整数 tick（PRICE_SCALE）；文件内按 as_of 排序
+# - 行组带 min/max 统计，读取端按 as_of 做谓词下推，只解码需要的列和行组
+
+# 1 tick = 1e-6，与 fixedpoint 的价格单位相同：定点模式下的整数价格可以直接落盘
+FILE_NAME = "ticks.parquet"
+
+# 一行 tick：
+#   (asset_id, as_of, market_id, outcome, best_bid_ticks, best_ask_ticks, mid_ticks, source)
+TickRow = Tuple[str, datetime, int, Optional[str], Optional[int], Optional[int], Optional[int], str]
+
+
+def _pa() -> Any:
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise RuntimeError("tick store 需要 pyarrow：pip install pyarrow") from e
+    return pyarrow
+
+
+def price_to_ticks(x: Optional[Decimal]) -> Optional[int]:
+    if x is None:
+        return None
+    return decimal_to_units(x)
+
+
+def ticks_to_price(t: Optional[int]) -> Optional[Decimal]:
+    return to_decimal(t)
+
+
+def schema() -> Any:
+    pa = _pa()
+    return pa.schema(
+        [
+            ("asset_id", pa.dictionary(pa.int32(), pa.string())),
+            ("as_of", pa.timestamp("us", tz="UTC")),
+            ("outcome", pa.dictionary(pa.int8(), pa.string())),
+            ("best_bid", pa.int32()),
+            ("best_ask", pa.int32()),
+            ("mid", pa.int32()),
+            ("source", pa.dictionary(pa.int8(), pa.string())),
+        ]
+    )
+
+
+def partition_path(root: str, day: date, market_id: int) -> str:
+    return os.path.join(root, f"day={day.isoformat()}", f"market_id={int(market_id)}", FILE_NAME)
+
+
+@dataclass
+class _Buffer:
+    asset_id: List[str] = field(default_factory=list)
+    as_of: List[datetime] = field(default_factory=list)
+    outcome: List[Optional[str]] = field(default_factory=list)
+    best_bid: List[Optional[int]] = field(default_factory=list)
+    best_ask: List[Optional[int]] = field(default_factory=list)
+    mid: List[Optional[int]] = field(default_factory=list)
+    source: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.as_of)
+
+    def to_table(self) -> Any:
+        return _encode(
+            _pa().table(
+                {
+                    "asset_id": self.asset_id,
+                    "as_of": self.as_of,
+                    "outcome": self.outcome,
+                    "best_bid": self.best_bid,
+                    "best_ask": self.best_ask,
+                    "mid": self.mid,
+                    "source": self.source,
+                }
+            )
+        )
+
+
+def _encode(plain: Any) -> Any:
+    """
+    Cast a table with plain (or differently encoded) columns to the store schema.
+    """
+    pa = _pa()
+    sch = schema()
+    arrays = []
+    for f in sch:
+        col = plain.column(f.name)
+        if pa.types.is_dictionary(f.type):
+            arrays.append(col.cast(pa.string()).dictionary_encode().cast(f.type))
+        else:
+            arrays.append(col.cast(f.type))
+    return pa.Table.from_arrays(arrays, schema=sch)
+
+
+def _sort_dedupe(table: Any) -> Any:
+    """
+    Sort by as_of and drop duplicate (asset_id, as_of) rows, keeping the last occurrence
+    (same semantics as asset_price_ticks' primary key).
+    """
+    pa = _pa()
+    import pyarrow.compute as pc
+
+    if table.num_rows < 2:
+        return table
+    # 向量化：按 (as_of, asset_id, 原行号倒序) 排序后，同一 key 的第一行就是最后写入的那行
+    keyed = table.append_column("__i", pa.array(range(table.num_rows), type=pa.int64()))
+    keyed = keyed.append_column("__a", table.column("asset_id").cast(pa.string()))
+    keyed = keyed.sort_by([("as_of", "ascending"), ("__a", "ascending"), ("__i", "descending")])
+    ts = keyed.column("as_of").combine_chunks()
+    aid = keyed.column("__a").combine_chunks()
+    changed = pc.or_(pc.not_equal(ts[1:], ts[:-1]), pc.not_equal(aid[1:], aid[:-1])).fill_null(True)
+    keep = pa.concat_arrays([pa.array([True]), changed])
+    return keyed.filter(keep).drop_columns(["__i", "__a"])
+
+
+class TickStoreWriter:
+    """
+    Buffer exported tick rows and write one Parquet file per (day, market_id).
+
+    Rows may arrive in any order; existing files are merged (sorted + de-duplicated), so
+    repeated/incremental exports into the same store are idempotent.
+    """
+
+    def __init__(
+        self, root: str, *, row_group_size: int = 65536, compression: str = "zstd"
+    ) -> None:
+        self.root = root
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self._buffers: Dict[Tuple[date, int], _Buffer] = {}
+        self.files_written = 0
+        self.rows_written = 0
+
+    def add(self, row: TickRow) -> None:
+        asset_id, as_of, market_id, outcome, bid, ask, mid, source = row
+        key = (as_of.astimezone(timezone.utc).date(), int(market_id))
+        b = self._buffers.get(key)
+        if b is None:
+            b = self._buffers[key] = _Buffer()
+        b.asset_id.append(asset_id)
+        b.as_of.append(as_of)
+        b.outcome.append(outcome)
+        b.best_bid.append(bid)
+        b.best_ask.append(ask)
+        b.mid.append(mid)
+        b.source.append(source)
+
+    def add_many(self, rows: Iterable[TickRow]) -> None:
+        for r in rows:
+            self.add(r)
+
+    def flush_days_before(self, day: date) -> None:
+        """
+        Write out every buffered partition older than `day` (callers streaming rows in
+        as_of order use this to bound memory to roughly one day of ticks).
+        """
+        for key in sorted(k for k in self._buffers if k[0] < day):
+            self._write(key, self._buffers.pop(key))
+
+    def close(self) -> None:
+        for key in sorted(self._buffers):
+            self._write(key, self._buffers.pop(key))
+
+    def _write(self, key: Tuple[date, int], buf: _Buffer) -> None:
+        if not len(buf):
+            return
+        import pyarrow.parquet as pq
+
+        day, market_id = key
+        path = partition_path(self.root, day, market_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        table = buf.to_table()
+        if os.path.exists(path):
+            existing = pq.read_table(path)
+            table = _pa().concat_tables([_encode(existing), table])
+        # 合并后各 chunk 的字典不同，去重后统一重新编码
+        table = _encode(_sort_dedupe(table))
+
+        # 以 "." 开头：写入过程中不会被 dataset 扫描到；每个 writer 用自己的临时文件名
+        fd, tmp = tempfile.mkstemp(
+            prefix=f".{FILE_NAME}.", suffix=".tmp", dir=os.path.dirname(path)
+        )
+        os.close(fd)
+        try:
+            pq.write_table(
+                table,
+                tmp,
+                row_group_size=self.row_group_size,
+                compression=self.compression,
+                use_dictionary=["asset_id", "outcome", "source"],
+                write_statistics=True,
+            )
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self.files_written += 1
+        self.rows_written += table.num_rows
+
+
+def read_ticks(
+    root: str,
+    *,
+    columns: Optional[Sequence[str]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    market_ids: Optional[Sequence[int]] = None,
+    asset_ids: Optional[Sequence[str]] = None,
+    outcome: Optional[str] = None,
+) -> Any:
+    """
+    Read ticks from the store as a pyarrow.Table.
+
+    Only `columns` are decoded. Day/market partitions are pruned from the directory layout,
+    and the as_of range is pushed down to Parquet row-group statistics.
+    Price columns stay as integer ticks (see ticks_to_price / PRICE_SCALE).
+    """
+    import pyarrow.dataset as ds
+
+    pa = _pa()
+    part = ds.partitioning(
+        pa.schema([("day", pa.string()), ("market_id", pa.int64())]), flavor="hive"
+    )
+    dataset = ds.dataset(root, format="parquet", partitioning=part)
+
+    flt = None
+
+    def _and(e: Any) -> None:
+        nonlocal flt
+        flt = e if flt is None else (flt & e)
+
+    if start is not None:
+        _and(ds.field("day") >= start.astimezone(timezone.utc).date().isoformat())
+        _and(ds.field("as_of") >= pa.scalar(start, type=pa.timestamp("us", tz="UTC")))
+    if end is not None:
+        _and(ds.field("day") <= end.astimezone(timezone.utc).date().isoformat())
+        _and(ds.field("as_of") < pa.scalar(end, type=pa.timestamp("us", tz="UTC")))
+    if market_ids:
+        _and(ds.field("market_id").isin([int(m) for m in market_ids]))
+    if asset_ids:
+        _and(ds.field("asset_id").isin(list(asset_ids)))
+    if outcome is not None:
+        _and(ds.field("outcome") == outcome)
+
+    cols = list(columns) if columns is not None else None
+    table = dataset.to_table(columns=cols, filter=flt)
+    if "as_of" in (cols or table.column_names):
+        table = table.sort_by("as_of")
+    return table
@@ -0,0 +1,76 @@
+from polymarket_pgsql.depth_codec import (
+    KIND_DELTA,
+    KIND_KEY,
+    decode_frame,
+    encode_delta,
+    encode_key,
+)
+
+BIDS = [(480_000, 1_000), (470_000, 250), (450_000, 12_345)]
+ASKS = [(490_000, 500), (500_000, 7), (530_000, 100_000)]
+
+
+def _replay(frames):
+    bids, asks = [], []
+    for payload in frames:
+        bids, asks = decode_frame(payload, bids, asks)
+    return bids, asks
+
+
+def test_key_round_trip():
+    payload = encode_key(BIDS, ASKS)
+    assert payload[0] == KIND_KEY
+    assert decode_frame(payload, [], []) == (BIDS, ASKS)
+
+
+def test_key_frame_ignores_previous_levels():
+    payload = encode_key(BIDS, ASKS)
+    assert decode_frame(payload, [(1, 1)], [(2, 2)]) == (BIDS, ASKS)
+
+
+def test_key_round_trip_empty_side():
+    assert decode_frame(encode_key(BIDS, []), [], []) == (BIDS, [])
+    assert decode_frame(encode_key([], ASKS), [], []) == ([], ASKS)
+    assert decode_frame(encode_key([], []), [], []) == ([], [])
+
+
+def test_delta_removes_level():
+    bids = [BIDS[0], BIDS[2]]
+    asks = ASKS[1:]
+    payload = encode_delta(BIDS, ASKS, bids, asks)
+    assert payload[0] == KIND_DELTA
+    assert decode_frame(payload, BIDS, ASKS) == (bids, asks)
+
+
+def test_delta_adds_and_changes_levels():
+    bids = [(485_000, 10), (480_000, 999), *BIDS[1:]]
+    asks = [*ASKS, (600_000, 1)]
+    assert decode_frame(encode_delta(BIDS, ASKS, bids, asks), BIDS, ASKS) == (bids, asks)
+
+
+def test_delta_empties_a_side():
+    payload = encode_delta(BIDS, ASKS, BIDS, [])
+    assert decode_frame(payload, BIDS, ASKS) == (BIDS, [])
+    # 空的一侧再挂单
+    payload = encode_delta(BIDS, [], BIDS, ASKS[:1])
+    assert decode_frame(payload, BIDS, []) == (BIDS, ASKS[:1])
+
+
+def test_unchanged_delta_is_tiny():
+    payload = encode_delta(BIDS, ASKS, BIDS, ASKS)
+    assert len(payload) == 4
+    assert decode_frame(payload, BIDS, ASKS) == (BIDS, ASKS)
+
+
+def test_key_then_deltas_replay():
+    states = [
+        (BIDS, ASKS),
+        (BIDS[1:], ASKS),
+        ([], [(495_000, 3)]),
+        ([(10_000, 1)], [(495_000, 4), (990_000, 2)]),
+    ]
+    frames = [encode_key(*states[0])]
+    for i in range(1, len(states)):
+        (pb, pa), (b, a) = states[i - 1], states[i]
+        frames.append(encode_delta(pb, pa, b, a))
+    assert _replay(frames) == states[-1]
@@ -0,0 +1,83 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from polymarket_pgsql.fixedpoint import (
+    MONEY_SCALE,
+    RATE_SCALE,
+    decimal_to_units,
+    div_round,
+    fee_units,
+    parse_units,
+)
+from polymarket_pgsql.gmp import calc_fee
+
+
+@pytest.mark.parametrize(
+    "n, d, expected",
+    [(5, 2, 2), (7, 2, 4), (-5, 2, -2), (-7, 2, -4), (1, 3, 0), (2, 3, 1), (6, 3, 2), (0, 7, 0)],
+)
+def test_div_round_half_even(n, d, expected):
+    assert div_round(n, d) == expected
+    assert div_round(n, d) == int((Decimal(n) / Decimal(d)).to_integral_value())
+
+
+def _fee(notional: str, rate: str) -> Decimal:
+    n = decimal_to_units(Decimal(notional), MONEY_SCALE)
+    r = decimal_to_units(Decimal(rate), RATE_SCALE)
+    return Decimal(fee_units(n, r)) / MONEY_SCALE
+
+
+@pytest.mark.parametrize(
+    "notional, rate",
+    [
+        ("0.000005", "0.001"),  # 0.5e-8 -> 0
+        ("0.000015", "0.001"),  # 1.5e-8 -> 2e-8
+        ("0.000025", "0.001"),  # 2.5e-8 -> 2e-8
+        ("12.345678", "0.02"),
+        ("1", "0"),
+    ],
+)
+def test_fee_units_matches_calc_fee(notional, rate):
+    assert _fee(notional, rate) == calc_fee(fee_rate=Decimal(rate), notional=Decimal(notional))
+
+
+def test_fee_units_matches_calc_fee_random():
+    rnd = random.Random(7)
+    for _ in range(2000):
+        notional = Decimal(rnd.randrange(0, 10**9)) / 10**6
+        rate = Decimal(rnd.randrange(0, 10**5)) / 10**6
+        assert _fee(str(notional), str(rate)) == calc_fee(fee_rate=rate, notional=notional)
+
+
+@pytest.mark.parametrize(
+    "x, expected",
+    [
+        ("0.5", 500_000),
+        ("0.123456", 123_456),
+        (" 1.2 ", 1_200_000),
+        ("-0.25", -250_000),
+        ("1e-3", 1_000),
+        ("0.1234565", 123_456),
+        (Decimal("0.75"), 750_000),
+        (2, 2_000_000),
+        (0.1, 100_000),
+        ("inf", None),
+        ("NaN", None),
+        (Decimal("Infinity"), None),
+        (float("inf"), None),
+        ("abc", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_parse_units(x, expected):
+    assert parse_units(x) == expected
+
+
+def test_parse_units_cache_keeps_types_apart():
+    assert parse_units("1") == 1_000_000
+    assert parse_units(1) == 1_000_000
+    assert parse_units(True) is None
+    assert parse_units(Decimal(1)) == 1_000_000
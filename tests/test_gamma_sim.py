@@ -0,0 +1,90 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from polymarket_pgsql.gamma_sim import GammaCatalogue, GammaStandIn
+
+
+@pytest.fixture
+def catalogue():
+    return GammaCatalogue(n_events=12, markets_per_event=3, seed=1, id_base=100)
+
+
+@pytest.fixture
+def sim(catalogue):
+    s = GammaStandIn(catalogue)
+    yield s
+    s.close()
+
+
+def _ok(sim, target):
+    status, body, headers = sim.handle(target)
+    assert status == 200 and headers == {}
+    return json.loads(body)
+
+
+def test_list_pages_cover_catalogue(sim):
+    seen = []
+    for offset in range(0, 20, 5):
+        page = _ok(sim, f"/events?limit=5&offset={offset}&order=id&ascending=true")
+        seen.extend(int(e["id"]) for e in page)
+    assert seen == list(range(100, 112))
+    assert _ok(sim, "/events?limit=5&offset=20") == []
+
+
+def test_list_filters_and_hides_private_fields(sim, catalogue):
+    closed = _ok(sim, "/events?closed=true&limit=100")
+    assert {int(e["id"]) for e in closed} == {i for i, e in catalogue.events.items() if e["closed"]}
+    markets = _ok(sim, "/markets?id=1000&id=1001&limit=10")
+    assert [m["id"] for m in markets] == ["1000", "1001"]
+    assert not any(k.startswith("_") for m in markets for k in m)
+
+
+def test_get_by_id(sim):
+    ev = _ok(sim, "/events/103")
+    assert ev["id"] == "103" and len(ev["markets"]) == 3
+    assert _ok(sim, "/markets/1009/")["events"] == [{"id": "103"}]
+
+
+@pytest.mark.parametrize("target", ["/events/99", "/markets/abc", "/nope", "/events/1/2"])
+def test_not_found(sim, target):
+    status, _, _ = sim.handle(target)
+    assert status == 404
+
+
+def test_bad_query(sim):
+    status, _, _ = sim.handle("/events?limit=ten")
+    assert status == 400
+
+
+def test_throttle_sets_retry_after(catalogue):
+    sim = GammaStandIn(catalogue, rate_429=1.0, retry_after_s=3)
+    try:
+        status, _, headers = sim.handle("/events")
+        assert status == 429
+        assert headers == {"Retry-After": "3"}
+        assert sim.stats.throttled == 1 and sim.stats.served == 0
+    finally:
+        sim.close()
+
+
+def test_error_rate(catalogue):
+    sim = GammaStandIn(catalogue, error_rate=1.0)
+    try:
+        assert sim.handle("/events")[0] == 503
+        assert sim.stats.errors == 1
+    finally:
+        sim.close()
+
+
+def test_served_over_http(catalogue):
+    sim = GammaStandIn(catalogue, rate_429=1.0, retry_after_s=2).start()
+    try:
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            urllib.request.urlopen(f"{sim.url}/events", timeout=5)
+        assert exc.value.code == 429
+        assert exc.value.headers["Retry-After"] == "2"
+    finally:
+        sim.close()
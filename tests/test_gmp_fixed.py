@@ -0,0 +1,108 @@
+import random
+from decimal import Decimal
+
+import pytest
+
+from polymarket_pgsql.fixedpoint import PRICE_SCALE, decimal_to_units
+from polymarket_pgsql.gmp import BasketState, FixedBasketState, MarketTokens
+
+TOKENS = [
+    MarketTokens(market_id=i, question=f"q{i}", yes_asset_id=f"y{i}", no_asset_id=f"n{i}")
+    for i in range(3)
+]
+
+
+def _units(x):
+    return None if x is None else decimal_to_units(Decimal(x))
+
+
+def _pair(fee_rate="0", yes_threshold=None, no_threshold=None):
+    kw = {
+        "fee_rate": Decimal(fee_rate),
+        "yes_threshold": None if yes_threshold is None else Decimal(yes_threshold),
+        "no_threshold": None if no_threshold is None else Decimal(no_threshold),
+    }
+    return BasketState(TOKENS), FixedBasketState(TOKENS, **kw), kw
+
+
+def _quote(ref, fixed, asset_id, bid, ask):
+    ref.update_quote(
+        asset_id, None if bid is None else Decimal(bid), None if ask is None else Decimal(ask)
+    )
+    fixed.update_units(asset_id, _units(bid), _units(ask))
+
+
+def _kinds(signals):
+    return sorted(s.kind for s in signals)
+
+
+def test_buy_yes_at_exact_fee_boundary_does_not_fire():
+    ref, fixed, kw = _pair(fee_rate="0.25")
+    # 0.8 * 1.25 == 1：不严格小于 payout，不出信号
+    for i, ask in enumerate(("0.3", "0.3", "0.2")):
+        _quote(ref, fixed, f"y{i}", "0.1", ask)
+    assert ref.evaluate(**kw) == fixed.evaluate() == []
+    _quote(ref, fixed, "y2", "0.1", "0.199999")
+    assert _kinds(fixed.evaluate()) == ["BUY_YES_ALL"]
+    assert ref.evaluate(**kw) == fixed.evaluate()
+
+
+def test_sell_no_at_exact_fee_boundary():
+    ref, fixed, kw = _pair(fee_rate="0.2")
+    # payout(NO) = 2；2.5 * 0.8 == 2 不成立，再高 1 tick 成立
+    for i, bid in enumerate(("0.9", "0.8", "0.8")):
+        _quote(ref, fixed, f"n{i}", bid, "0.95")
+    assert fixed.evaluate() == ref.evaluate(**kw) == []
+    _quote(ref, fixed, "n2", "0.800001", "0.95")
+    assert _kinds(fixed.evaluate()) == ["SELL_NO_ALL"]
+    assert fixed.evaluate() == ref.evaluate(**kw)
+
+
+def test_threshold_boundary():
+    ref, fixed, kw = _pair(yes_threshold="0.9")
+    for i, ask in enumerate(("0.3", "0.3", "0.3")):
+        _quote(ref, fixed, f"y{i}", None, ask)
+    assert fixed.evaluate() == ref.evaluate(**kw) == []
+    _quote(ref, fixed, "y0", None, "0.299999")
+    assert _kinds(fixed.evaluate()) == ["BUY_YES_ALL"]
+    assert fixed.evaluate() == ref.evaluate(**kw)
+
+
+def test_empty_side_blocks_signal():
+    ref, fixed, kw = _pair()
+    _quote(ref, fixed, "y0", "0.2", "0.2")
+    _quote(ref, fixed, "y1", "0.2", "0.2")
+    # 第三个 leg 只有 bid、没有 ask：BUY_YES 不成立
+    _quote(ref, fixed, "y2", "0.2", None)
+    assert fixed.sum_yes_ask is None
+    assert fixed.evaluate() == ref.evaluate(**kw) == []
+    _quote(ref, fixed, "y2", "0.2", "0.2")
+    assert _kinds(fixed.evaluate()) == ["BUY_YES_ALL"]
+    # 盘口撤空后恢复为缺失
+    _quote(ref, fixed, "y1", None, None)
+    assert fixed.evaluate() == ref.evaluate(**kw) == []
+    assert fixed.per_market() == ref.per_market()
+
+
+def test_unknown_asset_is_ignored():
+    _, fixed, _ = _pair()
+    assert not fixed.update_units("other", 1, 2)
+    assert "y0" in fixed and "other" not in fixed
+
+
+@pytest.mark.parametrize("fee_rate", ["0", "0.01", "0.02", "0.333333"])
+def test_matches_basket_state_random(fee_rate):
+    ref, fixed, kw = _pair(fee_rate=fee_rate, yes_threshold="0.98")
+    rnd = random.Random(fee_rate)
+    fired = set()
+    assets = [a for t in TOKENS for a in (t.yes_asset_id, t.no_asset_id)]
+    for _ in range(3000):
+        bid = rnd.choice([None, rnd.randrange(1, PRICE_SCALE)])
+        ask = rnd.choice([None, rnd.randrange(1, PRICE_SCALE)])
+        bid_s = None if bid is None else str(Decimal(bid) / PRICE_SCALE)
+        ask_s = None if ask is None else str(Decimal(ask) / PRICE_SCALE)
+        _quote(ref, fixed, rnd.choice(assets), bid_s, ask_s)
+        assert fixed.evaluate() == ref.evaluate(**kw)
+        assert fixed.sum_yes_ask == ref.sum_yes_ask
+        fired.update(s.kind for s in fixed.evaluate())
+    assert fired  # 至少有条件成立过，比较的不只是空列表
@@ -0,0 +1,59 @@
+from decimal import Decimal
+
+from polymarket_pgsql.paper_ledger import Position
+
+
+def D(x):
+    return Decimal(x)
+
+
+def test_open_and_add_averages_price():
+    p = Position(market_id=1, outcome="YES")
+    assert p.apply(side="BUY", qty=D("10"), price=D("0.40"), fee=D("0.01")) == D("-0.01")
+    p.apply(side="BUY", qty=D("30"), price=D("0.60"), fee=D("0"))
+    assert p.qty == D("40")
+    assert p.avg_price == D("0.55")
+    assert p.realized_pnl == D("-0.01")
+
+
+def test_partial_close_realizes_minus_fee():
+    p = Position(market_id=1, outcome="YES")
+    p.apply(side="BUY", qty=D("10"), price=D("0.40"), fee=D("0.02"))
+    realized = p.apply(side="SELL", qty=D("4"), price=D("0.55"), fee=D("0.01"))
+    assert realized == D("0.59")  # 4 * 0.15 - 0.01
+    assert p.qty == D("6")
+    assert p.avg_price == D("0.40")
+    assert p.realized_pnl == D("0.57")
+    assert p.fees == D("0.03")
+
+
+def test_full_close_resets_avg_price():
+    p = Position(market_id=1, outcome="NO")
+    p.apply(side="BUY", qty=D("5"), price=D("0.30"), fee=D("0"))
+    assert p.apply(side="SELL", qty=D("5"), price=D("0.20"), fee=D("0")) == D("-0.50")
+    assert p.qty == 0
+    assert p.avg_price == 0
+
+
+def test_flip_long_to_short():
+    p = Position(market_id=1, outcome="YES")
+    p.apply(side="BUY", qty=D("10"), price=D("0.40"), fee=D("0"))
+    realized = p.apply(side="SELL", qty=D("15"), price=D("0.50"), fee=D("0.03"))
+    # 只有平掉的 10 股计已实现；剩余 5 股按本次价格开空
+    assert realized == D("0.97")
+    assert p.qty == D("-5")
+    assert p.avg_price == D("0.50")
+
+
+def test_short_cover_and_flip_to_long():
+    p = Position(market_id=1, outcome="YES")
+    p.apply(side="SELL", qty=D("8"), price=D("0.70"), fee=D("0"))
+    assert p.qty == D("-8")
+    assert p.avg_price == D("0.70")
+    assert p.apply(side="BUY", qty=D("3"), price=D("0.60"), fee=D("0")) == D("0.30")
+    assert p.qty == D("-5")
+    assert p.avg_price == D("0.70")
+    assert p.apply(side="BUY", qty=D("7"), price=D("0.80"), fee=D("0")) == D("-0.50")
+    assert p.qty == D("2")
+    assert p.avg_price == D("0.80")
+    assert p.realized_pnl == D("-0.20")